@@ -0,0 +1,130 @@
+"""
+Wall time and peak RSS of the transform backends on synthetic data of several sizes,
+read from CSV and from Parquet, to pick a backend per deployment. Every backend runs
+in its own process so their peak RSS do not mix, and the results are checked equal.
+
+Usage:
+    python -m benchmarks.bench_backends --rows 1000000 20000000 --threads 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from benchmarks.generate import add_generator_arguments, generator_kwargs, write_dataset
+from src.backends import BACKENDS, get_backend, run_backend
+from src.instrumentation import peak_rss_bytes
+from src.mappings import load_mappings
+
+
+def run_one(
+    name: str,
+    input_path: str,
+    mappings_path: str,
+    result_path: str,
+    threads: Optional[int],
+) -> Dict[str, Any]:
+    backend = get_backend(name, **({"threads": threads} if name == "duckdb" else {}))
+    mapping_dicts = load_mappings(file_path=mappings_path)
+
+    start = time.perf_counter()
+    result_df = run_backend(backend, input_path, *mapping_dicts)
+    wall_seconds = time.perf_counter() - start
+
+    result_df.write_parquet(result_path)
+    return {"wall_seconds": round(wall_seconds, 3), "peak_rss_bytes": peak_rss_bytes()}
+
+
+def bench(
+    data_dir: str, backends: List[str], threads: Optional[int]
+) -> List[Dict[str, Any]]:
+    input_paths = {"csv": os.path.join(data_dir, "inputs.csv")}
+    input_paths["parquet"] = os.path.join(data_dir, "inputs.parquet")
+    pl.scan_csv(input_paths["csv"], separator=";").sink_parquet(input_paths["parquet"])
+
+    # Fresh processes, a forked one would inherit the peak RSS of the parent
+    context = multiprocessing.get_context("spawn")
+    measurements = []
+    for file_format, input_path in input_paths.items():
+        result_paths = []
+        for name in backends:
+            result_path = os.path.join(data_dir, f"result-{name}-{file_format}.parquet")
+            with context.Pool(processes=1) as pool:
+                measurement = pool.apply(
+                    run_one,
+                    (
+                        name,
+                        input_path,
+                        os.path.join(data_dir, "mappings.csv"),
+                        result_path,
+                        threads,
+                    ),
+                )
+            measurements.append(
+                {"backend": name, "input_format": file_format, **measurement}
+            )
+            result_paths.append(result_path)
+            print(
+                f"{file_format:<8} {name:<7} {measurement['wall_seconds']:8.3f}s "
+                f"peak_rss={measurement['peak_rss_bytes'] / 2**20:.0f}MiB",
+                file=sys.stderr,
+            )
+
+        for result_path in result_paths[1:]:
+            assert_frame_equal(
+                pl.read_parquet(result_path), pl.read_parquet(result_paths[0])
+            )
+
+    return measurements
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 20_000_000])
+    parser.add_argument(
+        "--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS)
+    )
+    parser.add_argument(
+        "--threads", type=int, default=None, help="DuckDB threads, all cores if omitted"
+    )
+    parser.add_argument("--output", default=None, help="JSON file, stdout if omitted")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    report = {
+        "polars": pl.__version__,
+        "cpu_count": os.cpu_count(),
+        "generator": generator_kwargs(args),
+        "results": [],
+    }
+    for rows in args.rows:
+        print(f"rows={rows}", file=sys.stderr)
+        with tempfile.TemporaryDirectory() as data_dir:
+            write_dataset(data_dir, rows=rows, **generator_kwargs(args))
+            report["results"].append(
+                {
+                    "rows": rows,
+                    "backends": bench(
+                        data_dir=data_dir, backends=args.backends, threads=args.threads
+                    ),
+                }
+            )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
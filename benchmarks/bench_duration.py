@@ -0,0 +1,107 @@
+"""
+Micro-benchmark of the Duration codec against the previous regex implementation.
+
+Usage:
+    python -m benchmarks.bench_duration --rows 1000000 --repeat 5
+"""
+
+import argparse
+import random
+import time
+from typing import Callable
+
+import polars as pl
+
+from src.duration import seconds_to_duration, with_duration_seconds
+
+
+def build_durations(rows: int, seed: int = 42) -> pl.DataFrame:
+    rng = random.Random(seed)
+    return pl.DataFrame(
+        {
+            "TotalSeconds": [rng.randrange(0, 10 * 3600) for _ in range(rows)],
+        }
+    ).select(seconds_to_duration(column="TotalSeconds").alias("Duration"))
+
+
+def regex_parse(df: pl.DataFrame) -> pl.DataFrame:
+    # Implementation used by handle_dimensions before the codec
+    return df.with_columns(
+        pl.col("Duration").str.extract(r"^(\d+):", 1).cast(pl.Int64).alias("hours"),
+        pl.col("Duration").str.extract(r":(\d+):", 1).cast(pl.Int64).alias("minutes"),
+        pl.col("Duration").str.extract(r":(\d+)$", 1).cast(pl.Int64).alias("seconds"),
+    ).with_columns(
+        (pl.col("hours") * 3600 + pl.col("minutes") * 60 + pl.col("seconds")).alias(
+            "TotalSeconds"
+        )
+    )
+
+
+def regex_format(df: pl.DataFrame) -> pl.DataFrame:
+    return df.with_columns(
+        (
+            (pl.col("TotalSeconds") // 3600).cast(pl.Int64).cast(pl.Utf8).str.zfill(1)
+            + ":"
+            + ((pl.col("TotalSeconds") % 3600) // 60)
+            .cast(pl.Int64)
+            .cast(pl.Utf8)
+            .str.zfill(2)
+            + ":"
+            + (pl.col("TotalSeconds") % 60).cast(pl.Int64).cast(pl.Utf8).str.zfill(2)
+        ).alias("Formatted")
+    )
+
+
+def codec_parse(df: pl.DataFrame) -> pl.DataFrame:
+    return with_duration_seconds(frame=df, column="Duration", alias="TotalSeconds")
+
+
+def codec_format(df: pl.DataFrame) -> pl.DataFrame:
+    return df.with_columns(
+        seconds_to_duration(column="TotalSeconds").alias("Formatted")
+    )
+
+
+def best_of(
+    function: Callable[[pl.DataFrame], pl.DataFrame], df: pl.DataFrame, repeat: int
+) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    durations_df = build_durations(rows=args.rows)
+    seconds_df = codec_parse(durations_df)
+
+    assert regex_parse(durations_df)["TotalSeconds"].equals(seconds_df["TotalSeconds"])
+
+    results = {
+        "parse": (
+            best_of(regex_parse, durations_df, args.repeat),
+            best_of(codec_parse, durations_df, args.repeat),
+        ),
+        "format": (
+            best_of(regex_format, seconds_df, args.repeat),
+            best_of(codec_format, seconds_df, args.repeat),
+        ),
+    }
+
+    print(f"rows={args.rows} repeat={args.repeat} (best of, seconds)")
+    for step, (regex_time, codec_time) in results.items():
+        print(
+            f"{step:<7} regex={regex_time:.4f} codec={codec_time:.4f} "
+            f"speedup={regex_time / codec_time:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
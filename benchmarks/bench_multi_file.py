@@ -0,0 +1,98 @@
+"""
+Throughput of the multi-file mode: a process pool against the sequential loop.
+
+Usage:
+    python -m benchmarks.bench_multi_file --files 8 --rows 500000 --workers 4
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import List, Optional
+
+import polars as pl
+
+from src.extract import get_df_from_csv, get_mappings_dict
+from src.parallel import handle_dimensions_files
+from src.schemas import INPUTS_SCHEMA, MAPPINGS_SCHEMA
+from src.utils import obtain_file_path
+
+CHANNELS = ["channel1", "channel2", "channel3"]
+LANGUAGES = ["en", "en_us", "es"]
+CUSTOM_FIELDS = [
+    "Area=account;New=true",
+    "Area=finance",
+    "Area=customer;Premium=premium-user",
+    "Premium=premium-user;New=false",
+]
+
+
+def write_inputs(directory: str, files: int, rows: int, ids: int, seed: int = 42):
+    rng = random.Random(seed)
+    for index in range(files):
+        pl.DataFrame(
+            {
+                "id": [rng.randrange(1, ids + 1) for _ in range(rows)],
+                "Channel": [rng.choice(CHANNELS) for _ in range(rows)],
+                "Language": [rng.choice(LANGUAGES) for _ in range(rows)],
+                "CustomFields": [rng.choice(CUSTOM_FIELDS) for _ in range(rows)],
+                "Duration": [
+                    f"{rng.randrange(0, 3)}:{rng.randrange(0, 60):02d}:"
+                    f"{rng.randrange(0, 60):02d}"
+                    for _ in range(rows)
+                ],
+                "PointsGained": [rng.randrange(0, 100) for _ in range(rows)],
+            },
+            schema=INPUTS_SCHEMA,
+        ).write_csv(os.path.join(directory, f"inputs-{index:03d}.csv"), separator=";")
+
+
+def timed_run(file_paths: List[str], max_workers: Optional[int]) -> float:
+    mappings_df = get_df_from_csv(
+        file_path=obtain_file_path(desired_file="mappings.csv"),
+        schema=MAPPINGS_SCHEMA,
+    )
+    channel_dict, language_dict, customfields_dict = get_mappings_dict(df=mappings_df)
+
+    start = time.perf_counter()
+    handle_dimensions_files(
+        file_paths=file_paths,
+        channel_dict=channel_dict,
+        language_dict=language_dict,
+        customfields_dict=customfields_dict,
+        schema=INPUTS_SCHEMA,
+        max_workers=max_workers,
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--ids", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_inputs(directory, files=args.files, rows=args.rows, ids=args.ids)
+        file_paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+        )
+        total_rows = args.files * args.rows
+
+        results = {
+            "sequential": timed_run(file_paths, max_workers=1),
+            "pool": timed_run(file_paths, max_workers=args.workers),
+        }
+
+    print(f"files={args.files} rows/file={args.rows} workers={args.workers or 'cpu'}")
+    for mode, seconds in results.items():
+        print(f"{mode:<10} {seconds:.3f}s {total_rows / seconds:,.0f} rows/s")
+    print(f"speedup={results['sequential'] / results['pool']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Times and memory-profiles every stage of the job, and the whole job end-to-end,
+on synthetic data of several sizes. Results are printed (or written) as JSON so
+runs of different commits can be compared.
+
+Usage:
+    python -m benchmarks.bench_pipeline --rows 10000 1000000 20000000 \
+        --output bench.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import polars as pl
+
+from benchmarks.generate import add_generator_arguments, generator_kwargs, write_dataset
+from src.extract import get_df_from_csv, get_mappings_dict
+from src.instrumentation import RssSampler, rss_bytes
+from src.schemas import INPUTS_SCHEMA, MAPPINGS_SCHEMA
+from src.transform import (
+    get_total_points_gained,
+    handle_dimensions,
+    handle_dimensions_with_totals,
+    map_custom_fields,
+    map_non_custom_fields_columns,
+)
+
+
+def measure(name: str, function: Callable[[], Any]) -> Dict[str, Any]:
+    gc.collect()
+    rss_before = rss_bytes()
+
+    # The peak of this call only, the process peak includes the previous stages
+    with RssSampler() as sampler:
+        window = sampler.open_window()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+
+        result = function()
+
+        wall_seconds = time.perf_counter() - start_wall
+        cpu_seconds = time.process_time() - start_cpu
+        peak_bytes = sampler.close_window(window)
+
+    measurement = {
+        "stage": name,
+        "wall_seconds": round(wall_seconds, 6),
+        "cpu_seconds": round(cpu_seconds, 6),
+        "rss_delta_bytes": rss_bytes() - rss_before,
+        "peak_rss_bytes": peak_bytes,
+    }
+    if isinstance(result, pl.DataFrame):
+        measurement["output_rows"] = result.height
+        measurement["output_estimated_bytes"] = result.estimated_size()
+
+    return {"measurement": measurement, "result": result}
+
+
+def bench_stages(data_dir: str) -> List[Dict[str, Any]]:
+    inputs_path = os.path.join(data_dir, "inputs.csv")
+    mappings_path = os.path.join(data_dir, "mappings.csv")
+    measurements = []
+
+    def step(name: str, function: Callable[[], Any]) -> Any:
+        measured = measure(name, function)
+        measurements.append(measured["measurement"])
+        return measured["result"]
+
+    inputs_df = step(
+        "get_df_from_csv",
+        lambda: get_df_from_csv(file_path=inputs_path, schema=INPUTS_SCHEMA),
+    )
+    mappings_df = get_df_from_csv(file_path=mappings_path, schema=MAPPINGS_SCHEMA)
+    channel_dict, language_dict, customfields_dict = step(
+        "get_mappings_dict", lambda: get_mappings_dict(df=mappings_df)
+    )
+    channel_language_df = step(
+        "map_non_custom_fields_columns",
+        lambda: map_non_custom_fields_columns(
+            df=inputs_df, channel_dict=channel_dict, language_dict=language_dict
+        ),
+    )
+    all_dimensions_df = step(
+        "map_custom_fields",
+        lambda: map_custom_fields(
+            df=channel_language_df, mapping_dict=customfields_dict
+        ),
+    )
+    unique_dimensions_df = step(
+        "handle_dimensions", lambda: handle_dimensions(df=all_dimensions_df)
+    )
+    step(
+        "get_total_points_gained",
+        lambda: get_total_points_gained(df=unique_dimensions_df),
+    )
+    # Replaces the two previous stages in src.pipeline, compare it with their sum
+    step(
+        "handle_dimensions_with_totals",
+        lambda: handle_dimensions_with_totals(df=all_dimensions_df),
+    )
+
+    return measurements
+
+
+def run_end_to_end(data_dir: str) -> pl.DataFrame:
+    inputs_df = get_df_from_csv(
+        file_path=os.path.join(data_dir, "inputs.csv"), schema=INPUTS_SCHEMA
+    )
+    channel_dict, language_dict, customfields_dict = get_mappings_dict(
+        df=get_df_from_csv(
+            file_path=os.path.join(data_dir, "mappings.csv"), schema=MAPPINGS_SCHEMA
+        )
+    )
+    mapped_df = map_custom_fields(
+        df=map_non_custom_fields_columns(
+            df=inputs_df, channel_dict=channel_dict, language_dict=language_dict
+        ),
+        mapping_dict=customfields_dict,
+    )
+    return get_total_points_gained(df=handle_dimensions(df=mapped_df))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--output", default=None, help="JSON file, stdout if omitted")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "cpu_count": os.cpu_count(),
+        "generator": generator_kwargs(args),
+        "results": [],
+    }
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as data_dir:
+            write_dataset(data_dir, rows=rows, **generator_kwargs(args))
+
+            stages = bench_stages(data_dir)
+            end_to_end = measure("end_to_end", lambda: run_end_to_end(data_dir))
+
+        report["results"].append(
+            {
+                "rows": rows,
+                "stages": stages,
+                "end_to_end": end_to_end["measurement"],
+            }
+        )
+        print(
+            f"rows={rows} end_to_end={end_to_end['measurement']['wall_seconds']:.3f}s",
+            file=sys.stderr,
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
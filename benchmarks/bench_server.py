@@ -0,0 +1,117 @@
+"""
+Latency of the HTTP service against one-shot runs of main.py, on the same batch.
+
+Usage:
+    python -m benchmarks.bench_server --requests 500 --one-shot-runs 20
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from src.server import CSV
+from src.utils import obtain_file_path
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": round(quantiles[49] * 1000, 3),
+        "p99_ms": round(quantiles[98] * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_healthy(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError("server did not start")
+
+
+def bench_server(body: bytes, requests: int) -> List[float]:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "src.server", "--port", str(port)],
+        cwd=ROOT_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_healthy(port)
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            connection.request(
+                "POST", "/transform", body=body, headers={"Content-Type": CSV}
+            )
+            response = connection.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - start)
+            assert response.status == 200
+        return latencies
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def bench_one_shot(runs: int) -> List[float]:
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "main.py"],
+            cwd=ROOT_DIR,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--one-shot-runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(obtain_file_path(), "rb") as file:
+        body = file.read()
+
+    results = {
+        "server": percentiles(bench_server(body=body, requests=args.requests)),
+        "one-shot": percentiles(bench_one_shot(runs=args.one_shot_runs)),
+    }
+
+    print(f"batch=data/inputs.csv ({len(body)} bytes)")
+    for mode, result in results.items():
+        print(
+            f"{mode:<9} p50={result['p50_ms']:.2f}ms p99={result['p99_ms']:.2f}ms "
+            f"mean={result['mean_ms']:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Start-up time of the CLI against a budget: the import time of its modules, measured
+with `python -X importtime` in fresh interpreters, and the wall time of
+`python main.py --help` and of a default run.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 10 --check
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time budgets, in ms. src.cli is all that --help and argument
+# errors load, src.pipeline what a default run loads, most of it Polars itself
+BUDGETS_MS = {"src.cli": 50.0, "src.pipeline": 250.0}
+
+
+def import_times(module: str) -> List[Tuple[str, float]]:
+    """
+    Imports a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module: The module to import.
+
+    Returns:
+        List[Tuple[str, float]]: The name and cumulative import time in ms of every
+            module imported directly by it, then of the module itself.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    # Modules are printed once imported, so the direct imports of a top-level
+    # module (indented by two spaces) are the lines since the previous top-level one
+    direct_imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        depth = len(name) - len(name.lstrip()) - 1
+        if depth == 0:
+            times = direct_imports + [(name.strip(), int(cumulative_us) / 1000)]
+            direct_imports = []
+        elif depth == 2:
+            direct_imports.append((name.strip(), int(cumulative_us) / 1000))
+
+    return times
+
+
+def wall_time_ms(args: List[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT_DIR,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def median_import_ms(module: str, runs: int) -> Tuple[float, Dict[str, float]]:
+    totals, children = [], {}
+    for _ in range(runs):
+        *direct_imports, (_, total_ms) = import_times(module)
+        totals.append(total_ms)
+        for name, child_ms in direct_imports:
+            children.setdefault(name, []).append(child_ms)
+
+    return statistics.median(totals), {
+        name: statistics.median(child_times) for name, child_times in children.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument(
+        "--check", action="store_true", help="Exit with 1 when over a budget"
+    )
+    args = parser.parse_args()
+
+    over_budget = []
+    for module, budget_ms in BUDGETS_MS.items():
+        total_ms, children = median_import_ms(module=module, runs=args.runs)
+        status = "ok" if total_ms <= budget_ms else "OVER BUDGET"
+        print(
+            f"import {module:<13} {total_ms:8.1f}ms (budget {budget_ms:.0f}ms) {status}"
+        )
+        for name, child_ms in sorted(
+            children.items(), key=lambda item: item[1], reverse=True
+        )[: args.top]:
+            print(f"    {name:<26} {child_ms:8.1f}ms")
+        if total_ms > budget_ms:
+            over_budget.append(module)
+
+    for label, command in [
+        ("python -c pass", ["-c", "pass"]),
+        ("main.py --help", ["main.py", "--help"]),
+        ("main.py", ["main.py"]),
+    ]:
+        wall_ms = statistics.median(wall_time_ms(command) for _ in range(args.runs))
+        print(f"{label:<20} {wall_ms:8.1f}ms wall")
+
+    if args.check and over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Seeded synthetic generator of inputs.csv and mappings.csv files.
+
+Usage:
+    python -m benchmarks.generate --rows 1000000 --ids 100000 --output-dir /tmp/bench
+"""
+
+import argparse
+import os
+import random
+from typing import List
+
+import polars as pl
+
+from src.duration import seconds_to_duration
+from src.schemas import INPUTS_SCHEMA
+
+CHANNELS = ["channel1", "channel2", "channel3", "channel4"]
+LANGUAGES = ["en", "en_us", "es", "fr", "de"]
+
+
+def generate_inputs(
+    rows: int,
+    ids: int = 100_000,
+    custom_fields_tokens: int = 3,
+    custom_fields_keys: int = 50,
+    custom_fields_values: int = 1_000,
+    duplicate_ratio: float = 0.2,
+    seed: int = 42,
+) -> pl.DataFrame:
+    """
+    Generates an inputs DataFrame following INPUTS_SCHEMA.
+
+    Rows are built in Polars from hashes of the row number, so 20M rows take seconds
+    and the same arguments always give the same data.
+
+    Args:
+        rows: Number of rows.
+        ids: Number of distinct ids.
+        custom_fields_tokens: Maximum number of "Key=value" tokens per CustomFields
+            value.
+        custom_fields_keys: Number of distinct CustomFields keys (tokens are
+            "K<n>=v<m>").
+        custom_fields_values: Number of distinct CustomFields values.
+        duplicate_ratio: Approximate fraction of rows whose (id, Channel, Language,
+            CustomFields) dimensions repeat a previous row, i.e. rows merged by
+            handle_dimensions.
+        seed: Seed of the generator.
+
+    Returns:
+        pl.DataFrame: The generated inputs.
+    """
+    rng = random.Random(seed)
+    custom_fields_pool = [
+        ";".join(
+            f"K{rng.randrange(custom_fields_keys)}=v{rng.randrange(10)}"
+            for _ in range(rng.randint(1, custom_fields_tokens))
+        )
+        for _ in range(custom_fields_values)
+    ]
+
+    # Rows sharing a dimension key share their dimensions. The first rows use every
+    # key once and the remaining ones repeat random keys, so the ratio is exact
+    # (up to the rare hash collisions of the dimensions themselves).
+    dimension_keys = max(1, int(rows * (1 - duplicate_ratio)))
+    row_number = pl.int_range(rows, dtype=pl.UInt64)
+    key = (
+        pl.when(row_number < dimension_keys)
+        .then(row_number)
+        .otherwise(row_number.hash(seed) % dimension_keys)
+    )
+
+    def pick(salt: int, size: int) -> pl.Expr:
+        return (key.hash(seed + salt) % size).cast(pl.UInt32)
+
+    return (
+        pl.select(
+            (pick(1, ids) + 1).alias("id"),
+            pl.lit(pl.Series(CHANNELS)).get(pick(2, len(CHANNELS))).alias("Channel"),
+            pl.lit(pl.Series(LANGUAGES)).get(pick(3, len(LANGUAGES))).alias("Language"),
+            pl.lit(pl.Series(custom_fields_pool))
+            .get(pick(4, custom_fields_values))
+            .alias("CustomFields"),
+            (row_number.hash(seed + 5) % (3 * 3600)).alias("TotalSeconds"),
+            (row_number.hash(seed + 6) % 100).cast(pl.Int32).alias("PointsGained"),
+        )
+        .select(
+            "id",
+            "Channel",
+            "Language",
+            "CustomFields",
+            seconds_to_duration(column="TotalSeconds").alias("Duration"),
+            "PointsGained",
+        )
+        .cast(INPUTS_SCHEMA)
+    )
+
+
+def generate_mappings(custom_fields_keys: int = 50) -> pl.DataFrame:
+    """
+    Generates a mappings DataFrame covering the generated Channel, Language and
+    CustomFields values ("K<n>=v<m>" is mapped to "k<n>=V<m>").
+
+    Args:
+        custom_fields_keys: Number of distinct CustomFields keys, as in generate_inputs.
+
+    Returns:
+        pl.DataFrame: The generated mappings.
+    """
+    rows: List[tuple] = [
+        ("Channel", channel, channel.capitalize()) for channel in CHANNELS
+    ] + [("Language", language, f"{language}-XX") for language in LANGUAGES]
+    rows += [
+        ("CustomFields", f"K{key}=v{value}", f"k{key}=V{value}")
+        for key in range(custom_fields_keys)
+        for value in range(10)
+    ]
+
+    return pl.DataFrame(rows, schema=["Field", "SoftwareA", "SoftwareB"], orient="row")
+
+
+def write_dataset(output_dir: str, **kwargs) -> None:
+    """
+    Writes the generated inputs.csv and mappings.csv into output_dir, using the ";"
+    separator of the job files.
+
+    Args:
+        output_dir: The target directory, created if needed.
+        **kwargs: Arguments of generate_inputs.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    generate_inputs(**kwargs).write_csv(
+        os.path.join(output_dir, "inputs.csv"), separator=";"
+    )
+    generate_mappings(
+        custom_fields_keys=kwargs.get("custom_fields_keys", 50)
+    ).write_csv(os.path.join(output_dir, "mappings.csv"), separator=";")
+
+
+def add_generator_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--ids", type=int, default=100_000)
+    parser.add_argument("--custom-fields-tokens", type=int, default=3)
+    parser.add_argument("--custom-fields-keys", type=int, default=50)
+    parser.add_argument("--custom-fields-values", type=int, default=1_000)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def generator_kwargs(args: argparse.Namespace) -> dict:
+    return {
+        "ids": args.ids,
+        "custom_fields_tokens": args.custom_fields_tokens,
+        "custom_fields_keys": args.custom_fields_keys,
+        "custom_fields_values": args.custom_fields_values,
+        "duplicate_ratio": args.duplicate_ratio,
+        "seed": args.seed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--output-dir", required=True)
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    write_dataset(args.output_dir, rows=args.rows, **generator_kwargs(args))
+
+
+if __name__ == "__main__":
+    main()
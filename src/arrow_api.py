@@ -0,0 +1,165 @@
+"""
+In-process API of the job over Arrow data, for services that already hold the
+SoftwareA inputs and mappings in memory.
+
+Inputs and mappings are any Arrow-compatible object: a pl.DataFrame, or an object
+exporting the Arrow PyCapsule stream interface (__arrow_c_stream__), such as a
+pyarrow Table or RecordBatchReader, a nanoarrow stream or a DuckDB result. They are
+imported through the Arrow C stream interface, without serializing them: numeric
+columns share their buffers with the producer, string columns are converted to the
+Polars string layout. The result is a pl.DataFrame, which exports the same interface,
+so e.g. pyarrow.table(result) takes it without a copy.
+
+Usage:
+    result = transform_arrow(inputs=inputs_table, mappings=mappings_table)
+"""
+
+from typing import Any, Dict, Optional, Tuple, Union
+
+import polars as pl
+
+from src.contracts import check_mapping_dicts, validate_pipeline
+from src.extract import get_mappings_dict
+from src.schemas import INPUTS_SCHEMA, MAPPINGS_SCHEMA
+from src.transform import (
+    get_total_points_gained,
+    handle_dimensions,
+    map_custom_fields,
+    map_non_custom_fields_columns,
+)
+from src.utils import get_logger
+
+logger = get_logger(name="ARROW_API")
+
+MappingDicts = Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]
+
+
+def from_arrow(
+    data: Any, schema: Optional[Dict[str, pl.DataType]] = None
+) -> pl.DataFrame:
+    """
+    Imports an Arrow-compatible object as a DataFrame, with the columns of a schema.
+
+    Columns are matched by name and cast to the schema, a column that already has
+    the schema dtype is not copied. Other columns are dropped.
+
+    Args:
+        data: A pl.DataFrame or an object with an __arrow_c_stream__ method.
+        schema: The columns to import, see src.schemas. Defaults to None (all of
+            them, as they are).
+
+    Returns:
+        pl.DataFrame: The data, with the schema columns in order.
+
+    Raises:
+        ValueError: if
+            -the object does not export an Arrow stream.
+            -any column of the schema is missing.
+    """
+    if isinstance(data, pl.DataFrame):
+        df = data
+    elif hasattr(data, "__arrow_c_stream__"):
+        # pl.DataFrame iterates over some stream objects (e.g. a pyarrow
+        # RecordBatchReader) instead of importing them, so only the stream is passed
+        df = pl.DataFrame(_ArrowStream(data=data))
+    else:
+        error_message = (
+            "Expected a pl.DataFrame or an object with __arrow_c_stream__, "
+            f"got {type(data).__name__}"
+        )
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if schema is None:
+        return df
+
+    missing_columns = [column for column in schema if column not in df.columns]
+    if missing_columns:
+        error_message = f"Provided Arrow data must contain columns: {missing_columns}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    return df.select(list(schema)).cast(schema)
+
+
+def mappings_from_arrow(data: Any) -> MappingDicts:
+    """
+    Compiles the mapping dicts of mappings held as Arrow data.
+
+    Args:
+        data: Arrow-compatible mappings with Field, SoftwareA and SoftwareB columns, see
+            from_arrow.
+
+    Returns:
+        Tuple: The channel, language and custom fields mapping dicts, as returned by
+            src.extract.get_mappings_dict.
+
+    Raises:
+        ValueError: if the mappings can not be imported, are empty or contain nulls.
+    """
+    return get_mappings_dict(df=from_arrow(data=data, schema=MAPPINGS_SCHEMA))
+
+
+def transform_arrow(inputs: Any, mappings: Union[Any, MappingDicts]) -> pl.DataFrame:
+    """
+    Runs the eager job over Arrow data, in-process and without any file.
+
+    Args:
+        inputs: Arrow-compatible inputs with the INPUTS_SCHEMA columns, see from_arrow.
+        mappings: Arrow-compatible mappings, or the dicts returned by
+            mappings_from_arrow or src.mappings.load_mappings, so that repeated calls
+            compile the mappings once.
+
+    Returns:
+        pl.DataFrame: The transformed data, as returned by src.pipeline.run. It exports
+            __arrow_c_stream__, e.g. for pyarrow.table.
+
+    Raises:
+        ValueError: if the inputs or mappings can not be imported, the inputs are
+            empty, or any stage fails, see src.transform.
+    """
+    inputs_df = from_arrow(data=inputs, schema=INPUTS_SCHEMA)
+    if isinstance(mappings, tuple):
+        check_mapping_dicts(
+            *mappings,
+            error_message=(
+                "Mapping dicts should be dicts where key and values are strings"
+            ),
+        )
+        channel_dict, language_dict, customfields_dict = mappings
+    else:
+        channel_dict, language_dict, customfields_dict = mappings_from_arrow(
+            data=mappings
+        )
+
+    if inputs_df.is_empty():
+        error_message = "Provided Dataframe is empty"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    # The inputs were cast to INPUTS_SCHEMA, so the contracts are checked once here
+    validate_pipeline(schema=inputs_df.schema)
+
+    all_dimensions_updated_df = map_custom_fields(
+        df=map_non_custom_fields_columns(
+            df=inputs_df,
+            channel_dict=channel_dict,
+            language_dict=language_dict,
+            validate=False,
+        ),
+        mapping_dict=customfields_dict,
+        validate=False,
+    )
+
+    return get_total_points_gained(
+        df=handle_dimensions(df=all_dimensions_updated_df, validate=False),
+        validate=False,
+    )
+
+
+class _ArrowStream:
+    def __init__(self, data: Any) -> None:
+        self.data = data
+
+    def __arrow_c_stream__(self, requested_schema: Any = None) -> Any:
+        return self.data.__arrow_c_stream__(requested_schema)
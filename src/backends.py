@@ -0,0 +1,403 @@
+import itertools
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import polars as pl
+
+from src.arrow_api import from_arrow
+from src.contracts import check_mapping_dicts
+from src.extract import check_csv_header, detect_file_format, get_df_from_csv
+from src.instrumentation import instrumented
+from src.schemas import INPUTS_SCHEMA, OUTPUTS_SCHEMA
+from src.transform import (
+    get_total_points_gained,
+    handle_dimensions,
+    map_custom_fields,
+    map_non_custom_fields_columns,
+)
+from src.utils import get_logger
+
+logger = get_logger(name="BACKENDS")
+
+DEFAULT_BACKEND = "polars"
+
+# Input row number kept by the DuckDB stages to restore the first-seen order, which
+# Polars gets from maintain_order
+ROW_NUMBER_COLUMN = "__row_nr"
+
+# Compression option of DuckDB's read_csv for each src.extract.detect_file_format format
+DUCKDB_CSV_COMPRESSIONS = {"csv": "none", "csv.gz": "gzip", "csv.zst": "zstd"}
+
+DUCKDB_TYPES = [
+    (pl.UInt32, "UINTEGER"),
+    (pl.Int32, "INTEGER"),
+    (pl.Int64, "BIGINT"),
+    (pl.Utf8, "VARCHAR"),
+    (pl.Categorical, "VARCHAR"),
+]
+
+# Same H:MM:SS rules as src.duration.with_duration_seconds: three parts of ASCII
+# digits (no sign, no spaces), minutes and seconds below 60, anything else present
+# is malformed (null). The parts are extracted by one regex, and a part that does not
+# fit its type casts to null, as the hours above the UInt32 range do in Polars.
+DUCKDB_DURATION_SECONDS = (
+    "CASE WHEN parts.minutes < 60 AND parts.seconds < 60 THEN "
+    "parts.hours::BIGINT * 3600 + parts.minutes::BIGINT * 60 + parts.seconds END"
+)
+DUCKDB_DURATION_PARTS = (
+    "TRY_CAST(regexp_extract(Duration, '^([0-9]+):([0-9]+):([0-9]+)$', "
+    "['hours', 'minutes', 'seconds']) "
+    "AS STRUCT(hours UINTEGER, minutes UTINYINT, seconds UTINYINT))"
+)
+
+
+class TransformBackend(ABC):
+    """
+    Engine running the read and the four stages of the job. Frames are whatever the
+    engine works on, only collect returns a pl.DataFrame.
+    """
+
+    name: str
+
+    @abstractmethod
+    def read(self, file_path: str, schema: Dict[str, pl.DataType]) -> Any:
+        """Reads an input file with the given schema."""
+
+    @abstractmethod
+    def map_non_custom_fields_columns(
+        self, frame: Any, channel_dict: Dict[str, str], language_dict: Dict[str, str]
+    ) -> Any:
+        """See src.transform.map_non_custom_fields_columns."""
+
+    @abstractmethod
+    def map_custom_fields(self, frame: Any, mapping_dict: Dict[str, str]) -> Any:
+        """See src.transform.map_custom_fields."""
+
+    @abstractmethod
+    def handle_dimensions(self, frame: Any) -> Any:
+        """See src.transform.handle_dimensions."""
+
+    @abstractmethod
+    def get_total_points_gained(self, frame: Any) -> Any:
+        """See src.transform.get_total_points_gained."""
+
+    @abstractmethod
+    def collect(self, frame: Any) -> pl.DataFrame:
+        """Materializes a frame as a pl.DataFrame."""
+
+
+class PolarsBackend(TransformBackend):
+    """The src.transform functions over eager DataFrames."""
+
+    name = "polars"
+
+    def read(self, file_path: str, schema: Dict[str, pl.DataType]) -> pl.DataFrame:
+        return get_df_from_csv(file_path=file_path, schema=schema)
+
+    def map_non_custom_fields_columns(
+        self,
+        frame: pl.DataFrame,
+        channel_dict: Dict[str, str],
+        language_dict: Dict[str, str],
+    ) -> pl.DataFrame:
+        return map_non_custom_fields_columns(
+            df=frame, channel_dict=channel_dict, language_dict=language_dict
+        )
+
+    def map_custom_fields(
+        self, frame: pl.DataFrame, mapping_dict: Dict[str, str]
+    ) -> pl.DataFrame:
+        return map_custom_fields(df=frame, mapping_dict=mapping_dict)
+
+    def handle_dimensions(self, frame: pl.DataFrame) -> pl.DataFrame:
+        return handle_dimensions(df=frame)
+
+    def get_total_points_gained(self, frame: pl.DataFrame) -> pl.DataFrame:
+        return get_total_points_gained(df=frame)
+
+    def collect(self, frame: pl.DataFrame) -> pl.DataFrame:
+        return frame
+
+
+class DuckDBBackend(TransformBackend):
+    """
+    The stages as SQL over an in-process DuckDB database. Every stage only builds a
+    relation on top of the previous one, so the CSV or Parquet file is scanned by a
+    single query when the result is collected, and DuckDB spills its group-bys and
+    window sums to disk when they do not fit in memory.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, database: str = ":memory:", threads: Optional[int] = None):
+        """
+        Args:
+            database: The DuckDB database file. Defaults to ":memory:".
+            threads: Threads used by DuckDB. Defaults to None (DuckDB picks it).
+
+        Raises:
+            ImportError: if duckdb is not installed.
+        """
+        try:
+            import duckdb
+        except ImportError as e:
+            error_message = "The duckdb backend needs the duckdb package installed"
+            logger.error(error_message)
+            raise ImportError(error_message) from e
+
+        self.connection = duckdb.connect(database=database)
+        if threads:
+            self.connection.execute(f"SET threads = {int(threads)}")
+        self._table_ids = itertools.count()
+
+    def read(self, file_path: str, schema: Dict[str, pl.DataType]) -> Any:
+        file_format = detect_file_format(file_path=file_path)
+        columns = {column: _duckdb_type(dtype) for column, dtype in schema.items()}
+
+        if file_format == "parquet":
+            casts = ", ".join(
+                f'CAST("{column}" AS {duckdb_type}) AS "{column}"'
+                for column, duckdb_type in columns.items()
+            )
+            return self.connection.sql(
+                f"SELECT {casts}, file_row_number AS {ROW_NUMBER_COLUMN} "
+                "FROM read_parquet($file_path, file_row_number = true)",
+                params={"file_path": file_path},
+            )
+
+        if file_format not in DUCKDB_CSV_COMPRESSIONS:
+            error_message = (
+                f"The duckdb backend can not read {file_format} files: {file_path}"
+            )
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+        # DuckDB names the columns by position, as Polars does with a schema
+        if file_format == "csv":
+            check_csv_header(file_path=file_path, separator=";", schema=schema)
+
+        # The ordinality is the position of the row in the output of read_csv, i.e.
+        # in the file, whereas a row_number() window has no order to number by
+        return self.connection.sql(
+            f"SELECT * EXCLUDE (ordinality), ordinality AS {ROW_NUMBER_COLUMN} "
+            "FROM read_csv($file_path, delim = ';', header = true, quote = '\"', "
+            # A quoted empty field is an empty string for Polars, not a null
+            "allow_quoted_nulls = false, "
+            "columns = $columns, compression = $compression) WITH ORDINALITY",
+            params={
+                "file_path": file_path,
+                "columns": columns,
+                "compression": DUCKDB_CSV_COMPRESSIONS[file_format],
+            },
+        )
+
+    def map_non_custom_fields_columns(
+        self, frame: Any, channel_dict: Dict[str, str], language_dict: Dict[str, str]
+    ) -> Any:
+        check_mapping_dicts(
+            channel_dict,
+            language_dict,
+            error_message=(
+                "Both Channel and Language dicts should be a non-empty dict of strings"
+            ),
+        )
+        channel_table = self._mapping_table(mapping_dict=channel_dict)
+        language_table = self._mapping_table(mapping_dict=language_dict)
+
+        # Unmapped values are kept as they are, as pl.Expr.replace does
+        return self._query(
+            frame,
+            "SELECT frame.*, "
+            "coalesce(channel.SoftwareB, frame.Channel) AS ChannelB, "
+            "coalesce(language.SoftwareB, frame.Language) AS LanguageB "
+            f"FROM {{frame}} AS frame LEFT JOIN {channel_table} channel "
+            "ON frame.Channel = channel.SoftwareA "
+            f"LEFT JOIN {language_table} language "
+            "ON frame.Language = language.SoftwareA",
+        )
+
+    def map_custom_fields(self, frame: Any, mapping_dict: Dict[str, str]) -> Any:
+        check_mapping_dicts(
+            mapping_dict,
+            error_message="CustomField dict should be a non-empty dict of strings",
+        )
+        mapping_table = self._mapping_table(mapping_dict=mapping_dict)
+
+        # Mapped row by row: a DISTINCT subquery, as the Polars stage does, would
+        # scan the input file a second time
+        return self._query(
+            frame,
+            "SELECT frame.*, array_to_string(list_transform("
+            "string_split(frame.CustomFields, ';'), "
+            "lambda field: coalesce(mapping.fields[field], field)"
+            "), ';') AS CustomFieldsB "
+            "FROM {frame} AS frame, ("
+            "SELECT map(list(SoftwareA), list(SoftwareB)) AS fields "
+            f"FROM {mapping_table}) AS mapping",
+        )
+
+    def handle_dimensions(self, frame: Any) -> Any:
+        return self._query(
+            frame,
+            "WITH parsed AS ("
+            f"  SELECT *, {DUCKDB_DURATION_SECONDS} AS TotalSeconds "
+            f"  FROM (SELECT *, {DUCKDB_DURATION_PARTS} AS parts FROM {{frame}})"
+            "), aggregated AS ("
+            "  SELECT id, ChannelB, LanguageB, CustomFieldsB, "
+            f"  min({ROW_NUMBER_COLUMN}) AS {ROW_NUMBER_COLUMN}, "
+            "  CAST(sum(PointsGained) AS BIGINT) AS PointsGained, "
+            "  coalesce(CAST(sum(TotalSeconds) AS BIGINT), 0) AS TotalSeconds, "
+            # count skips nulls: present Durations that did not parse are malformed
+            "  count(Duration) - count(TotalSeconds) AS __malformed_durations"
+            "  FROM parsed GROUP BY id, ChannelB, LanguageB, CustomFieldsB"
+            ") "
+            "SELECT id, ChannelB AS Channel, LanguageB AS Language, "
+            "CustomFieldsB AS CustomFields, "
+            "concat(TotalSeconds // 3600, ':', "
+            "lpad(CAST(TotalSeconds % 3600 // 60 AS VARCHAR), 2, '0'), ':', "
+            "lpad(CAST(TotalSeconds % 60 AS VARCHAR), 2, '0')) AS Duration, "
+            f"PointsGained, {ROW_NUMBER_COLUMN}, __malformed_durations "
+            "FROM aggregated",
+        )
+
+    def get_total_points_gained(self, frame: Any) -> Any:
+        return self._query(
+            frame,
+            "SELECT *, CAST(sum(PointsGained) OVER (PARTITION BY id) AS BIGINT) "
+            "AS TotalPointsGained FROM {frame}",
+        )
+
+    def collect(self, frame: Any) -> pl.DataFrame:
+        # Imported through the Arrow C stream interface, which needs no pyarrow
+        df = from_arrow(
+            data=self._query(
+                frame, f"SELECT * FROM {{frame}} ORDER BY {ROW_NUMBER_COLUMN}"
+            )
+        )
+
+        if df.is_empty():
+            error_message = "Provided Dataframe is empty"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+        if "__malformed_durations" in df.columns:
+            malformed_df = df.filter(pl.col("__malformed_durations") > 0)
+            if not malformed_df.is_empty():
+                error_message = (
+                    f"Found {malformed_df['__malformed_durations'].sum()} malformed "
+                    "Duration values (expected H:MM:SS) for ids: "
+                    f"{malformed_df['id'].unique().to_list()}"
+                )
+                logger.error(error_message)
+                raise ValueError(error_message)
+
+        df = df.select(column for column in df.columns if not column.startswith("__"))
+
+        return df.cast(
+            {column: dtype for column, dtype in OUTPUTS_SCHEMA.items() if column in df}
+        )
+
+    def _query(self, frame: Any, query: str) -> Any:
+        # A relation is queried through a view, named differently at every stage as
+        # DuckDB can not bind a view defined on a view of the same name
+        view_name = f"__frame_{next(self._table_ids)}"
+        return frame.query(view_name, query.format(frame=view_name))
+
+    def _mapping_table(self, mapping_dict: Dict[str, str]) -> str:
+        # Relations are lazy, so every mapping gets its own table instead of
+        # replacing one that an earlier relation still reads
+        table_name = f"__mapping_{next(self._table_ids)}"
+        self.connection.execute(
+            f"CREATE TEMP TABLE {table_name} AS SELECT "
+            "unnest($keys::VARCHAR[]) AS SoftwareA, "
+            "unnest($values::VARCHAR[]) AS SoftwareB",
+            parameters={
+                "keys": list(mapping_dict),
+                "values": list(mapping_dict.values()),
+            },
+        )
+        return table_name
+
+
+BACKENDS = {
+    PolarsBackend.name: PolarsBackend,
+    DuckDBBackend.name: DuckDBBackend,
+}
+
+
+def get_backend(name: str = DEFAULT_BACKEND, **kwargs: Any) -> TransformBackend:
+    """
+    Creates a transform backend by name.
+
+    Args:
+        name: One of BACKENDS, "polars" or "duckdb". Defaults to "polars".
+        **kwargs: Options of the backend, e.g. threads for DuckDBBackend.
+
+    Returns:
+        TransformBackend: The backend.
+
+    Raises:
+        ValueError: if the backend is unknown.
+        ImportError: if the package of the backend is not installed.
+    """
+    if name not in BACKENDS:
+        error_message = f"Unknown backend {name}, expected one of: {list(BACKENDS)}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    return BACKENDS[name](**kwargs)
+
+
+@instrumented
+def run_backend(
+    backend: TransformBackend,
+    file_path: str,
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    customfields_dict: Dict[str, str],
+    schema: Dict[str, pl.DataType] = INPUTS_SCHEMA,
+) -> pl.DataFrame:
+    """
+    Reads an input file and runs the four stages of the job on a backend.
+
+    Args:
+        backend: The backend, see get_backend.
+        file_path: The path to the input file.
+        channel_dict (dict): Mapping dictionary for Channel.
+        language_dict (dict): Mapping dictionary for Language.
+        customfields_dict (dict): Mapping dictionary for CustomFields.
+        schema: Schema the file is read with. Defaults to INPUTS_SCHEMA.
+
+    Returns:
+        pl.DataFrame: The transformed data, as returned by the eager path of
+            src.pipeline.run.
+
+    Raises:
+        ValueError: if the file can not be read by the backend, is empty, or any
+            stage fails, see src.transform.
+    """
+    frame = backend.read(file_path=file_path, schema=schema)
+    frame = backend.map_non_custom_fields_columns(
+        frame=frame, channel_dict=channel_dict, language_dict=language_dict
+    )
+    frame = backend.map_custom_fields(frame=frame, mapping_dict=customfields_dict)
+    frame = backend.handle_dimensions(frame=frame)
+    frame = backend.get_total_points_gained(frame=frame)
+
+    return backend.collect(frame=frame)
+
+
+def _duckdb_type(dtype: pl.DataType) -> str:
+    for polars_type, duckdb_type in DUCKDB_TYPES:
+        if dtype == polars_type:
+            return duckdb_type
+
+    supported_types: List[pl.DataType] = [
+        polars_type for polars_type, _ in DUCKDB_TYPES
+    ]
+    error_message = (
+        f"The duckdb backend does not support {dtype}, "
+        f"expected one of: {supported_types}"
+    )
+    logger.error(error_message)
+    raise ValueError(error_message)
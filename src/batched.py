@@ -0,0 +1,175 @@
+import queue
+import threading
+from contextlib import closing
+from typing import Dict, Iterator, List, Optional, TypeVar
+
+import polars as pl
+
+from src.extract import DEFAULT_BATCH_BYTES, read_csv_batches
+from src.instrumentation import instrumented
+from src.transform import (
+    aggregate_partial_dimensions,
+    combine_partial_dimensions,
+    map_custom_fields,
+    map_non_custom_fields_columns,
+    merge_partial_dimensions,
+)
+from src.utils import get_logger
+
+logger = get_logger(name="BATCHED")
+
+# Partial aggregates kept before they are combined into one, bounding their memory
+COMBINE_EVERY = 16
+
+Item = TypeVar("Item")
+
+
+@instrumented
+def handle_dimensions_batched(
+    file_path: str,
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    customfields_dict: Dict[str, str],
+    schema: Optional[Dict[str, pl.DataType]] = None,
+    batch_bytes: int = DEFAULT_BATCH_BYTES,
+    prefetch_depth: int = 1,
+) -> pl.DataFrame:
+    """
+    Maps and aggregates an input file batch by batch, while a background thread
+    parses the next batches, and merges the partial aggregates at the end.
+
+    Polars releases the GIL while it parses and transforms, so reading a batch
+    overlaps with mapping the previous one, and only prefetch_depth + 1 batches of
+    rows are held in memory.
+
+    The result is the same as running handle_dimensions over the whole file.
+
+    Args:
+        file_path: The path to the input file, an uncompressed CSV file.
+        channel_dict (dict): Mapping dictionary for Channel.
+        language_dict (dict): Mapping dictionary for Language.
+        customfields_dict (dict): Mapping dictionary for CustomFields.
+        schema: Schema the file is read with. Defaults to None (inferred).
+        batch_bytes: Bytes of the file parsed per batch, see
+            src.extract.read_csv_batches. Defaults to DEFAULT_BATCH_BYTES.
+        prefetch_depth: Batches parsed ahead of the one being mapped. With 0 the
+            batches are parsed in this thread. Defaults to 1.
+
+    Returns:
+        pl.DataFrame: DataFrame with aggregated data, as returned by handle_dimensions.
+
+    Raises:
+        FileNotFoundError: if the file does not exist.
+        ValueError: if
+            -the file can not be read in batches, see src.extract.read_csv_batches.
+            -the file is empty, or any batch can not be mapped or aggregated, see
+            handle_dimensions.
+    """
+    batches = read_csv_batches(
+        file_path=file_path, batch_bytes=batch_bytes, schema=schema
+    )
+    if prefetch_depth > 0:
+        batches = prefetch(items=batches, depth=prefetch_depth)
+
+    partial_dfs: List[pl.DataFrame] = []
+    rows = 0
+    # Closed as soon as the loop exits, also on errors, so the prefetch thread stops
+    # instead of waiting for the generator to be garbage collected
+    with closing(batches):
+        for batch_index, batch_df in enumerate(batches):
+            # Every batch has the schema of the first one, so only the first is checked
+            validate = batch_index == 0
+            channel_language_updated_df = map_non_custom_fields_columns(
+                df=batch_df,
+                channel_dict=channel_dict,
+                language_dict=language_dict,
+                validate=validate,
+            )
+            all_dimensions_updated_df = map_custom_fields(
+                df=channel_language_updated_df,
+                mapping_dict=customfields_dict,
+                validate=validate,
+            )
+            partial_dfs.append(
+                aggregate_partial_dimensions(df=all_dimensions_updated_df)
+            )
+            rows += batch_df.height
+
+            if len(partial_dfs) == COMBINE_EVERY:
+                # Batches are concatenated in file order, which keeps the first-seen
+                # order
+                partial_dfs = [
+                    combine_partial_dimensions(
+                        df=pl.concat(partial_dfs, how="vertical")
+                    )
+                ]
+
+    if not partial_dfs:
+        error_message = f"Provided file has no rows: {file_path}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    logger.info(f"{file_path}: {rows} rows mapped in {batch_index + 1} batches")
+
+    return merge_partial_dimensions(df=pl.concat(partial_dfs, how="vertical"))
+
+
+def prefetch(items: Iterator[Item], depth: int = 1) -> Iterator[Item]:
+    """
+    Consumes an iterator in a background thread, up to depth items ahead of the
+    caller. Exceptions of the iterator are raised to the caller. Callers that may
+    stop early should close the returned generator (e.g. with contextlib.closing),
+    which stops the thread and closes the iterator.
+
+    Args:
+        items: The iterator, e.g. src.extract.read_csv_batches.
+        depth: Maximum number of items waiting to be consumed. Defaults to 1.
+
+    Yields:
+        The items, in order.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not _put(buffer=buffer, item=item, stop=stop):
+                    return
+            _put(buffer=buffer, item=done, stop=stop)
+        except Exception as e:
+            # Raised by the consumer, in its own thread
+            _put(buffer=buffer, item=_Failure(exception=e), stop=stop)
+        finally:
+            # The iterator is closed by the thread that runs it
+            if hasattr(items, "close"):
+                items.close()
+
+    thread = threading.Thread(target=produce, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while (item := buffer.get()) is not done:
+            if isinstance(item, _Failure):
+                raise item.exception
+            yield item
+    finally:
+        # Also reached when the caller stops early, the producer then gives up
+        stop.set()
+        thread.join()
+
+
+class _Failure:
+    def __init__(self, exception: Exception) -> None:
+        self.exception = exception
+
+
+def _put(buffer: queue.Queue, item: object, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            buffer.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+
+    return False
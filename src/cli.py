@@ -0,0 +1,126 @@
+"""
+Command line entry point of the mapping job.
+
+Usage:
+    python main.py --input-path data/inputs.csv --mappings-path data/mappings.csv
+    python -m src.cli run --input-path data/inputs.csv --output-dir output
+    python -m src.cli serve --port 8080
+
+Only argparse is imported at start-up. Polars and the pipeline modules are imported
+by the subcommand once the arguments are parsed, so --help and argument errors return
+at once, and a run only loads the modules of the path it takes, see src.pipeline.
+"""
+
+import argparse
+import sys
+from datetime import date
+from typing import List, Optional
+
+COMMANDS = ["run", "serve"]
+
+# Same values as src.drift.DRIFT_MODES, src.load and src.backends, which import Polars
+DRIFT_MODES = ["fail", "warn", "report"]
+OUTPUT_FORMATS = ["parquet", "ipc"]
+BACKENDS = ["polars", "duckdb"]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the parser of the run and serve subcommands.
+
+    Returns:
+        argparse.ArgumentParser: The parser. The dests of the run subcommand are the
+            keyword arguments of src.pipeline.run.
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py", description="Maps SoftwareA data to SoftwareB"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser(
+        "run", help="Runs the mapping job once (the default)"
+    )
+    run_parser.add_argument(
+        "--input-path", default=None, help="Defaults to data/inputs.csv"
+    )
+    run_parser.add_argument(
+        "--mappings-path", default=None, help="Defaults to data/mappings.csv"
+    )
+    run_parser.add_argument("--output-dir", default=None)
+    run_parser.add_argument(
+        "--output-format", choices=OUTPUT_FORMATS, default="parquet"
+    )
+    run_parser.add_argument("--partition-by-channel", action="store_true")
+    run_parser.add_argument("--run-date", type=date.fromisoformat, default=None)
+    run_parser.add_argument("--lazy", action="store_true")
+    run_parser.add_argument("--streaming", action="store_true")
+    run_parser.add_argument("--streaming-chunk-size", type=int, default=None)
+    run_parser.add_argument("--categorical", action="store_true")
+    run_parser.add_argument("--inputs", default=None)
+    run_parser.add_argument("--max-workers", type=int, default=None)
+    run_parser.add_argument("--state-path", default=None)
+    run_parser.add_argument("--mappings-cache-dir", default=None)
+    run_parser.add_argument("--report-path", default=None)
+    run_parser.add_argument("--prometheus-path", default=None)
+    run_parser.add_argument("--profile-dir", default=None)
+    run_parser.add_argument("--partitions", type=int, default=None)
+    run_parser.add_argument("--spill-dir", default=None)
+    run_parser.add_argument("--drift-mode", choices=DRIFT_MODES, default=None)
+    run_parser.add_argument("--drift-threshold", type=float, default=0.0)
+    run_parser.add_argument("--drift-report-path", default=None)
+    run_parser.add_argument("--input-cache-dir", default=None)
+    run_parser.add_argument("--input-cache-max-age", type=float, default=None)
+    run_parser.add_argument("--input-cache-max-bytes", type=int, default=None)
+    run_parser.add_argument("--batch-bytes", type=int, default=None)
+    run_parser.add_argument("--backend", choices=BACKENDS, default="polars")
+    run_parser.add_argument("--database-url", default=None)
+    run_parser.add_argument("--database-table", default=None)
+    run_parser.add_argument("--database-batch-size", type=int, default=None)
+    run_parser.add_argument("--database-upsert", action="store_true")
+
+    # Its options are parsed by src.server.main
+    subparsers.add_parser(
+        "serve", help="Serves the mapping over HTTP, see src.server", add_help=False
+    )
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Parses the command line and runs the subcommand. Without a subcommand the job is
+    run, so `python main.py [options]` keeps working.
+
+    Args:
+        argv: The arguments, without the program name. Defaults to None (sys.argv).
+
+    Returns:
+        int: The exit status. A failed run exits with 1 from src.pipeline.run.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in COMMANDS + ["-h", "--help"]:
+        argv = ["run"] + argv
+
+    parser = build_parser()
+    args, extra_args = parser.parse_known_args(argv)
+
+    if args.command == "serve":
+        from src.server import main as serve
+
+        serve(argv=extra_args)
+        return 0
+
+    if extra_args:
+        parser.error(f"unrecognized arguments: {' '.join(extra_args)}")
+
+    from src.pipeline import run
+
+    kwargs = vars(args)
+    del kwargs["command"]
+    run(**kwargs)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+import polars as pl
+
+from src.utils import get_logger, is_valid
+
+logger = get_logger(name="CONTRACTS")
+
+DataTypes = Tuple[pl.DataType, ...]
+
+STRING: DataTypes = (pl.Utf8,)
+DIMENSION: DataTypes = (pl.Utf8, pl.Categorical)
+INTEGER: DataTypes = (
+    pl.Int8,
+    pl.Int16,
+    pl.Int32,
+    pl.Int64,
+    pl.UInt8,
+    pl.UInt16,
+    pl.UInt32,
+    pl.UInt64,
+)
+
+
+@dataclass(frozen=True)
+class StageContract:
+    # Columns the stage reads, with the dtypes it accepts
+    required: Dict[str, DataTypes]
+    # Columns the stage adds, each one with a fixed dtype or the name of the input
+    # column whose dtype it keeps
+    outputs: Dict[str, Union[str, pl.DataType]]
+    # True when the outputs are the only columns of the result
+    replaces_columns: bool = False
+
+
+_DIMENSIONS_OUTPUTS = {
+    "id": "id",
+    "Channel": "ChannelB",
+    "Language": "LanguageB",
+    "CustomFields": "CustomFieldsB",
+    "Duration": pl.Utf8,
+    "PointsGained": pl.Int64,
+}
+
+_DIMENSIONS_REQUIRED = {
+    "id": INTEGER,
+    "ChannelB": DIMENSION,
+    "LanguageB": DIMENSION,
+    "CustomFieldsB": DIMENSION,
+    "Duration": STRING,
+    "PointsGained": INTEGER,
+}
+
+STAGE_CONTRACTS = {
+    "map_non_custom_fields_columns": StageContract(
+        required={"Channel": DIMENSION, "Language": DIMENSION},
+        outputs={"ChannelB": "Channel", "LanguageB": "Language"},
+    ),
+    "map_custom_fields": StageContract(
+        required={"CustomFields": DIMENSION},
+        outputs={"CustomFieldsB": "CustomFields"},
+    ),
+    "map_dimensions_with_drift": StageContract(
+        required={
+            "Channel": DIMENSION,
+            "Language": DIMENSION,
+            "CustomFields": DIMENSION,
+            "PointsGained": INTEGER,
+        },
+        outputs={
+            "ChannelB": "Channel",
+            "LanguageB": "Language",
+            "CustomFieldsB": "CustomFields",
+        },
+    ),
+    "handle_dimensions": StageContract(
+        required=_DIMENSIONS_REQUIRED,
+        outputs=_DIMENSIONS_OUTPUTS,
+        replaces_columns=True,
+    ),
+    "get_total_points_gained": StageContract(
+        required={"id": INTEGER, "PointsGained": INTEGER},
+        outputs={"TotalPointsGained": pl.Int64},
+    ),
+    "handle_dimensions_with_totals": StageContract(
+        required=_DIMENSIONS_REQUIRED,
+        outputs={**_DIMENSIONS_OUTPUTS, "TotalPointsGained": pl.Int64},
+        replaces_columns=True,
+    ),
+}
+
+PIPELINE_STAGES = [
+    "map_non_custom_fields_columns",
+    "map_custom_fields",
+    "handle_dimensions",
+    "get_total_points_gained",
+]
+
+FUSED_PIPELINE_STAGES = [
+    "map_non_custom_fields_columns",
+    "map_custom_fields",
+    "handle_dimensions_with_totals",
+]
+
+MAPPINGS_REQUIRED = {"Field": STRING, "SoftwareA": STRING, "SoftwareB": STRING}
+
+
+def check_stage(
+    schema: Mapping[str, pl.DataType], stage: str
+) -> Dict[str, pl.DataType]:
+    """
+    Checks a schema against the contract of a stage, without touching any data.
+
+    Args:
+        schema: The schema of the stage input, e.g. DataFrame.schema or
+            LazyFrame.collect_schema().
+        stage: A key of STAGE_CONTRACTS.
+
+    Returns:
+        Dict[str, pl.DataType]: The schema of the stage output.
+
+    Raises:
+        ValueError: if the stage is unknown, or a required column is missing or has
+            a dtype the stage does not accept.
+    """
+    if stage not in STAGE_CONTRACTS:
+        error_message = f"stage must be one of: {list(STAGE_CONTRACTS)}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    contract = STAGE_CONTRACTS[stage]
+    _check_schema(schema=schema, required=contract.required, name=stage)
+
+    outputs = {
+        column: schema[dtype] if isinstance(dtype, str) else dtype
+        for column, dtype in contract.outputs.items()
+    }
+
+    return outputs if contract.replaces_columns else {**schema, **outputs}
+
+
+def validate_pipeline(
+    schema: Mapping[str, pl.DataType], stages: List[str] = PIPELINE_STAGES
+) -> Dict[str, pl.DataType]:
+    """
+    Checks the preconditions of every stage of a pipeline once, up front, by passing
+    the input schema through the stage contracts. The stages can then run with
+    validate=False, so a lazy pipeline is built without resolving its schema at
+    every step.
+
+    Args:
+        schema: The schema of the pipeline input.
+        stages: The stages, in order. Defaults to PIPELINE_STAGES.
+
+    Returns:
+        Dict[str, pl.DataType]: The schema of the pipeline output.
+
+    Raises:
+        ValueError: if any stage contract is not met, see check_stage.
+    """
+    for stage in stages:
+        schema = check_stage(schema=schema, stage=stage)
+
+    return schema
+
+
+def check_frame(df: pl.DataFrame, stage: str) -> None:
+    """
+    Checks a DataFrame is not empty and meets the contract of a stage.
+
+    Args:
+        df: The stage input.
+        stage: A key of STAGE_CONTRACTS.
+
+    Raises:
+        ValueError: if the provided DataFrame is empty, see also check_stage.
+    """
+    if df.is_empty():
+        error_message = "Provided Dataframe is empty"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    check_stage(schema=df.schema, stage=stage)
+
+
+def check_lazy_frame(
+    lf: pl.LazyFrame, stage: str, order_column: Optional[str] = None
+) -> None:
+    """
+    Checks a LazyFrame meets the contract of a stage. Only its schema is resolved,
+    no data is read.
+
+    Args:
+        lf: The stage input.
+        stage: A key of STAGE_CONTRACTS.
+        order_column: A column the stage also needs, if any. Defaults to None.
+
+    Raises:
+        ValueError: if order_column is missing, see also check_stage.
+    """
+    schema = lf.collect_schema()
+    check_stage(schema=schema, stage=stage)
+
+    if order_column and order_column not in schema:
+        error_message = f"Provided LazyFrame must contain column: {order_column}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+
+def check_mapping_dicts(*mapping_dicts: Dict[str, str], error_message: str) -> None:
+    """
+    Checks every mapping is a non-empty dict of strings.
+
+    Args:
+        *mapping_dicts: The mappings to check.
+        error_message: The message of the raised error.
+
+    Raises:
+        ValueError: if any mapping is not valid, see src.utils.is_valid.
+    """
+    if not all(is_valid(mapping_dict) for mapping_dict in mapping_dicts):
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+
+def validate_mappings_frame(df: pl.DataFrame) -> None:
+    """
+    Checks a mappings DataFrame with a dtype check on its schema and a single
+    vectorized null count, instead of checking every compiled dict entry in Python.
+    Dicts compiled from a validated frame only hold non-null strings.
+
+    Args:
+        df: DataFrame with Field, SoftwareA and SoftwareB columns.
+
+    Raises:
+        ValueError: if
+            -the provided DataFrame is empty.
+            -a column is missing or is not a string column.
+            -any SoftwareA or SoftwareB value is null.
+    """
+    if df.is_empty():
+        error_message = "Provided Dataframe is empty"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    _check_schema(schema=df.schema, required=MAPPINGS_REQUIRED, name="mappings")
+
+    if df.select(
+        pl.sum_horizontal(pl.col(["SoftwareA", "SoftwareB"]).null_count())
+    ).item():
+        error_message = "SoftwareA and SoftwareB mappings must not be null"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+
+def _check_schema(
+    schema: Mapping[str, pl.DataType], required: Dict[str, DataTypes], name: str
+) -> None:
+    missing_columns = [column for column in required if column not in schema]
+    if missing_columns:
+        error_message = (
+            f"{name}: provided frame must contain columns: {missing_columns}"
+        )
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    wrong_dtypes = {
+        column: str(schema[column])
+        for column, dtypes in required.items()
+        if not any(schema[column] == dtype for dtype in dtypes)
+    }
+    if wrong_dtypes:
+        error_message = f"{name}: columns with unsupported dtypes: {wrong_dtypes}"
+        logger.error(error_message)
+        raise ValueError(error_message)
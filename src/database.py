@@ -0,0 +1,274 @@
+"""
+Bulk loads the result into a table of a SQLite or Postgres database, for analysts
+to query, e.g. python main.py --database-url sqlite:///results.db --database-upsert.
+
+SQLite rows are inserted with executemany, Postgres rows are streamed with COPY,
+batch_size rows at a time and in a single transaction, so a failed load leaves the
+rows of the table as they were. The table is indexed on (id, run_date). In upsert
+mode the rows of every (run_date, id) of the result replace the ones already loaded,
+so a rerun, or an incremental run returning the updated rows of some ids, does not
+duplicate rows.
+"""
+
+import re
+import sqlite3
+from datetime import date
+from typing import List, Optional, Tuple
+
+import polars as pl
+
+from src.instrumentation import instrumented
+from src.schemas import OUTPUTS_SCHEMA
+from src.utils import get_logger
+
+logger = get_logger(name="DATABASE")
+
+DEFAULT_TABLE = "mapping_results"
+DEFAULT_BATCH_SIZE = 50_000
+
+COLUMNS = ["run_date"] + list(OUTPUTS_SCHEMA)
+
+# SQL types of the COLUMNS per dialect. Ids are UInt32, which does not fit a
+# Postgres INTEGER. SQLite has no date type, ISO dates sort and compare as text.
+SQL_TYPES = {
+    "sqlite": {
+        "run_date": "TEXT NOT NULL",
+        "id": "INTEGER NOT NULL",
+        "PointsGained": "INTEGER",
+        "TotalPointsGained": "INTEGER",
+    },
+    "postgresql": {
+        "run_date": "DATE NOT NULL",
+        "id": "BIGINT NOT NULL",
+        "PointsGained": "BIGINT",
+        "TotalPointsGained": "BIGINT",
+    },
+}
+
+URL_PREFIXES = {
+    "sqlite:///": "sqlite",
+    "postgresql://": "postgresql",
+    "postgres://": "postgresql",
+}
+
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+@instrumented
+def write_database(
+    data: pl.DataFrame,
+    database_url: str,
+    table: str = DEFAULT_TABLE,
+    run_date: Optional[date] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    upsert: bool = False,
+) -> int:
+    """
+    Loads the result into a database table, created with its index if needed.
+
+    Args:
+        data: The result, with the OUTPUTS_SCHEMA columns.
+        database_url: sqlite:///path/to/file.db, or a postgresql:// connection URL
+            (needs the psycopg package).
+        table: Name of the target table. Defaults to DEFAULT_TABLE.
+        run_date: Value of the run_date column. Defaults to today.
+        batch_size: Rows sent per executemany call or COPY write. Defaults to
+            DEFAULT_BATCH_SIZE.
+        upsert: If True, first delete the rows of the (run_date, id) pairs of the
+            result, making the load idempotent. Defaults to False (append).
+
+    Returns:
+        int: The number of loaded rows.
+
+    Raises:
+        ValueError: if
+            -the URL, table name or batch size are not valid.
+            -the result does not contain the OUTPUTS_SCHEMA columns.
+        ImportError: if a Postgres URL is given and psycopg is not installed.
+    """
+    dialect, target = parse_database_url(database_url=database_url)
+
+    if not IDENTIFIER.match(table):
+        error_message = f"Table name must be a plain SQL identifier, got: {table}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if batch_size < 1:
+        error_message = f"batch_size must be at least 1, got: {batch_size}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    missing_columns = [
+        column for column in OUTPUTS_SCHEMA if column not in data.columns
+    ]
+    if missing_columns:
+        error_message = f"Provided Dataframe must contain columns: {missing_columns}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    run_date = run_date or date.today()
+    rows_df = data.select(
+        pl.lit(run_date.isoformat()).alias("run_date"),
+        *[pl.col(column).cast(dtype) for column, dtype in OUTPUTS_SCHEMA.items()],
+    )
+
+    load = _load_sqlite if dialect == "sqlite" else _load_postgresql
+    load(
+        target=target,
+        rows_df=rows_df,
+        run_date=run_date.isoformat(),
+        table=table,
+        batch_size=batch_size,
+        upsert=upsert,
+    )
+
+    logger.info(
+        f"{rows_df.height} rows {'upserted' if upsert else 'loaded'} into {table} "
+        f"({dialect}) for run_date={run_date.isoformat()}"
+    )
+
+    return rows_df.height
+
+
+def parse_database_url(database_url: str) -> Tuple[str, str]:
+    """
+    Splits a database URL into its dialect and the target to connect to.
+
+    Args:
+        database_url: sqlite:///relative.db, sqlite:////absolute.db or a
+            postgresql:// (postgres://) connection URL.
+
+    Returns:
+        Tuple[str, str]: "sqlite" and the database file path, or "postgresql" and the
+            URL.
+
+    Raises:
+        ValueError: if the URL is not a SQLite or Postgres one.
+    """
+    for prefix, dialect in URL_PREFIXES.items():
+        if database_url.startswith(prefix):
+            if dialect == "sqlite":
+                return dialect, database_url[len(prefix) :]
+            return dialect, database_url
+
+    error_message = f"database_url must start with one of: {list(URL_PREFIXES)}"
+    logger.error(error_message)
+    raise ValueError(error_message)
+
+
+def create_table_statements(dialect: str, table: str) -> List[str]:
+    """
+    Returns the statements creating the result table and its (id, run_date) index.
+
+    Args:
+        dialect: "sqlite" or "postgresql".
+        table: Name of the table.
+
+    Returns:
+        List[str]: The CREATE TABLE and CREATE INDEX statements, both IF NOT EXISTS.
+    """
+    column_definitions = ", ".join(
+        f'"{column}" {SQL_TYPES[dialect].get(column, "TEXT")}' for column in COLUMNS
+    )
+
+    return [
+        f"CREATE TABLE IF NOT EXISTS {table} ({column_definitions})",
+        f"CREATE INDEX IF NOT EXISTS {table}_id_run_date ON {table} (id, run_date)",
+    ]
+
+
+def _load_sqlite(
+    target: str,
+    rows_df: pl.DataFrame,
+    run_date: str,
+    table: str,
+    batch_size: int,
+    upsert: bool,
+) -> None:
+    column_names = ", ".join(f'"{column}"' for column in COLUMNS)
+    insert_sql = (
+        f"INSERT INTO {table} ({column_names}) "
+        f"VALUES ({', '.join('?' for _ in COLUMNS)})"
+    )
+
+    connection = sqlite3.connect(target)
+    try:
+        # The context manager commits the transaction, or rolls it back on error
+        with connection:
+            for statement in create_table_statements(dialect="sqlite", table=table):
+                connection.execute(statement)
+
+            if upsert:
+                connection.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS upsert_ids "
+                    "(id INTEGER PRIMARY KEY)"
+                )
+                connection.execute("DELETE FROM upsert_ids")
+                connection.executemany(
+                    "INSERT INTO upsert_ids (id) VALUES (?)",
+                    rows_df.select(pl.col("id").unique()).rows(),
+                )
+                connection.execute(
+                    f"DELETE FROM {table} WHERE run_date = ? "
+                    "AND id IN (SELECT id FROM upsert_ids)",
+                    (run_date,),
+                )
+
+            for batch_df in rows_df.iter_slices(n_rows=batch_size):
+                connection.executemany(insert_sql, batch_df.rows())
+    finally:
+        connection.close()
+
+
+def _load_postgresql(
+    target: str,
+    rows_df: pl.DataFrame,
+    run_date: str,
+    table: str,
+    batch_size: int,
+    upsert: bool,
+) -> None:
+    try:
+        import psycopg
+    except ImportError as e:
+        error_message = "Loading into Postgres needs the psycopg package installed"
+        logger.error(error_message)
+        raise ImportError(error_message) from e
+
+    column_names = ", ".join(f'"{column}"' for column in COLUMNS)
+    # Upserts are copied into a staging table first, then replace the rows of their
+    # ids in the same transaction
+    copy_table = f"{table}_staging" if upsert else table
+
+    # The connection context manager commits, or rolls back on error
+    with psycopg.connect(target) as connection, connection.cursor() as cursor:
+        for statement in create_table_statements(dialect="postgresql", table=table):
+            cursor.execute(statement)
+
+        if upsert:
+            cursor.execute(
+                f"CREATE TEMP TABLE {copy_table} (LIKE {table}) ON COMMIT DROP"
+            )
+
+        with cursor.copy(
+            f"COPY {copy_table} ({column_names}) FROM STDIN "
+            "WITH (FORMAT csv, NULL '\\N')"
+        ) as copy:
+            for batch_df in rows_df.iter_slices(n_rows=batch_size):
+                copy.write(_csv_batch(batch_df=batch_df))
+
+        if upsert:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE run_date = %s "
+                f"AND id IN (SELECT id FROM {copy_table})",
+                (run_date,),
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({column_names}) "
+                f"SELECT {column_names} FROM {copy_table}"
+            )
+
+
+def _csv_batch(batch_df: pl.DataFrame) -> str:
+    # \N tells nulls apart from empty strings, as in the COPY statement
+    return batch_df.write_csv(include_header=False, null_value="\\N")
@@ -0,0 +1,404 @@
+import os
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, Optional
+
+import polars as pl
+
+from src.contracts import check_frame, check_lazy_frame, check_mapping_dicts
+from src.duration import Frame
+from src.extract import DIMENSION_COLUMNS
+from src.instrumentation import instrumented
+from src.schemas import DRIFT_SCHEMA
+from src.transform import (
+    map_custom_fields,
+    map_custom_fields_lazy,
+    map_non_custom_fields_columns,
+    map_non_custom_fields_columns_lazy,
+)
+from src.utils import get_logger
+
+logger = get_logger(name="DRIFT")
+
+DRIFT_MODES = ["fail", "warn", "report"]
+
+MAPPED_COLUMNS = ["ChannelB", "LanguageB", "CustomFieldsB"]
+
+# Values listed in the log message, the report file has all of them
+TOP_VALUES = 5
+
+
+@dataclass
+class MappingDrift:
+    total_rows: int
+    unmapped_rows: int
+    # One row per unmapped Channel, Language or CustomFields key=value token
+    unmapped_values: pl.DataFrame
+
+    @property
+    def unmapped_share(self) -> float:
+        return self.unmapped_rows / self.total_rows if self.total_rows else 0.0
+
+
+@instrumented
+def map_dimensions_with_drift(
+    df: pl.DataFrame,
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    customfields_dict: Dict[str, str],
+    on_drift: Callable[[MappingDrift], None],
+    validate: bool = True,
+) -> pl.DataFrame:
+    """
+    Maps the Channel, Language and CustomFields columns and finds the values missing
+    from the mappings in the same pass.
+
+    The rows are grouped once by their Channel, Language and CustomFields values,
+    counting rows and PointsGained. The mappings run on those few distinct
+    combinations, which are joined back to the rows, and the same counts give the
+    unmapped values, so the drift check does not scan the rows a second time.
+
+    Args:
+        df (pl.DataFrame): Input DataFrame with Channel, Language, CustomFields and
+            PointsGained columns.
+        channel_dict (dict): Mapping dictionary for Channel.
+        language_dict (dict): Mapping dictionary for Language.
+        customfields_dict (dict): Mapping dictionary for CustomFields.
+        on_drift: Called with the MappingDrift before the rows are mapped, e.g.
+            handle_mapping_drift with its mode bound. Its exceptions are propagated.
+        validate (bool): If False, skip the checks below, e.g. after
+            src.contracts.validate_pipeline with dicts from get_mappings_dict. Defaults
+            to True.
+
+    Returns:
+        pl.DataFrame: DataFrame with new columns 'ChannelB', 'LanguageB' and
+            'CustomFieldsB',
+            as returned by map_custom_fields.
+
+    Raises:
+        ValueError: if
+            -the provided DataFrame is empty.
+            -the provided DataFrame does not meet the map_dimensions_with_drift
+            contract.
+            -the provided mappings are not dicts where key and values are strings and
+            not None.
+    """
+    if validate:
+        check_frame(df=df, stage="map_dimensions_with_drift")
+        _check_drift_mapping_dicts(channel_dict, language_dict, customfields_dict)
+
+    counts_df = _report_drift(
+        counts_df=_count_dimensions(frame=df),
+        channel_dict=channel_dict,
+        language_dict=language_dict,
+        customfields_dict=customfields_dict,
+        on_drift=on_drift,
+    )
+    # The counts keep the dtypes of the checked input columns
+    mapped_counts_df = map_custom_fields(
+        df=map_non_custom_fields_columns(
+            df=counts_df,
+            channel_dict=channel_dict,
+            language_dict=language_dict,
+            validate=False,
+        ),
+        mapping_dict=customfields_dict,
+        validate=False,
+    )
+
+    return _join_mapped(frame=df, mapped_counts=mapped_counts_df)
+
+
+@instrumented
+def map_dimensions_with_drift_lazy(
+    lf: pl.LazyFrame,
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    customfields_dict: Dict[str, str],
+    on_drift: Callable[[MappingDrift], None],
+    validate: bool = True,
+) -> pl.LazyFrame:
+    """
+    LazyFrame counterpart of map_dimensions_with_drift.
+
+    The drift is found while the plan runs and on_drift is called from within it, so
+    the result can still be collected or profiled with a single scan of the input.
+    That scan is cached, which Polars' streaming engine can not run: collected with
+    streaming=True the plan runs on the in-memory engine, and it can not be sunk.
+
+    Args:
+        lf (pl.LazyFrame): Input LazyFrame with Channel, Language, CustomFields and
+            PointsGained columns.
+        channel_dict (dict): Mapping dictionary for Channel.
+        language_dict (dict): Mapping dictionary for Language.
+        customfields_dict (dict): Mapping dictionary for CustomFields.
+        on_drift: Called with the MappingDrift when the plan runs. Its exceptions fail
+            the collection of the plan with a polars.exceptions.ComputeError.
+        validate (bool): See map_dimensions_with_drift. Defaults to True.
+
+    Returns:
+        pl.LazyFrame: LazyFrame with new columns 'ChannelB', 'LanguageB' and
+            'CustomFieldsB'.
+
+    Raises:
+        ValueError: if
+            -the provided LazyFrame does not meet the map_dimensions_with_drift
+            contract.
+            -the provided mappings are not dicts where key and values are strings and
+            not None.
+    """
+    if validate:
+        check_lazy_frame(lf=lf, stage="map_dimensions_with_drift")
+        _check_drift_mapping_dicts(channel_dict, language_dict, customfields_dict)
+
+    # The rows and the counts read different columns, without an explicit cache the
+    # optimizer would give each of them its own scan of the input
+    lf = lf.cache()
+
+    # The mappings read the counts more than once, the final cache checks them once
+    counts_lf = (
+        _count_dimensions(frame=lf)
+        .map_batches(
+            partial(
+                _report_drift,
+                channel_dict=channel_dict,
+                language_dict=language_dict,
+                customfields_dict=customfields_dict,
+                on_drift=on_drift,
+            ),
+            # Without it the Rows and PointsGained counts would be pruned away
+            projection_pushdown=False,
+        )
+        .cache()
+    )
+    mapped_counts_lf = map_custom_fields_lazy(
+        lf=map_non_custom_fields_columns_lazy(
+            lf=counts_lf,
+            channel_dict=channel_dict,
+            language_dict=language_dict,
+            validate=False,
+        ),
+        mapping_dict=customfields_dict,
+        validate=False,
+    )
+
+    return _join_mapped(frame=lf, mapped_counts=mapped_counts_lf)
+
+
+@instrumented
+def find_mapping_drift(
+    counts_df: pl.DataFrame,
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    customfields_dict: Dict[str, str],
+) -> MappingDrift:
+    """
+    Finds the Channel and Language values and CustomFields key=value tokens that are
+    not in the mappings, so they are passed through unchanged by the mapping.
+
+    Args:
+        counts_df (pl.DataFrame): Rows and PointsGained per distinct Channel, Language
+            and CustomFields values, as counted by map_dimensions_with_drift.
+        channel_dict (dict): Mapping dictionary for Channel.
+        language_dict (dict): Mapping dictionary for Language.
+        customfields_dict (dict): Mapping dictionary for CustomFields.
+
+    Returns:
+        MappingDrift: The total and unmapped row counts, and the unmapped values with
+            the rows and PointsGained they carry (DRIFT_SCHEMA), most frequent first.
+            A row with several unmapped values counts once in unmapped_rows and once
+            for each value.
+    """
+    # Only the distinct combinations are processed here, not the rows
+    counts_df = counts_df.with_columns(
+        pl.col(DIMENSION_COLUMNS).cast(pl.Utf8),
+    ).with_columns(
+        # Empty tokens (e.g. of a trailing ";") are passed through, they are not a drift
+        pl.col("CustomFields")
+        .str.split(";")
+        .list.eval(pl.element().filter(pl.element() != ""))
+        .list.unique()
+        .alias("Tokens"),
+    )
+
+    unmapped_exprs = {
+        "Channel": _is_unmapped(column="Channel", mapping_dict=channel_dict),
+        "Language": _is_unmapped(column="Language", mapping_dict=language_dict),
+    }
+
+    unmapped_values = [
+        counts_df.filter(is_unmapped)
+        .group_by(column)
+        .agg(pl.sum("Rows"), pl.sum("PointsGained"))
+        .select(
+            pl.lit(column).alias("Field"),
+            pl.col(column).alias("Value"),
+            "Rows",
+            "PointsGained",
+        )
+        for column, is_unmapped in unmapped_exprs.items()
+    ]
+    unmapped_values.append(
+        counts_df.explode("Tokens")
+        .filter(_is_unmapped(column="Tokens", mapping_dict=customfields_dict))
+        .group_by("Tokens")
+        .agg(pl.sum("Rows"), pl.sum("PointsGained"))
+        .select(
+            pl.lit("CustomFields").alias("Field"),
+            pl.col("Tokens").alias("Value"),
+            "Rows",
+            "PointsGained",
+        )
+    )
+
+    has_unmapped_token = (
+        pl.col("Tokens")
+        .list.eval(
+            pl.element().is_not_null()
+            & pl.element().is_in(list(customfields_dict)).not_()
+        )
+        .list.any()
+    )
+    unmapped_rows = counts_df.filter(
+        pl.any_horizontal(list(unmapped_exprs.values()) + [has_unmapped_token])
+    )["Rows"].sum()
+
+    return MappingDrift(
+        total_rows=counts_df["Rows"].sum(),
+        unmapped_rows=unmapped_rows,
+        unmapped_values=pl.concat(unmapped_values)
+        .cast(DRIFT_SCHEMA)
+        .sort(["Rows", "Field", "Value"], descending=[True, False, False]),
+    )
+
+
+def handle_mapping_drift(
+    drift: MappingDrift,
+    mode: str = "warn",
+    threshold: float = 0.0,
+    report_path: Optional[str] = None,
+) -> None:
+    """
+    Acts on the drift found by find_mapping_drift.
+
+    Args:
+        drift: The drift of the run.
+        mode: What to do when the share of rows with unmapped values is above the
+            threshold: "fail" raises, "warn" logs a warning and "report" only logs it.
+            Defaults to "warn".
+        threshold: Share of the rows (0 to 1) allowed to have unmapped values. Defaults
+            to 0.0 (any unmapped value).
+        report_path: If given, the unmapped values are written there as a ";" separated
+            CSV, also when the run fails. Defaults to None.
+
+    Raises:
+        ValueError: if
+            -the mode or the threshold are not valid.
+            -the mode is "fail" and the share of rows with unmapped values is above the
+            threshold.
+    """
+    if mode not in DRIFT_MODES:
+        error_message = f"mode must be one of: {DRIFT_MODES}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if not 0 <= threshold <= 1:
+        error_message = "threshold must be between 0 and 1"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if report_path:
+        _write_report(df=drift.unmapped_values, path=report_path)
+
+    if drift.unmapped_rows == 0:
+        logger.info("all values are mapped")
+        return
+
+    top_values = ", ".join(
+        f"{field}={value!r} ({rows} rows)"
+        for field, value, rows in drift.unmapped_values.head(TOP_VALUES)
+        .select("Field", "Value", "Rows")
+        .iter_rows()
+    )
+    message = (
+        f"{drift.unmapped_rows} of {drift.total_rows} rows "
+        f"({drift.unmapped_share:.2%}) have values missing from the mappings, "
+        f"{drift.unmapped_values.height} unmapped values: {top_values}"
+    )
+
+    if drift.unmapped_share <= threshold or mode == "report":
+        logger.info(message)
+    elif mode == "warn":
+        logger.warning(message)
+    else:
+        logger.error(message)
+        raise ValueError(message)
+
+
+def _check_drift_mapping_dicts(
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    customfields_dict: Dict[str, str],
+) -> None:
+    check_mapping_dicts(
+        channel_dict,
+        language_dict,
+        customfields_dict,
+        error_message=(
+            "Channel, Language and CustomField dicts should be non-empty dicts of "
+            "strings"
+        ),
+    )
+
+
+def _report_drift(
+    counts_df: pl.DataFrame,
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    customfields_dict: Dict[str, str],
+    on_drift: Callable[[MappingDrift], None],
+) -> pl.DataFrame:
+    on_drift(
+        find_mapping_drift(
+            counts_df=counts_df,
+            channel_dict=channel_dict,
+            language_dict=language_dict,
+            customfields_dict=customfields_dict,
+        )
+    )
+
+    return counts_df
+
+
+def _count_dimensions(frame: Frame) -> Frame:
+    return frame.group_by(DIMENSION_COLUMNS).agg(
+        pl.len().alias("Rows"),
+        pl.col("PointsGained").cast(pl.Int64).sum().alias("PointsGained"),
+    )
+
+
+def _join_mapped(frame: Frame, mapped_counts: Frame) -> Frame:
+    # A left join keeps the row order. Null dimensions must match too, otherwise
+    # a row with a null Channel would lose its mapped Language.
+    return frame.join(
+        mapped_counts.select(DIMENSION_COLUMNS + MAPPED_COLUMNS),
+        on=DIMENSION_COLUMNS,
+        how="left",
+        join_nulls=True,
+    )
+
+
+def _is_unmapped(column: str, mapping_dict: Dict[str, str]) -> pl.Expr:
+    # Nulls are passed through by the mapping too, but they are not a drift
+    return (
+        pl.col(column).is_not_null() & pl.col(column).is_in(list(mapping_dict)).not_()
+    )
+
+
+def _write_report(df: pl.DataFrame, path: str) -> None:
+    # Written next to the target and renamed, so readers never see a partial report
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    df.write_csv(tmp_path, separator=";")
+    os.replace(tmp_path, path)
+    logger.info(f"mapping drift report written to {path}")
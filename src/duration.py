@@ -0,0 +1,106 @@
+import polars as pl
+from typing import TypeVar
+
+Frame = TypeVar("Frame", pl.DataFrame, pl.LazyFrame)
+
+
+def with_duration_seconds(
+    frame: Frame, column: str = "Duration", alias: str = "TotalSeconds"
+) -> Frame:
+    """
+    Parses an H:MM:SS string column into an Int64 number of seconds.
+
+    The string is split once into its components instead of running one regex
+    per component. Values that are not H:MM:SS (parts that are not plain digits,
+    e.g. signed, missing or extra parts, minutes or seconds above 59) are parsed as
+    null, use is_malformed_duration to tell them apart from missing values. Before
+    this parser, minutes and seconds above 59 were summed as they were ("0:90:00"
+    was 5400 seconds), they are now malformed.
+
+    Args:
+        frame: DataFrame or LazyFrame containing the H:MM:SS column.
+        column: The name of the H:MM:SS column. Defaults to "Duration".
+        alias: The name of the new seconds column. Defaults to "TotalSeconds".
+
+    Returns:
+        The frame with the new Int64 seconds column.
+    """
+    parts_column = f"__{column}_parts"
+    parts = pl.col(parts_column)
+
+    # Unsigned casts already turn negative components into nulls, but accept a
+    # leading "+"
+    hours = parts.struct.field("hours").cast(pl.UInt32, strict=False)
+    minutes = parts.struct.field("minutes").cast(pl.UInt8, strict=False)
+    seconds = parts.struct.field("seconds").cast(pl.UInt8, strict=False)
+
+    is_well_formed = (
+        # only filled when the value has more than two colons
+        parts.struct.field("extra").is_null()
+        & (minutes < 60)
+        & (seconds < 60)
+        & ~pl.col(column).str.contains("+", literal=True)
+    )
+
+    # The split is materialized on its own, deriving every component from a
+    # single split expression makes Polars evaluate the split once per component
+    return (
+        frame.with_columns(
+            pl.col(column)
+            .str.split_exact(":", 3)
+            .struct.rename_fields(["hours", "minutes", "seconds", "extra"])
+            .alias(parts_column)
+        )
+        .with_columns(
+            pl.when(is_well_formed)
+            .then(
+                hours.cast(pl.Int64) * 3600
+                + minutes.cast(pl.Int64) * 60
+                + seconds.cast(pl.Int64)
+            )
+            .alias(alias)
+        )
+        .drop(parts_column)
+    )
+
+
+def is_malformed_duration(
+    column: str = "Duration", seconds_column: str = "TotalSeconds"
+) -> pl.Expr:
+    """
+    Flags values that are present but could not be parsed by with_duration_seconds.
+
+    Args:
+        column: The name of the H:MM:SS column. Defaults to "Duration".
+        seconds_column: The name of the parsed seconds column. Defaults to
+            "TotalSeconds".
+
+    Returns:
+        pl.Expr: Boolean expression, True for malformed values.
+    """
+    return pl.col(column).is_not_null() & pl.col(seconds_column).is_null()
+
+
+def seconds_to_duration(column: str = "TotalSeconds") -> pl.Expr:
+    """
+    Formats an integer number of seconds back into an H:MM:SS string.
+
+    Args:
+        column: The name of the seconds column. Defaults to "TotalSeconds".
+
+    Returns:
+        pl.Expr: Expression evaluating to the H:MM:SS string.
+    """
+    total_seconds = pl.col(column)
+
+    return pl.concat_str(
+        [
+            # hours only need one digit
+            (total_seconds // 3600).cast(pl.Utf8),
+            # zfill(2) ensures that minutes and seconds have two digits ("03" instead
+            # of "3")
+            ((total_seconds % 3600) // 60).cast(pl.Utf8).str.zfill(2),
+            (total_seconds % 60).cast(pl.Utf8).str.zfill(2),
+        ],
+        separator=":",
+    )
@@ -1,31 +1,278 @@
+import io
 import os
 import polars as pl
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Iterator, Optional
 
+from src.contracts import validate_mappings_frame
+from src.instrumentation import instrumented
 from src.utils import get_logger
 
 logger = get_logger(name="EXTRACT")
 
 
-def get_df_from_csv(file_path: str, separator: str = ";") -> pl.DataFrame:
+DIMENSION_COLUMNS = ["Channel", "Language", "CustomFields"]
+
+# Field values of mappings.csv, in the order get_mappings_dict returns them
+MAPPING_FIELDS = ["Channel", "Language", "CustomFields"]
+
+# Bytes read per batch by read_csv_batches
+DEFAULT_BATCH_BYTES = 64 * 1024 * 1024
+
+# Leading bytes of every supported format, checked before the file extension
+MAGIC_BYTES = {
+    b"\x1f\x8b": "csv.gz",
+    b"\x28\xb5\x2f\xfd": "csv.zst",
+    b"PAR1": "parquet",
+    b"ARROW1": "ipc",
+}
+
+EXTENSIONS = {
+    ".gz": "csv.gz",
+    ".zst": "csv.zst",
+    ".parquet": "parquet",
+    ".arrow": "ipc",
+    ".ipc": "ipc",
+    ".feather": "ipc",
+}
+
+
+def detect_file_format(file_path: str) -> str:
+    """
+    Detects the format of an input file from its magic bytes, then from its extension.
+
+    Args:
+        file_path: The path to the file.
+
+    Returns:
+        str: One of "csv", "csv.gz", "csv.zst", "parquet" or "ipc".
+    """
+    with open(file_path, "rb") as file:
+        header = file.read(8)
+
+    for magic_bytes, file_format in MAGIC_BYTES.items():
+        if header.startswith(magic_bytes):
+            return file_format
+
+    return EXTENSIONS.get(os.path.splitext(file_path)[1].lower(), "csv")
+
+
+@instrumented
+def get_df_from_csv(
+    file_path: str,
+    separator: str = ";",
+    schema: Optional[Dict[str, pl.DataType]] = None,
+    schema_overrides: Optional[Dict[str, pl.DataType]] = None,
+) -> pl.DataFrame:
     """
     This function takes a path to a CSV file and returns a Polars DataFrame.
 
+    gzip/zstd compressed CSV, Parquet and Arrow IPC files are read too, the format
+    is detected with detect_file_format. Uncompressed CSV and IPC are memory-mapped.
+
     Args:
         file_path: The path to the CSV file intended to be used.
         separator: The delimeter used in the CSV file. Defaults to ";".
+        schema: Full schema of the file, see src.schemas. CSV files are decoded with it
+            (no inference pass, a value of the wrong type fails the read), Parquet and
+            IPC files are cast to it. Defaults to None.
+        schema_overrides: Dtypes to use for some columns instead of the inferred ones,
+            e.g. pl.Categorical for the DIMENSION_COLUMNS. Defaults to None.
 
     Returns:
         pl.DataFrame: A DataFrame that contains the CSV data.
 
     Raises:
         FileNotFoundError: if the provided path leads to a file that does not exist.
+        ValueError: if the header of an uncompressed CSV file does not match the schema.
     """
     if not os.path.exists(path=file_path):
         e = f"File not found: {file_path}"
         logger.error(e)
         raise FileNotFoundError(e)
-    return pl.read_csv(source=file_path, separator=separator)
+
+    file_format = detect_file_format(file_path=file_path)
+
+    if file_format == "parquet":
+        df = pl.read_parquet(source=file_path, memory_map=True)
+    elif file_format == "ipc":
+        df = pl.read_ipc(source=file_path, memory_map=True)
+    else:
+        if schema and file_format == "csv":
+            check_csv_header(file_path=file_path, separator=separator, schema=schema)
+
+        # Polars memory-maps local CSV files and decompresses gzip/zstd ones itself
+        return pl.read_csv(
+            source=file_path,
+            separator=separator,
+            schema=schema,
+            schema_overrides=schema_overrides,
+        )
+
+    dtypes = {**(schema or {}), **(schema_overrides or {})}
+
+    return df.cast(dtypes) if dtypes else df
+
+
+@instrumented
+def scan_df_from_csv(
+    file_path: str,
+    separator: str = ";",
+    row_index_name: Optional[str] = None,
+    schema: Optional[Dict[str, pl.DataType]] = None,
+    schema_overrides: Optional[Dict[str, pl.DataType]] = None,
+) -> pl.LazyFrame:
+    """
+    This function takes a path to a CSV file and returns a Polars LazyFrame.
+
+    Nothing is read until the LazyFrame is collected, which lets Polars push
+    projections and predicates down into the scan. Like get_df_from_csv, compressed
+    CSV, Parquet and Arrow IPC files are supported.
+
+    Args:
+        file_path: The path to the CSV file intended to be used.
+        separator: The delimeter used in the CSV file. Defaults to ";".
+        row_index_name: If given, a row index column with this name is added by the scan
+            itself, which keeps the plan streamable. Defaults to None.
+        schema: Full schema of the file, see src.schemas. CSV files are decoded with it
+            (no inference pass, a value of the wrong type fails the read), Parquet and
+            IPC files are cast to it. Defaults to None.
+        schema_overrides: Dtypes to use for some columns instead of the inferred ones,
+            e.g. pl.Categorical for the DIMENSION_COLUMNS. Defaults to None.
+
+    Returns:
+        pl.LazyFrame: A LazyFrame that scans the CSV data.
+
+    Raises:
+        FileNotFoundError: if the provided path leads to a file that does not exist.
+        ValueError: if the header of an uncompressed CSV file does not match the schema.
+    """
+    if not os.path.exists(path=file_path):
+        e = f"File not found: {file_path}"
+        logger.error(e)
+        raise FileNotFoundError(e)
+
+    file_format = detect_file_format(file_path=file_path)
+
+    if file_format == "parquet":
+        lf = pl.scan_parquet(source=file_path, row_index_name=row_index_name)
+    elif file_format == "ipc":
+        lf = pl.scan_ipc(
+            source=file_path, memory_map=True, row_index_name=row_index_name
+        )
+    else:
+        if schema and file_format == "csv":
+            check_csv_header(file_path=file_path, separator=separator, schema=schema)
+
+        return pl.scan_csv(
+            source=file_path,
+            separator=separator,
+            row_index_name=row_index_name,
+            schema=schema,
+            schema_overrides=schema_overrides,
+        )
+
+    dtypes = {**(schema or {}), **(schema_overrides or {})}
+
+    return lf.cast(dtypes) if dtypes else lf
+
+
+def read_csv_batches(
+    file_path: str,
+    batch_bytes: int = DEFAULT_BATCH_BYTES,
+    separator: str = ";",
+    schema: Optional[Dict[str, pl.DataType]] = None,
+) -> Iterator[pl.DataFrame]:
+    """
+    Reads an uncompressed CSV file in batches, so files too big to be read whole can
+    be processed with bounded memory.
+
+    The file is split into byte ranges of about batch_bytes cut at line boundaries,
+    and every range is parsed like get_df_from_csv parses the whole file. Fields must
+    not contain quoted line breaks.
+
+    Args:
+        file_path: The path to the CSV file intended to be used.
+        batch_bytes: Bytes of the file parsed per batch, bounding the memory used by
+            a batch. Defaults to DEFAULT_BATCH_BYTES (64 MiB).
+        separator: The delimeter used in the CSV file. Defaults to ";".
+        schema: Full schema of the file, see src.schemas. Defaults to None (inferred
+            from the first batch and used for the next ones).
+
+    Yields:
+        pl.DataFrame: The batches, in file order.
+
+    Raises:
+        FileNotFoundError: if the provided path leads to a file that does not exist.
+        ValueError: if
+            -the file is not an uncompressed CSV file, or batch_bytes is not positive.
+            -the header of the file does not match the schema.
+    """
+    if not os.path.exists(path=file_path):
+        e = f"File not found: {file_path}"
+        logger.error(e)
+        raise FileNotFoundError(e)
+
+    if detect_file_format(file_path=file_path) != "csv" or batch_bytes < 1:
+        error_message = (
+            "Only uncompressed CSV files can be read in batches of a positive size, "
+            "use get_df_from_csv"
+        )
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if schema:
+        check_csv_header(file_path=file_path, separator=separator, schema=schema)
+
+    with open(file_path, "rb") as file:
+        # Every range is parsed with the header, which also drops a leading BOM
+        header = file.readline()
+        remainder = b""
+        while block := file.read(batch_bytes):
+            block = remainder + block
+            end = block.rfind(b"\n") + 1
+            remainder = block[end:]
+            if end:
+                batch_df = _read_csv_bytes(header + block[:end], separator, schema)
+                schema = schema or batch_df.schema
+                yield batch_df
+
+        # The last line may have no line break
+        if remainder.strip():
+            yield _read_csv_bytes(header + remainder, separator, schema)
+
+
+def _read_csv_bytes(
+    data: bytes, separator: str, schema: Optional[Dict[str, pl.DataType]]
+) -> pl.DataFrame:
+    return pl.read_csv(source=io.BytesIO(data), separator=separator, schema=schema)
+
+
+def check_csv_header(
+    file_path: str, separator: str, schema: Dict[str, pl.DataType]
+) -> None:
+    """
+    Checks that the header of an uncompressed CSV file lists the schema columns, in
+    order.
+
+    Args:
+        file_path: The path to the CSV file.
+        separator: The delimeter used in the CSV file.
+        schema: The schema the file is read with.
+
+    Raises:
+        ValueError: if the header does not match the schema.
+    """
+    # With a schema Polars names the columns by position and ignores the header, so
+    # a reordered file would be read silently. utf-8-sig drops the BOM of the exports.
+    with open(file_path, encoding="utf-8-sig") as file:
+        header = file.readline().rstrip("\r\n").split(separator)
+
+    if header != list(schema):
+        error_message = (
+            f"Header of {file_path} is {header}, expected columns: {list(schema)}"
+        )
+        logger.error(error_message)
+        raise ValueError(error_message)
 
 
 def filter_and_get_dict(df: pl.DataFrame, field_name: str) -> Dict[str, str]:
@@ -33,23 +280,28 @@ def filter_and_get_dict(df: pl.DataFrame, field_name: str) -> Dict[str, str]:
     return {row["SoftwareA"]: row["SoftwareB"] for row in filtered_df.to_dicts()}
 
 
+@instrumented
 def get_mappings_dict(
     df: pl.DataFrame,
 ) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
-    required_columns = ["Field", "SoftwareA", "SoftwareB"]
+    validate_mappings_frame(df=df)
 
-    if df.is_empty():
-        error_message = "Provided Dataframe is empty"
-        logger.error(error_message)
-        raise ValueError(error_message)
+    # One pass splits the mappings by Field, instead of one filter per field
+    partitions = df.select("Field", "SoftwareA", "SoftwareB").partition_by(
+        "Field", as_dict=True, include_key=False
+    )
 
-    if not all(column in df.columns for column in required_columns):
-        error_message = f"Provided Dataframe must contain columns: {required_columns}"
-        logger.error(error_message)
-        raise ValueError(error_message)
-
-    channel_mapping = filter_and_get_dict(df=df, field_name="Channel")
-    language_mapping = filter_and_get_dict(df=df, field_name="Language")
-    customfields_mapping = filter_and_get_dict(df=df, field_name="CustomFields")
+    channel_mapping, language_mapping, customfields_mapping = (
+        _partition_to_dict(partitions.get((field_name,)))
+        for field_name in MAPPING_FIELDS
+    )
 
     return channel_mapping, language_mapping, customfields_mapping
+
+
+def _partition_to_dict(df: Optional[pl.DataFrame]) -> Dict[str, str]:
+    if df is None:
+        return {}
+
+    # Later rows win on duplicated SoftwareA values, as in filter_and_get_dict
+    return dict(zip(df["SoftwareA"].to_list(), df["SoftwareB"].to_list()))
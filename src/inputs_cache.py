@@ -0,0 +1,166 @@
+import glob
+import hashlib
+import os
+import time
+from typing import Dict, List, Optional
+
+import polars as pl
+
+from src.extract import get_df_from_csv
+from src.instrumentation import instrumented
+from src.utils import get_logger
+
+logger = get_logger(name="INPUTS_CACHE")
+
+# Bump when the cached format changes, so older cache files are not read
+CACHE_VERSION = 1
+
+CACHE_PATTERN = f"inputs-v{CACHE_VERSION}-*.arrow"
+
+# Read size used to hash the source file without holding it in memory
+HASH_CHUNK_SIZE = 1 << 20
+
+
+@instrumented
+def load_inputs(
+    file_path: str,
+    schema: Optional[Dict[str, pl.DataType]] = None,
+    cache_dir: Optional[str] = None,
+    max_age_seconds: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+) -> pl.DataFrame:
+    """
+    Reads an input file with get_df_from_csv, caching the parsed and typed DataFrame.
+
+    The DataFrame is written to cache_dir as an Arrow IPC file keyed by the source
+    path, size, mtime, content hash and schema, so a rerun over the same input
+    memory-maps it instead of parsing the CSV again. Hashing the file is a single
+    sequential read, far cheaper than decoding it.
+
+    Args:
+        file_path: The path to the input file.
+        schema: Full schema of the file, see get_df_from_csv. Defaults to None.
+        cache_dir: Directory of the cached inputs. Defaults to None (no cache).
+        max_age_seconds: If given, cached inputs not used for longer are evicted, see
+            evict_inputs_cache. Defaults to None.
+        max_bytes: If given, the least recently used cached inputs are evicted until
+            the cache fits in it, see evict_inputs_cache. Defaults to None.
+
+    Returns:
+        pl.DataFrame: The DataFrame returned by get_df_from_csv.
+
+    Raises:
+        FileNotFoundError: if the file does not exist.
+        ValueError: if the header of the file does not match the schema.
+    """
+    if cache_dir is None:
+        return get_df_from_csv(file_path=file_path, schema=schema)
+
+    if not os.path.exists(path=file_path):
+        e = f"File not found: {file_path}"
+        logger.error(e)
+        raise FileNotFoundError(e)
+
+    cache_path = os.path.join(
+        cache_dir,
+        CACHE_PATTERN.replace("*", _cache_key(file_path=file_path, schema=schema)),
+    )
+
+    if os.path.exists(cache_path):
+        logger.info(f"memory-mapping cached inputs from {cache_path}")
+        df = pl.read_ipc(source=cache_path, memory_map=True)
+        # The mtime of an entry is its last use, which drives the eviction
+        os.utime(cache_path)
+    else:
+        df = get_df_from_csv(file_path=file_path, schema=schema)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        # Renamed into place, so a concurrent run never reads a partial file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        df.write_ipc(tmp_path)
+        os.replace(tmp_path, cache_path)
+        logger.info(f"parsed inputs cached in {cache_path}")
+
+    if max_age_seconds is not None or max_bytes is not None:
+        evict_inputs_cache(
+            cache_dir=cache_dir,
+            max_age_seconds=max_age_seconds,
+            max_bytes=max_bytes,
+            keep_path=cache_path,
+        )
+
+    return df
+
+
+def evict_inputs_cache(
+    cache_dir: str,
+    max_age_seconds: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+    keep_path: Optional[str] = None,
+) -> List[str]:
+    """
+    Removes stale cached inputs: the ones not used for more than max_age_seconds,
+    then the least recently used ones until the cache fits in max_bytes.
+
+    Args:
+        cache_dir: Directory of the cached inputs.
+        max_age_seconds: Maximum time since the last use of an entry. Defaults to
+            None (no age limit).
+        max_bytes: Maximum total size of the entries. Defaults to None (no size limit).
+        keep_path: An entry that is never removed, e.g. the one just read. Defaults
+            to None.
+
+    Returns:
+        List[str]: The paths of the removed entries.
+
+    Raises:
+        ValueError: if max_age_seconds or max_bytes is negative.
+    """
+    if (max_age_seconds is not None and max_age_seconds < 0) or (
+        max_bytes is not None and max_bytes < 0
+    ):
+        error_message = "max_age_seconds and max_bytes must not be negative"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    # Most recently used first
+    entries = sorted(
+        (
+            (path, os.stat(path))
+            for path in glob.glob(os.path.join(cache_dir, CACHE_PATTERN))
+        ),
+        key=lambda entry: entry[1].st_mtime,
+        reverse=True,
+    )
+
+    now = time.time()
+    total_bytes = 0
+    removed_paths = []
+    for path, stat in entries:
+        if path != keep_path and (
+            (max_age_seconds is not None and now - stat.st_mtime > max_age_seconds)
+            or (max_bytes is not None and total_bytes + stat.st_size > max_bytes)
+        ):
+            # A run still mapping the entry keeps its pages until it is done
+            os.remove(path)
+            removed_paths.append(path)
+        else:
+            total_bytes += stat.st_size
+
+    if removed_paths:
+        logger.info(f"evicted {len(removed_paths)} cached inputs from {cache_dir}")
+
+    return removed_paths
+
+
+def _cache_key(file_path: str, schema: Optional[Dict[str, pl.DataType]]) -> str:
+    stat = os.stat(file_path)
+    key = hashlib.sha256(
+        f"{os.path.realpath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{schema}".encode()
+    )
+
+    with open(file_path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            key.update(chunk)
+
+    return key.hexdigest()
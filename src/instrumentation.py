@@ -0,0 +1,323 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Callable, Iterator, List, Optional, TypeVar
+
+import polars as pl
+
+from src.utils import get_logger
+
+logger = get_logger(name="INSTRUMENTATION")
+
+PROMETHEUS_PREFIX = "mapping_job"
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# Period of the RSS samples taking the peak of every stage
+SAMPLE_INTERVAL_SECONDS = 0.005
+
+Function = TypeVar("Function", bound=Callable[..., Any])
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    depth: int
+    wall_seconds: float
+    cpu_seconds: float
+    input_rows: Optional[int]
+    output_rows: Optional[int]
+    output_estimated_bytes: Optional[int]
+    rss_bytes: int
+    # Peak RSS while the stage ran, sampled, see RssSampler
+    peak_rss_bytes: int
+    # The exception of a failed stage
+    error: Optional[str] = None
+
+
+@dataclass
+class RunReport:
+    started_at: str
+    status: str = "running"
+    wall_seconds: Optional[float] = None
+    cpu_seconds: Optional[float] = None
+    peak_rss_bytes: Optional[int] = None
+    stages: List[StageMetrics] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the report in the Prometheus text exposition format, for the
+        node_exporter textfile collector.
+        """
+        run_metrics = {
+            "run_success": (
+                "Whether the last run succeeded.",
+                int(self.status == "success"),
+            ),
+            "run_wall_seconds": ("Wall time of the last run.", self.wall_seconds),
+            "run_cpu_seconds": ("CPU time of the last run.", self.cpu_seconds),
+            "run_peak_rss_bytes": ("Peak RSS of the last run.", self.peak_rss_bytes),
+        }
+        stage_metrics = {
+            "stage_wall_seconds": "Wall time of a stage of the last run.",
+            "stage_cpu_seconds": "CPU time of a stage of the last run.",
+            "stage_input_rows": "Input rows of a stage of the last run.",
+            "stage_output_rows": "Output rows of a stage of the last run.",
+            "stage_output_estimated_bytes": (
+                "Estimated output size of a stage of the last run."
+            ),
+            "stage_peak_rss_bytes": "Peak RSS during a stage of the last run.",
+        }
+
+        lines = []
+        for name, (help_text, value) in run_metrics.items():
+            if value is None:
+                continue
+            lines += _prometheus_header(name=name, help_text=help_text)
+            lines.append(f"{PROMETHEUS_PREFIX}_{name} {value}")
+
+        for name, help_text in stage_metrics.items():
+            attribute = name.removeprefix("stage_")
+            samples = [
+                (step, stage, getattr(stage, attribute))
+                for step, stage in enumerate(self.stages)
+                if getattr(stage, attribute) is not None
+            ]
+            if not samples:
+                continue
+            lines += _prometheus_header(name=name, help_text=help_text)
+            lines += [
+                f'{PROMETHEUS_PREFIX}_{name}{{stage="{stage.name}",step="{step}"}} '
+                f"{value}"
+                for step, stage, value in samples
+            ]
+
+        return "\n".join(lines) + "\n"
+
+
+_current_report: ContextVar[Optional[RunReport]] = ContextVar(
+    "current_report", default=None
+)
+_current_depth: ContextVar[int] = ContextVar("current_depth", default=0)
+_current_sampler: ContextVar[Optional["RssSampler"]] = ContextVar(
+    "current_sampler", default=None
+)
+
+
+@dataclass(eq=False)
+class RssWindow:
+    # Highest RSS sampled since the window was opened
+    peak_bytes: int
+
+
+class RssSampler:
+    """
+    Samples the RSS of the process from a background thread and keeps the highest
+    value of every open window, so each stage gets the peak of its own run instead
+    of the all-time peak of the process (ru_maxrss).
+
+    The samples are taken every interval_seconds and when a window is opened and
+    closed, so spikes shorter than the interval may be missed. Polars releases the
+    GIL while it computes, so the thread keeps sampling during its stages.
+    """
+
+    def __init__(self, interval_seconds: float = SAMPLE_INTERVAL_SECONDS) -> None:
+        self.interval_seconds = interval_seconds
+        self._windows: List[RssWindow] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="rss-sampler", daemon=True
+        )
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def open_window(self) -> RssWindow:
+        window = RssWindow(peak_bytes=rss_bytes())
+        with self._lock:
+            self._windows.append(window)
+        return window
+
+    def close_window(self, window: RssWindow) -> int:
+        self._sample()
+        with self._lock:
+            self._windows.remove(window)
+        return window.peak_bytes
+
+    def _sample(self) -> None:
+        current_bytes = rss_bytes()
+        with self._lock:
+            for window in self._windows:
+                window.peak_bytes = max(window.peak_bytes, current_bytes)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self._sample()
+
+
+def instrumented(function: Function) -> Function:
+    """
+    Decorates a pipeline stage so every call is recorded in the active run report,
+    see record_run. Without an active report the stage runs untouched.
+
+    The input rows are taken from the first DataFrame argument and the output rows and
+    estimated size from a DataFrame result. LazyFrames only get timings, as counting
+    their rows would execute the plan. A stage that raises is recorded too, with its
+    exception in error, before the exception is propagated.
+    """
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        report = _current_report.get()
+        if report is None:
+            return function(*args, **kwargs)
+
+        input_df = next(
+            (
+                value
+                for value in list(args) + list(kwargs.values())
+                if isinstance(value, pl.DataFrame)
+            ),
+            None,
+        )
+
+        # Set by record_run together with the report
+        sampler = _current_sampler.get()
+        window = sampler.open_window()
+        depth = _current_depth.get()
+        depth_token = _current_depth.set(depth + 1)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        result = None
+        error = None
+        try:
+            result = function(*args, **kwargs)
+            return result
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_depth.reset(depth_token)
+
+            is_df = isinstance(result, pl.DataFrame)
+            report.stages.append(
+                StageMetrics(
+                    name=function.__name__,
+                    depth=depth,
+                    wall_seconds=round(time.perf_counter() - start_wall, 6),
+                    cpu_seconds=round(time.process_time() - start_cpu, 6),
+                    input_rows=input_df.height if input_df is not None else None,
+                    output_rows=result.height if is_df else None,
+                    output_estimated_bytes=result.estimated_size() if is_df else None,
+                    rss_bytes=rss_bytes(),
+                    peak_rss_bytes=sampler.close_window(window),
+                    error=error,
+                )
+            )
+
+    return wrapper
+
+
+@contextmanager
+def record_run(
+    report_path: Optional[str] = None, prometheus_path: Optional[str] = None
+) -> Iterator[Optional[RunReport]]:
+    """
+    Records the instrumented stages run inside the block into a RunReport, written
+    on exit, also when the run fails, as JSON to report_path and in the Prometheus
+    textfile format to prometheus_path.
+
+    Args:
+        report_path: Path of the JSON report. Defaults to None (not written).
+        prometheus_path: Path of the Prometheus textfile. Defaults to None (not
+            written).
+
+    Yields:
+        RunReport: The report being recorded, or None when no path is given.
+    """
+    if report_path is None and prometheus_path is None:
+        yield None
+        return
+
+    report = RunReport(started_at=datetime.now(timezone.utc).isoformat())
+    report_token = _current_report.set(report)
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+
+    with RssSampler() as sampler:
+        sampler_token = _current_sampler.set(sampler)
+        run_window = sampler.open_window()
+        try:
+            yield report
+            report.status = "success"
+        except BaseException:
+            report.status = "failed"
+            raise
+        finally:
+            _current_sampler.reset(sampler_token)
+            _current_report.reset(report_token)
+            report.wall_seconds = round(time.perf_counter() - start_wall, 6)
+            report.cpu_seconds = round(time.process_time() - start_cpu, 6)
+            report.peak_rss_bytes = sampler.close_window(run_window)
+
+            if report_path:
+                _write_atomically(path=report_path, content=report.to_json())
+            if prometheus_path:
+                _write_atomically(path=prometheus_path, content=report.to_prometheus())
+            logger.info(
+                f"run report ({report.status}, {len(report.stages)} stages) written"
+            )
+
+
+def rss_bytes() -> int:
+    """
+    Current resident set size of the process. Polars allocates outside of Python's
+    allocator, so tracemalloc can not see its memory.
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """
+    Peak resident set size of the process so far.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _prometheus_header(name: str, help_text: str) -> List[str]:
+    return [
+        f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}",
+        f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge",
+    ]
+
+
+def _write_atomically(path: str, content: str) -> None:
+    # Scrapers like the textfile collector must never read a half written file
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        file.write(content)
+    os.replace(tmp_path, path)
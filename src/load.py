@@ -0,0 +1,218 @@
+import os
+import shutil
+from datetime import date
+from typing import List, Optional, Union
+from urllib.parse import quote
+
+import polars as pl
+
+from src.instrumentation import instrumented
+from src.utils import get_logger
+
+logger = get_logger(name="LOAD")
+
+OUTPUT_FORMATS = {"parquet": "parquet", "ipc": "arrow"}
+
+# Hive partition value of nulls, read back as null by Polars, Spark or Athena
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+@instrumented
+def write_output(
+    data: Union[pl.DataFrame, pl.LazyFrame],
+    output_dir: str,
+    file_format: str = "parquet",
+    run_date: Optional[date] = None,
+    partition_by_channel: bool = False,
+    row_group_size: int = 512_000,
+    compression_level: Optional[int] = None,
+) -> List[str]:
+    """
+    Writes the result as zstd-compressed Parquet or Arrow IPC files, hive-partitioned
+    by run date (and optionally by Channel), e.g.
+    output_dir/run_date=2024-11-20/part-0.parquet. Rows with a null Channel are written
+    to the NULL_PARTITION partition.
+
+    LazyFrames are sunk with sink_parquet/sink_ipc so the result does not have to be
+    materialized. If Polars can not stream the plan, it is collected and written
+    instead. The files of a previous run with the same run date are replaced once
+    the new ones are written.
+
+    Args:
+        data: The result to write, eager or lazy.
+        output_dir: Root directory of the hive-partitioned dataset.
+        file_format: "parquet" or "ipc". Defaults to "parquet".
+        run_date: Value of the run_date partition. Defaults to today.
+        partition_by_channel: If True, add a Channel=<value> partition level.
+            Defaults to False.
+        row_group_size: Rows per Parquet row group, each one with min/max statistics so
+            readers like Athena or DuckDB can prune them. Defaults to 512_000.
+        compression_level: zstd compression level. Defaults to None (Polars' default).
+
+    Returns:
+        List[str]: The paths of the written files.
+
+    Raises:
+        ValueError: if the file format is not supported.
+    """
+    if file_format not in OUTPUT_FORMATS:
+        error_message = f"file_format must be one of: {list(OUTPUT_FORMATS)}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    run_date = run_date or date.today()
+    run_dir_name = f"run_date={run_date.isoformat()}"
+    run_dir = os.path.join(output_dir, run_dir_name)
+
+    # The files are written next to run_dir and swapped in at the end, so those of a
+    # previous run (other Channels, or a flat file) are replaced as a whole, and a
+    # failed write leaves them as they were. Hive readers skip dot directories.
+    staging_dir = os.path.join(output_dir, f".{run_dir_name}.tmp")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    try:
+        staged_paths = _write_files(
+            data=data,
+            directory=staging_dir,
+            file_format=file_format,
+            partition_by_channel=partition_by_channel,
+            row_group_size=row_group_size,
+            compression_level=compression_level,
+        )
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.rename(staging_dir, run_dir)
+
+    paths = [
+        os.path.join(run_dir, os.path.relpath(path, staging_dir))
+        for path in staged_paths
+    ]
+    logger.info(f"{len(paths)} {file_format} files written to {run_dir}")
+
+    return paths
+
+
+def _write_files(
+    data: Union[pl.DataFrame, pl.LazyFrame],
+    directory: str,
+    file_format: str,
+    partition_by_channel: bool,
+    row_group_size: int,
+    compression_level: Optional[int],
+) -> List[str]:
+    file_name = f"part-0.{OUTPUT_FORMATS[file_format]}"
+
+    if isinstance(data, pl.LazyFrame):
+        if not partition_by_channel:
+            path = _prepare_path(directory=directory, file_name=file_name)
+            try:
+                _sink(
+                    lf=data,
+                    path=path,
+                    file_format=file_format,
+                    row_group_size=row_group_size,
+                    compression_level=compression_level,
+                )
+                return [path]
+            except pl.exceptions.InvalidOperationError as e:
+                logger.warning(f"plan can not be streamed, collecting it instead: {e}")
+
+        data = data.collect()
+
+    if partition_by_channel:
+        partitions = data.partition_by("Channel", as_dict=True, maintain_order=True)
+    else:
+        partitions = {(None,): data}
+
+    paths = []
+    for (channel,), partition_df in partitions.items():
+        partition_dir = directory
+        if partition_by_channel:
+            # Hive partition values are percent-encoded so they are valid dir names
+            value = NULL_PARTITION if channel is None else quote(str(channel), safe="")
+            partition_dir = os.path.join(directory, f"Channel={value}")
+
+        path = _prepare_path(directory=partition_dir, file_name=file_name)
+        _write(
+            df=partition_df,
+            path=path,
+            file_format=file_format,
+            row_group_size=row_group_size,
+            compression_level=compression_level,
+        )
+        paths.append(path)
+
+    return paths
+
+
+def read_output(paths: List[str], file_format: str = "parquet") -> pl.DataFrame:
+    """
+    Reads back the files written by write_output, in order.
+
+    Args:
+        paths: The paths returned by write_output.
+        file_format: "parquet" or "ipc". Defaults to "parquet".
+
+    Returns:
+        pl.DataFrame: The written rows, without the hive partition columns.
+
+    Raises:
+        ValueError: if the file format is not supported.
+    """
+    if file_format not in OUTPUT_FORMATS:
+        error_message = f"file_format must be one of: {list(OUTPUT_FORMATS)}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if file_format == "parquet":
+        frames = [pl.read_parquet(path, hive_partitioning=False) for path in paths]
+    else:
+        frames = [pl.read_ipc(path, memory_map=False) for path in paths]
+
+    return pl.concat(frames)
+
+
+def _prepare_path(directory: str, file_name: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, file_name)
+
+
+def _sink(
+    lf: pl.LazyFrame,
+    path: str,
+    file_format: str,
+    row_group_size: int,
+    compression_level: Optional[int],
+) -> None:
+    if file_format == "parquet":
+        lf.sink_parquet(
+            path=path,
+            compression="zstd",
+            compression_level=compression_level,
+            statistics=True,
+            row_group_size=row_group_size,
+        )
+    else:
+        lf.sink_ipc(path=path, compression="zstd")
+
+
+def _write(
+    df: pl.DataFrame,
+    path: str,
+    file_format: str,
+    row_group_size: int,
+    compression_level: Optional[int],
+) -> None:
+    if file_format == "parquet":
+        df.write_parquet(
+            file=path,
+            compression="zstd",
+            compression_level=compression_level,
+            statistics=True,
+            row_group_size=row_group_size,
+        )
+    else:
+        df.write_ipc(file=path, compression="zstd")
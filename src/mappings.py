@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+from src.extract import MAPPING_FIELDS, get_df_from_csv, get_mappings_dict
+from src.instrumentation import instrumented
+from src.schemas import MAPPINGS_SCHEMA
+from src.utils import get_logger
+
+logger = get_logger(name="MAPPINGS")
+
+# Bump when the compiled format changes, so older cache files are not read
+CACHE_VERSION = 1
+
+
+@instrumented
+def load_mappings(
+    file_path: str, cache_dir: Optional[str] = None
+) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+    """
+    Loads the Channel, Language and CustomFields mapping dicts of a mappings file.
+
+    The compiled and validated dicts are cached in cache_dir under the hash of the
+    file content, so later runs with unchanged mappings read one small JSON file
+    instead of parsing and compiling the CSV again.
+
+    Args:
+        file_path: The path to the mappings file.
+        cache_dir: Directory of the compiled mappings. Defaults to None (no cache).
+
+    Returns:
+        Tuple: The channel, language and custom fields mapping dicts, as returned by
+            src.extract.get_mappings_dict.
+
+    Raises:
+        FileNotFoundError: if the file does not exist.
+        ValueError: if the mappings are empty, miss columns or contain nulls.
+    """
+    if cache_dir is None:
+        return _compile_mappings(file_path=file_path)
+
+    cache_path = os.path.join(
+        cache_dir, f"mappings-v{CACHE_VERSION}-{_file_hash(file_path)}.json"
+    )
+
+    if os.path.exists(cache_path):
+        logger.info(f"loading compiled mappings from {cache_path}")
+        with open(cache_path, encoding="utf-8") as file:
+            compiled = json.load(file)
+        return tuple(compiled[field_name] for field_name in MAPPING_FIELDS)
+
+    mapping_dicts = _compile_mappings(file_path=file_path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Renamed into place, so a concurrent run never reads a partial file
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(dict(zip(MAPPING_FIELDS, mapping_dicts)), file, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+    logger.info(f"compiled mappings cached in {cache_path}")
+
+    return mapping_dicts
+
+
+def _compile_mappings(
+    file_path: str,
+) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+    mappings_df = get_df_from_csv(file_path=file_path, schema=MAPPINGS_SCHEMA)
+    return get_mappings_dict(df=mappings_df)
+
+
+def _file_hash(file_path: str) -> str:
+    with open(file_path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
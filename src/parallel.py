@@ -0,0 +1,166 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
+
+import polars as pl
+
+from src.extract import get_df_from_csv
+from src.instrumentation import instrumented
+from src.transform import (
+    aggregate_partial_dimensions,
+    map_custom_fields,
+    map_non_custom_fields_columns,
+    merge_partial_dimensions,
+)
+from src.utils import get_logger
+
+logger = get_logger(name="PARALLEL")
+
+MAPPED_DIMENSIONS = ["ChannelB", "LanguageB", "CustomFieldsB"]
+
+
+@instrumented
+def handle_dimensions_files(
+    file_paths: List[str],
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    customfields_dict: Dict[str, str],
+    schema: Optional[Dict[str, pl.DataType]] = None,
+    max_workers: Optional[int] = None,
+) -> pl.DataFrame:
+    """
+    Maps and aggregates several input files concurrently, one process per file, and
+    merges their partial aggregates so ids spread over several files (e.g. one export
+    per team and day) are aggregated together.
+
+    The result is the same as running handle_dimensions over the concatenation of
+    the files, in the given file order.
+
+    Args:
+        file_paths: The input files, see src.utils.obtain_file_paths.
+        channel_dict (dict): Mapping dictionary for Channel.
+        language_dict (dict): Mapping dictionary for Language.
+        customfields_dict (dict): Mapping dictionary for CustomFields.
+        schema: Schema the files are read with. Defaults to None (inferred).
+        max_workers: Number of worker processes. With 1, or a single file, the files
+            are processed sequentially in this process. Defaults to None (CPU count).
+
+    Returns:
+        pl.DataFrame: DataFrame with aggregated data, as returned by handle_dimensions.
+
+    Raises:
+        ValueError: if
+            -no file path is provided.
+            -any file can not be mapped or aggregated, see handle_dimensions.
+    """
+    categorical = bool(schema) and any(
+        dtype == pl.Categorical for dtype in schema.values()
+    )
+
+    partial_df = aggregate_partial_files(
+        file_paths=file_paths,
+        channel_dict=channel_dict,
+        language_dict=language_dict,
+        customfields_dict=customfields_dict,
+        schema=schema,
+        max_workers=max_workers,
+    )
+
+    result_df = merge_partial_dimensions(df=partial_df)
+
+    if categorical:
+        result_df = result_df.with_columns(
+            pl.col(["Channel", "Language", "CustomFields"]).cast(pl.Categorical)
+        )
+
+    return result_df
+
+
+@instrumented
+def aggregate_partial_files(
+    file_paths: List[str],
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    customfields_dict: Dict[str, str],
+    schema: Optional[Dict[str, pl.DataType]] = None,
+    max_workers: Optional[int] = None,
+) -> pl.DataFrame:
+    """
+    Maps several input files concurrently, one process per file, and returns their
+    partial aggregates (see src.transform.aggregate_partial_dimensions) concatenated
+    in file order. The mapped dimensions are always plain strings.
+
+    Args:
+        file_paths: The input files, see src.utils.obtain_file_paths.
+        channel_dict (dict): Mapping dictionary for Channel.
+        language_dict (dict): Mapping dictionary for Language.
+        customfields_dict (dict): Mapping dictionary for CustomFields.
+        schema: Schema the files are read with. Defaults to None (inferred).
+        max_workers: Number of worker processes. With 1, or a single file, the files
+            are processed sequentially in this process. Defaults to None (CPU count).
+
+    Returns:
+        pl.DataFrame: The partial aggregates of every file.
+
+    Raises:
+        ValueError: if
+            -no file path is provided.
+            -any file can not be mapped or aggregated, see handle_dimensions.
+    """
+    if not file_paths:
+        error_message = "At least one input file must be provided"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if schema and any(dtype == pl.Categorical for dtype in schema.values()):
+        # Categorical codes are local to each process, workers map plain strings
+        schema = {
+            column: pl.Utf8 if dtype == pl.Categorical else dtype
+            for column, dtype in schema.items()
+        }
+
+    process_file = partial(
+        _aggregate_file,
+        channel_dict=channel_dict,
+        language_dict=language_dict,
+        customfields_dict=customfields_dict,
+        schema=schema,
+    )
+
+    if max_workers == 1 or len(file_paths) == 1:
+        logger.info(f"processing {len(file_paths)} files sequentially")
+        partial_dfs = [process_file(file_path) for file_path in file_paths]
+    else:
+        logger.info(f"processing {len(file_paths)} files in a process pool")
+        # spawn, as forking a process with Polars' thread pool running can deadlock
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            # map keeps the file order, so the merge keeps the first-seen order
+            partial_dfs = list(executor.map(process_file, file_paths))
+
+    return pl.concat(partial_dfs, how="vertical")
+
+
+def _aggregate_file(
+    file_path: str,
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    customfields_dict: Dict[str, str],
+    schema: Optional[Dict[str, pl.DataType]],
+) -> pl.DataFrame:
+    # Runs in the worker processes, only the small partial aggregate is sent back
+    inputs_df = get_df_from_csv(file_path=file_path, schema=schema)
+
+    channel_language_updated_df = map_non_custom_fields_columns(
+        df=inputs_df, channel_dict=channel_dict, language_dict=language_dict
+    )
+    all_dimensions_updated_df = map_custom_fields(
+        df=channel_language_updated_df, mapping_dict=customfields_dict
+    )
+
+    partial_df = aggregate_partial_dimensions(df=all_dimensions_updated_df)
+    logger.info(f"{file_path}: {inputs_df.height} rows -> {partial_df.height} groups")
+
+    return partial_df.with_columns(pl.col(MAPPED_DIMENSIONS).cast(pl.Utf8))
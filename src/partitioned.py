@@ -0,0 +1,227 @@
+import glob
+import multiprocessing
+import os
+import shutil
+import tempfile
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
+
+import polars as pl
+
+from src.extract import scan_df_from_csv
+from src.instrumentation import instrumented
+from src.schemas import INPUTS_SCHEMA
+from src.transform import (
+    aggregate_partial_dimensions,
+    get_total_points_gained,
+    map_custom_fields,
+    map_non_custom_fields_columns,
+    merge_partial_dimensions,
+)
+from src.utils import get_logger
+
+logger = get_logger(name="PARTITIONED")
+
+ROW_INDEX_COLUMN = "__row_nr"
+SHARD_COLUMN = "__shard"
+
+# Fixed, so a row always lands in the same shard for a given Polars version
+HASH_SEED = 0
+
+# Rows of the spilled input split at a time, every batch adds one part file per shard
+SPLIT_BATCH_ROWS = 1_000_000
+
+
+@instrumented
+def run_partitioned(
+    file_path: str,
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    customfields_dict: Dict[str, str],
+    shards: int,
+    spill_dir: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> pl.DataFrame:
+    """
+    Runs the whole transform over hash partitions of the input.
+
+    handle_dimensions and get_total_points_gained only combine rows with the same id,
+    so the rows are split by hash(id) % shards into Arrow IPC spill files, every
+    shard is transformed on its own in a worker process, and the shard results are
+    concatenated and put back in the input order (by the first row of every group).
+    No process holds more than one shard of rows, and the result is identical to
+    the single-process path.
+
+    Args:
+        file_path: The input file, see src.extract.scan_df_from_csv for the formats.
+        channel_dict (dict): Mapping dictionary for Channel.
+        language_dict (dict): Mapping dictionary for Language.
+        customfields_dict (dict): Mapping dictionary for CustomFields.
+        shards: Number of hash partitions.
+        spill_dir: Directory of the spill files, they are kept there for inspection
+            or to be shipped to other machines until the next run with the same
+            spill_dir replaces them. Defaults to None (a temporary directory removed
+            afterwards).
+        max_workers: Number of worker processes. With 1 the shards are processed
+            sequentially in this process. Defaults to None (CPU count).
+
+    Returns:
+        pl.DataFrame: The transformed data, as returned by main.run.
+
+    Raises:
+        ValueError: if
+            -shards is lower than 1.
+            -the input is empty or any shard can not be transformed, see src.transform.
+    """
+    if shards < 1:
+        error_message = "shards must be at least 1"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if spill_dir is not None:
+        os.makedirs(spill_dir, exist_ok=True)
+
+    with (
+        tempfile.TemporaryDirectory() if spill_dir is None else nullcontext(spill_dir)
+    ) as directory:
+        shard_paths = partition_by_id(
+            file_path=file_path, shards=shards, spill_dir=directory
+        )
+
+        process_shard = partial(
+            _transform_shard,
+            channel_dict=channel_dict,
+            language_dict=language_dict,
+            customfields_dict=customfields_dict,
+        )
+
+        if max_workers == 1:
+            logger.info(f"processing {shards} shards sequentially")
+            result_paths = [process_shard(shard_path) for shard_path in shard_paths]
+        else:
+            logger.info(f"processing {shards} shards in a process pool")
+            # spawn, as forking a process with Polars' thread pool running can deadlock
+            with ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                result_paths = list(executor.map(process_shard, shard_paths))
+
+        result_paths = [path for path in result_paths if path is not None]
+        if not result_paths:
+            error_message = "Provided Dataframe is empty"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+        # Groups of different shards never share an id, so sorting the concatenated
+        # results by first-seen row restores the single-process order
+        return (
+            pl.concat([pl.read_ipc(path, memory_map=False) for path in result_paths])
+            .sort(ROW_INDEX_COLUMN)
+            .drop(ROW_INDEX_COLUMN)
+        )
+
+
+def partition_by_id(
+    file_path: str,
+    shards: int,
+    spill_dir: str,
+    batch_rows: int = SPLIT_BATCH_ROWS,
+) -> List[str]:
+    """
+    Splits an input file by hash(id) % shards into one directory of Arrow IPC files
+    per shard.
+
+    The input is streamed once into a single uncompressed spill file with its row
+    index and shard. The spill file is then memory-mapped and read once, batch_rows
+    rows at a time: every batch is partitioned by shard and each part is appended to
+    its shard directory. Every row is therefore read and written a fixed number of
+    times whatever the number of shards, and only one batch is in memory at a time.
+
+    Args:
+        file_path: The input file.
+        shards: Number of hash partitions.
+        spill_dir: Directory of the spill files.
+        batch_rows: Rows of the spill file split at a time. Defaults to
+            SPLIT_BATCH_ROWS.
+
+    Returns:
+        List[str]: The directory of every shard, in shard order. A shard without
+            rows has no part files.
+    """
+    all_rows_path = os.path.join(spill_dir, "inputs.arrow")
+    # Uncompressed, so the split below maps the file instead of decompressing it
+    scan_df_from_csv(
+        file_path=file_path, row_index_name=ROW_INDEX_COLUMN, schema=INPUTS_SCHEMA
+    ).with_columns(
+        (pl.col("id").hash(seed=HASH_SEED) % shards).cast(pl.UInt32).alias(SHARD_COLUMN)
+    ).sink_ipc(all_rows_path, compression=None)
+
+    shard_paths = [
+        os.path.join(spill_dir, f"shard-{shard:04d}") for shard in range(shards)
+    ]
+    for shard_path in shard_paths:
+        # A reused spill_dir still holds the parts and result of the previous run,
+        # which would be merged into this one
+        shutil.rmtree(shard_path, ignore_errors=True)
+        if os.path.exists(_result_path(shard_path=shard_path)):
+            os.remove(_result_path(shard_path=shard_path))
+        os.makedirs(shard_path)
+
+    all_rows_df = pl.read_ipc(all_rows_path, memory_map=True)
+    for batch_index, batch_df in enumerate(all_rows_df.iter_slices(n_rows=batch_rows)):
+        for (shard,), shard_df in batch_df.partition_by(
+            SHARD_COLUMN, include_key=False, as_dict=True
+        ).items():
+            shard_df.write_ipc(
+                os.path.join(shard_paths[shard], f"part-{batch_index:05d}.arrow")
+            )
+    # The mapping must be released before the file is removed
+    del all_rows_df
+
+    os.remove(all_rows_path)
+    logger.info(f"{file_path} split into {shards} shards in {spill_dir}")
+
+    return shard_paths
+
+
+def _transform_shard(
+    shard_path: str,
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    customfields_dict: Dict[str, str],
+) -> Optional[str]:
+    # Runs in the worker processes, the result is spilled too instead of pickled back
+    part_paths = sorted(glob.glob(os.path.join(shard_path, "*.arrow")))
+    if not part_paths:
+        return None
+
+    # The parts are in batch order, so the rows keep the input order
+    inputs_df = pl.concat(
+        [pl.read_ipc(part_path, memory_map=False) for part_path in part_paths]
+    )
+
+    channel_language_updated_df = map_non_custom_fields_columns(
+        df=inputs_df, channel_dict=channel_dict, language_dict=language_dict
+    )
+    all_dimensions_updated_df = map_custom_fields(
+        df=channel_language_updated_df, mapping_dict=customfields_dict
+    )
+    unique_dimensions_df = merge_partial_dimensions(
+        df=aggregate_partial_dimensions(
+            df=all_dimensions_updated_df, order_column=ROW_INDEX_COLUMN
+        ),
+        order_column=ROW_INDEX_COLUMN,
+    )
+    result_df = get_total_points_gained(df=unique_dimensions_df)
+
+    result_path = _result_path(shard_path=shard_path)
+    result_df.write_ipc(result_path)
+    logger.info(f"{shard_path}: {inputs_df.height} rows -> {result_df.height} rows")
+
+    return result_path
+
+
+def _result_path(shard_path: str) -> str:
+    return f"{shard_path}.result.arrow"
@@ -0,0 +1,741 @@
+import os
+import polars as pl
+import sys
+from contextlib import nullcontext
+from datetime import date
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from src.utils import obtain_file_path, obtain_file_paths, get_logger
+from src.extract import (
+    DIMENSION_COLUMNS,
+    get_df_from_csv,
+    scan_df_from_csv,
+)
+from src.contracts import FUSED_PIPELINE_STAGES, validate_pipeline
+from src.inputs_cache import load_inputs
+from src.instrumentation import record_run
+from src.load import read_output, write_output
+from src.mappings import load_mappings
+from src.profiling import (
+    PROFILE_DIR_ENV,
+    create_run_profile_dir,
+    profile_eager,
+    profile_lazy,
+)
+from src.schemas import INPUTS_SCHEMA
+from src.transform import (
+    map_non_custom_fields_columns,
+    map_custom_fields,
+    get_total_points_gained,
+    handle_dimensions_with_totals,
+    map_non_custom_fields_columns_lazy,
+    map_custom_fields_lazy,
+    handle_dimensions_with_totals_lazy,
+)
+
+# src.backends, src.batched, src.database, src.drift, src.parallel, src.partitioned and
+# src.state are imported by the paths that use them, so the default run does not pay
+# for them (nor for multiprocessing) at start-up, see src.cli
+
+logger = get_logger(name="MAIN")
+
+ROW_INDEX_COLUMN = "__row_nr"
+
+# Options of run that select how the job runs, each one with the options it can not
+# be combined with. backend is set when it is not "polars".
+INCOMPATIBLE_OPTIONS = {
+    "lazy": [
+        "inputs",
+        "state_path",
+        "partitions",
+        "input_cache_dir",
+        "batch_bytes",
+        "backend",
+    ],
+    "streaming": [
+        "inputs",
+        "state_path",
+        "partitions",
+        "input_cache_dir",
+        "batch_bytes",
+        "backend",
+    ],
+    "inputs": ["partitions", "drift_mode", "input_cache_dir", "batch_bytes", "backend"],
+    "state_path": [
+        "partitions",
+        "drift_mode",
+        "input_cache_dir",
+        "batch_bytes",
+        "backend",
+    ],
+    "partitions": ["drift_mode", "input_cache_dir", "batch_bytes", "backend"],
+    "drift_mode": ["batch_bytes", "backend"],
+    "input_cache_dir": ["batch_bytes", "backend"],
+    "batch_bytes": ["backend"],
+    "categorical": ["backend"],
+}
+
+
+def run(
+    input_path: Optional[str] = None,
+    mappings_path: Optional[str] = None,
+    lazy: bool = False,
+    streaming: bool = False,
+    streaming_chunk_size: Optional[int] = None,
+    categorical: bool = False,
+    output_dir: Optional[str] = None,
+    output_format: str = "parquet",
+    partition_by_channel: bool = False,
+    run_date: Optional[date] = None,
+    inputs: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    state_path: Optional[str] = None,
+    mappings_cache_dir: Optional[str] = None,
+    report_path: Optional[str] = None,
+    prometheus_path: Optional[str] = None,
+    profile_dir: Optional[str] = None,
+    partitions: Optional[int] = None,
+    spill_dir: Optional[str] = None,
+    drift_mode: Optional[str] = None,
+    drift_threshold: float = 0.0,
+    drift_report_path: Optional[str] = None,
+    input_cache_dir: Optional[str] = None,
+    input_cache_max_age: Optional[float] = None,
+    input_cache_max_bytes: Optional[int] = None,
+    batch_bytes: Optional[int] = None,
+    backend: str = "polars",
+    database_url: Optional[str] = None,
+    database_table: Optional[str] = None,
+    database_batch_size: Optional[int] = None,
+    database_upsert: bool = False,
+) -> pl.DataFrame:
+    """
+    Runs the whole mapping job over an input file and a mappings file.
+
+    Args:
+        input_path: The path to the input file. Defaults to None (data/inputs.csv).
+        mappings_path: The path to the mappings file. Defaults to None
+            (data/mappings.csv).
+        lazy: If True, build a single query plan from pl.scan_csv and collect it
+            once at the end instead of materializing every stage. Defaults to False.
+        streaming: If True, collect the lazy plan with Polars' streaming engine so
+            inputs larger than memory are processed in batches. Implies lazy.
+            Defaults to False.
+        streaming_chunk_size: Rows per batch used by the streaming engine, bounding
+            its memory usage. Defaults to None (Polars picks it).
+        categorical: If True, load the Channel, Language and CustomFields dimensions as
+            pl.Categorical so mappings and the group-by work on their dictionaries.
+            The dimensions of the result are Categorical too. Defaults to False.
+        output_dir: If given, the result is also written there as a hive-partitioned
+            dataset, see src.load.write_output. The lazy and streaming paths sink
+            their plan into it, unless partition_by_channel, profile_dir or
+            drift_mode is given, and read the result back from it. Defaults to None.
+        output_format: "parquet" or "ipc". Defaults to "parquet".
+        partition_by_channel: If True, partition the output by Channel as well as by
+            run date. Defaults to False.
+        run_date: Value of the run_date output partition. Defaults to today.
+        inputs: A directory or glob pattern of input files (e.g. one export per team
+            and day) to process concurrently instead of data/inputs.csv. Ids spread over
+            several files are aggregated together, input_path is ignored. Not supported
+            with lazy or streaming. Defaults to None.
+        max_workers: Number of processes used for inputs. Defaults to None (CPU count).
+        state_path: If given, run incrementally: the new inputs are folded into the
+            per-dimensions sums persisted in this Parquet file by previous runs, and
+            only the rows of the ids found in the new inputs are returned, with their
+            updated totals. Not supported with lazy or streaming. Defaults to None.
+        mappings_cache_dir: If given, the compiled mapping dicts are cached there under
+            the hash of the mappings file, see src.mappings.load_mappings. Defaults to
+            None.
+        report_path: If given, a JSON report with the wall time, CPU time, row counts,
+            estimated size and peak RSS of every stage is written there, see
+            src.instrumentation.record_run. Defaults to None.
+        prometheus_path: If given, the same report is written there in the Prometheus
+            textfile format. Defaults to None.
+        profile_dir: If given, the run is profiled into a new sub-directory of it: the
+            lazy paths write their query plans and LazyFrame.profile node timings, the
+            eager paths a cProfile dump, see src.profiling. Defaults to the
+            MAPPING_JOB_PROFILE_DIR environment variable, unset disables profiling.
+        partitions: If given, the input file is split by hash(id) % partitions into
+            spill files that are transformed in parallel processes (max_workers), see
+            src.partitioned.run_partitioned. The result is identical. Only supported
+            by the eager path. Defaults to None.
+        spill_dir: Directory where the partitions are spilled and kept. Defaults to
+            None (a temporary directory).
+        drift_mode: If given ("fail", "warn" or "report"), the values missing from
+            the mappings file are counted in the same pass as the mapping and acted on,
+            see src.drift.handle_mapping_drift. Not supported with inputs, state_path or
+            partitions. With streaming, the plan then runs on the in-memory engine,
+            which can cache its single scan for the counts. Defaults to None (no
+            check).
+        drift_threshold: Share of the rows allowed to have unmapped values before
+            drift_mode applies. Defaults to 0.0.
+        drift_report_path: If given, the unmapped values with their row counts and
+            PointsGained are written there as CSV. Defaults to None.
+        input_cache_dir: If given, the parsed input file is cached there as an
+            Arrow IPC file that reruns memory-map instead of parsing the CSV again, see
+            src.inputs_cache.load_inputs. Only supported by the eager path. Defaults to
+            None.
+        input_cache_max_age: Seconds after their last use when cached inputs are
+            evicted. Defaults to None (no age limit).
+        input_cache_max_bytes: Size budget of the input cache, the least recently used
+            entries are evicted above it. Defaults to None (no size limit).
+        batch_bytes: If given, the input file is read, mapped and partially aggregated
+            in batches of about batch_bytes while a background thread parses the next
+            batch, see src.batched.handle_dimensions_batched. The result is identical.
+            Only supported by the eager path, without drift_mode or input_cache_dir.
+            Defaults to None (read whole).
+        backend: Engine running the transforms, "polars" or "duckdb", see
+            src.backends. The duckdb backend (an optional dependency) runs the stages as
+            one SQL query straight over the CSV or Parquet file, with the same result.
+            Only supported by the eager path, without categorical, drift_mode,
+            input_cache_dir or batch_bytes. Defaults to "polars".
+        database_url: If given (sqlite:///path.db or postgresql://...), the result is
+            also bulk-loaded into a table of that database, with the run_date, see
+            src.database.write_database. Defaults to None.
+        database_table: Name of the table. Defaults to None (mapping_results).
+        database_batch_size: Rows sent to the database at a time. Defaults to None
+            (src.database.DEFAULT_BATCH_SIZE).
+        database_upsert: If True, the loaded rows replace the ones of the same run_date
+            and ids, so reruns are idempotent. Defaults to False (append).
+
+    Returns:
+        pl.DataFrame: The transformed data, also when it is written to output_dir.
+    """
+    input_schema = INPUTS_SCHEMA.copy()
+    if categorical:
+        input_schema.update({column: pl.Categorical for column in DIMENSION_COLUMNS})
+
+    writer = (
+        partial(
+            write_output,
+            output_dir=output_dir,
+            file_format=output_format,
+            run_date=run_date,
+            partition_by_channel=partition_by_channel,
+        )
+        if output_dir
+        else None
+    )
+
+    drift_handler = None
+    if drift_mode:
+        from src.drift import handle_mapping_drift
+
+        drift_handler = partial(
+            handle_mapping_drift,
+            mode=drift_mode,
+            threshold=drift_threshold,
+            report_path=drift_report_path,
+        )
+
+    database_loader = None
+    if database_url:
+        from src.database import DEFAULT_BATCH_SIZE, DEFAULT_TABLE, write_database
+
+        database_loader = partial(
+            write_database,
+            database_url=database_url,
+            table=database_table or DEFAULT_TABLE,
+            run_date=run_date,
+            batch_size=database_batch_size or DEFAULT_BATCH_SIZE,
+            upsert=database_upsert,
+        )
+
+    profile_dir = profile_dir or os.environ.get(PROFILE_DIR_ENV)
+
+    try:
+        run_profile_dir = create_run_profile_dir(profile_dir) if profile_dir else None
+        eager_profiler = (
+            profile_eager(run_profile_dir)
+            if run_profile_dir and not (lazy or streaming)
+            else nullcontext()
+        )
+
+        # Categoricals created by different stages must share one dictionary
+        with (
+            record_run(report_path=report_path, prometheus_path=prometheus_path),
+            pl.StringCache() if categorical else nullcontext(),
+            eager_profiler,
+        ):
+            _check_options(
+                options={
+                    "lazy": lazy,
+                    "streaming": streaming,
+                    "categorical": categorical,
+                    "inputs": inputs,
+                    "state_path": state_path,
+                    "partitions": partitions,
+                    "drift_mode": drift_mode,
+                    "input_cache_dir": input_cache_dir,
+                    "batch_bytes": batch_bytes,
+                    "backend": backend != "polars",
+                }
+            )
+
+            mappings_path = mappings_path or obtain_file_path(
+                desired_file="mappings.csv"
+            )
+            if not inputs:
+                input_path = input_path or obtain_file_path()
+
+            if partitions:
+                result_df = _run_partitioned(
+                    input_path=input_path,
+                    mappings_path=mappings_path,
+                    partitions=partitions,
+                    spill_dir=spill_dir,
+                    max_workers=max_workers,
+                    categorical=categorical,
+                    mappings_cache_dir=mappings_cache_dir,
+                )
+            elif inputs or state_path:
+                result_df = _run_files(
+                    file_paths=obtain_file_paths(inputs) if inputs else [input_path],
+                    mappings_path=mappings_path,
+                    input_schema=input_schema,
+                    max_workers=max_workers,
+                    state_path=state_path,
+                    mappings_cache_dir=mappings_cache_dir,
+                )
+            elif backend != "polars":
+                result_df = _run_backend(
+                    input_path=input_path,
+                    mappings_path=mappings_path,
+                    backend=backend,
+                    input_schema=input_schema,
+                    mappings_cache_dir=mappings_cache_dir,
+                )
+            elif batch_bytes:
+                result_df = _run_batched(
+                    input_path=input_path,
+                    mappings_path=mappings_path,
+                    batch_bytes=batch_bytes,
+                    input_schema=input_schema,
+                    mappings_cache_dir=mappings_cache_dir,
+                )
+            elif lazy or streaming:
+                # The plan is sunk into a single file. The Channel partitions, the
+                # profiled plans and the plans caching their scan for the drift
+                # check are collected and written below.
+                if (
+                    writer
+                    and not partition_by_channel
+                    and not run_profile_dir
+                    and not drift_handler
+                ):
+                    sink_writer, writer = writer, None
+                else:
+                    sink_writer = None
+
+                result_df = _run_lazy(
+                    input_path=input_path,
+                    mappings_path=mappings_path,
+                    streaming=streaming,
+                    streaming_chunk_size=streaming_chunk_size,
+                    input_schema=input_schema,
+                    mappings_cache_dir=mappings_cache_dir,
+                    run_profile_dir=run_profile_dir,
+                    drift_handler=drift_handler,
+                    sink_writer=sink_writer,
+                    output_format=output_format,
+                )
+            else:
+                result_df = _run_eager(
+                    input_path=input_path,
+                    mappings_path=mappings_path,
+                    input_schema=input_schema,
+                    mappings_cache_dir=mappings_cache_dir,
+                    drift_handler=drift_handler,
+                    input_loader=(
+                        partial(
+                            load_inputs,
+                            cache_dir=input_cache_dir,
+                            max_age_seconds=input_cache_max_age,
+                            max_bytes=input_cache_max_bytes,
+                        )
+                        if input_cache_dir
+                        else get_df_from_csv
+                    ),
+                )
+
+            if writer:
+                logger.info("writing output")
+                writer(data=result_df)
+                logger.info("output writing DONE")
+
+            if database_loader:
+                logger.info("loading result into the database")
+                database_loader(data=result_df)
+                logger.info("database loading DONE")
+
+            return result_df
+    except Exception as e:
+        logger.error(f"An error ocurred:{e}", exc_info=True)
+        sys.exit(1)
+
+
+def _run_eager(
+    input_path: str,
+    mappings_path: str,
+    input_schema: Dict[str, pl.DataType] = INPUTS_SCHEMA,
+    mappings_cache_dir: Optional[str] = None,
+    drift_handler: Optional[Callable[..., None]] = None,
+    input_loader: Callable[..., pl.DataFrame] = get_df_from_csv,
+) -> pl.DataFrame:
+    logger.info("extracting input")
+    inputs_df = input_loader(file_path=input_path, schema=input_schema)
+    logger.info("input extraction DONE")
+
+    logger.info("loading mappings dicts")
+    channel_mapping_dict, language_mapping_dict, customfields_mapping_dict = (
+        load_mappings(
+            file_path=mappings_path,
+            cache_dir=mappings_cache_dir,
+        )
+    )
+    logger.info("mappings dicts loading DONE")
+
+    if inputs_df.is_empty():
+        error_message = "Provided Dataframe is empty"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    # The stages are checked once here and run with validate=False below
+    _validate_stages(schema=inputs_df.schema, drift=drift_handler is not None)
+
+    if drift_handler:
+        from src.drift import map_dimensions_with_drift
+
+        logger.info("mapping dimensions changes and checking mapping drift")
+        all_dimensions_updated_df = map_dimensions_with_drift(
+            df=inputs_df,
+            channel_dict=channel_mapping_dict,
+            language_dict=language_mapping_dict,
+            customfields_dict=customfields_mapping_dict,
+            on_drift=drift_handler,
+            validate=False,
+        )
+        logger.info("dimensions changes mapping and drift check DONE")
+    else:
+        logger.info("mapping channel and language changes")
+        channel_language_updated_df = map_non_custom_fields_columns(
+            df=inputs_df,
+            channel_dict=channel_mapping_dict,
+            language_dict=language_mapping_dict,
+            validate=False,
+        )
+        logger.info("channel and language changes mapping DONE")
+
+        logger.info("mapping custom fields changes")
+        all_dimensions_updated_df = map_custom_fields(
+            df=channel_language_updated_df,
+            mapping_dict=customfields_mapping_dict,
+            validate=False,
+        )
+        logger.info("custom fields changes mapping DONE")
+
+    logger.info("aggregating duplicate dimensions and total points gained")
+    result_df = handle_dimensions_with_totals(
+        df=all_dimensions_updated_df, validate=False
+    )
+    logger.info("duplicate dimensions and total points gained aggregation DONE")
+
+    logger.info("SUCCESS")
+
+    return result_df
+
+
+def _run_files(
+    file_paths: List[str],
+    mappings_path: str,
+    input_schema: Dict[str, pl.DataType] = INPUTS_SCHEMA,
+    max_workers: Optional[int] = None,
+    state_path: Optional[str] = None,
+    mappings_cache_dir: Optional[str] = None,
+) -> pl.DataFrame:
+    from src.parallel import aggregate_partial_files, handle_dimensions_files
+    from src.state import fold_delta, input_key
+
+    logger.info("loading mappings dicts")
+    channel_mapping_dict, language_mapping_dict, customfields_mapping_dict = (
+        load_mappings(
+            file_path=mappings_path,
+            cache_dir=mappings_cache_dir,
+        )
+    )
+    logger.info("mappings dicts loading DONE")
+
+    logger.info(f"mapping and aggregating {len(file_paths)} input files")
+    if state_path:
+        unique_dimensions_df = fold_delta(
+            delta_df=aggregate_partial_files(
+                file_paths=file_paths,
+                channel_dict=channel_mapping_dict,
+                language_dict=language_mapping_dict,
+                customfields_dict=customfields_mapping_dict,
+                schema=input_schema,
+                max_workers=max_workers,
+            ),
+            state_path=state_path,
+            input_keys=[input_key(file_path=file_path) for file_path in file_paths],
+        )
+        if pl.Categorical in input_schema.values():
+            unique_dimensions_df = unique_dimensions_df.with_columns(
+                pl.col(DIMENSION_COLUMNS).cast(pl.Categorical)
+            )
+    else:
+        unique_dimensions_df = handle_dimensions_files(
+            file_paths=file_paths,
+            channel_dict=channel_mapping_dict,
+            language_dict=language_mapping_dict,
+            customfields_dict=customfields_mapping_dict,
+            schema=input_schema,
+            max_workers=max_workers,
+        )
+    logger.info("input files mapping and aggregation DONE")
+
+    logger.info("calculating total points gained")
+    result_df = get_total_points_gained(df=unique_dimensions_df)
+    logger.info("total points gained calculation DONE")
+
+    logger.info("SUCCESS")
+
+    return result_df
+
+
+def _run_partitioned(
+    input_path: str,
+    mappings_path: str,
+    partitions: int,
+    spill_dir: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    categorical: bool = False,
+    mappings_cache_dir: Optional[str] = None,
+) -> pl.DataFrame:
+    from src.partitioned import run_partitioned
+
+    logger.info("loading mappings dicts")
+    channel_mapping_dict, language_mapping_dict, customfields_mapping_dict = (
+        load_mappings(
+            file_path=mappings_path,
+            cache_dir=mappings_cache_dir,
+        )
+    )
+    logger.info("mappings dicts loading DONE")
+
+    logger.info(f"transforming input in {partitions} partitions")
+    result_df = run_partitioned(
+        file_path=input_path,
+        channel_dict=channel_mapping_dict,
+        language_dict=language_mapping_dict,
+        customfields_dict=customfields_mapping_dict,
+        shards=partitions,
+        spill_dir=spill_dir,
+        max_workers=max_workers,
+    )
+    logger.info("partitioned transformation DONE")
+
+    if categorical:
+        # Shards are read by separate processes, so they are mapped as plain strings
+        result_df = result_df.with_columns(
+            pl.col(DIMENSION_COLUMNS).cast(pl.Categorical)
+        )
+
+    logger.info("SUCCESS")
+
+    return result_df
+
+
+def _run_batched(
+    input_path: str,
+    mappings_path: str,
+    batch_bytes: int,
+    input_schema: Dict[str, pl.DataType] = INPUTS_SCHEMA,
+    mappings_cache_dir: Optional[str] = None,
+) -> pl.DataFrame:
+    from src.batched import handle_dimensions_batched
+
+    logger.info("loading mappings dicts")
+    channel_mapping_dict, language_mapping_dict, customfields_mapping_dict = (
+        load_mappings(
+            file_path=mappings_path,
+            cache_dir=mappings_cache_dir,
+        )
+    )
+    logger.info("mappings dicts loading DONE")
+
+    logger.info(f"mapping and aggregating input in batches of {batch_bytes} bytes")
+    unique_dimensions_df = handle_dimensions_batched(
+        file_path=input_path,
+        channel_dict=channel_mapping_dict,
+        language_dict=language_mapping_dict,
+        customfields_dict=customfields_mapping_dict,
+        schema=input_schema,
+        batch_bytes=batch_bytes,
+    )
+    logger.info("batched mapping and aggregation DONE")
+
+    logger.info("calculating total points gained")
+    result_df = get_total_points_gained(df=unique_dimensions_df)
+    logger.info("total points gained calculation DONE")
+
+    logger.info("SUCCESS")
+
+    return result_df
+
+
+def _run_backend(
+    input_path: str,
+    mappings_path: str,
+    backend: str,
+    input_schema: Dict[str, pl.DataType] = INPUTS_SCHEMA,
+    mappings_cache_dir: Optional[str] = None,
+) -> pl.DataFrame:
+    from src.backends import get_backend, run_backend
+
+    logger.info("loading mappings dicts")
+    channel_mapping_dict, language_mapping_dict, customfields_mapping_dict = (
+        load_mappings(
+            file_path=mappings_path,
+            cache_dir=mappings_cache_dir,
+        )
+    )
+    logger.info("mappings dicts loading DONE")
+
+    logger.info(f"transforming input with the {backend} backend")
+    result_df = run_backend(
+        backend=get_backend(name=backend),
+        file_path=input_path,
+        channel_dict=channel_mapping_dict,
+        language_dict=language_mapping_dict,
+        customfields_dict=customfields_mapping_dict,
+        schema=input_schema,
+    )
+    logger.info(f"{backend} backend transformation DONE")
+
+    return result_df
+
+
+def _check_options(options: Dict[str, object]) -> None:
+    for option, incompatible_options in INCOMPATIBLE_OPTIONS.items():
+        if not options[option]:
+            continue
+
+        conflicting_options = [name for name in incompatible_options if options[name]]
+        if conflicting_options:
+            error_message = (
+                f"{option} can not be combined with: {', '.join(conflicting_options)}"
+            )
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+
+def _validate_stages(schema: Dict[str, pl.DataType], drift: bool) -> None:
+    stages = FUSED_PIPELINE_STAGES
+    if drift:
+        # A single stage maps the three dimensions
+        stages = ["map_dimensions_with_drift"] + stages[2:]
+
+    logger.info("checking stage contracts")
+    validate_pipeline(schema=schema, stages=stages)
+    logger.info("stage contracts check DONE")
+
+
+def _run_lazy(
+    input_path: str,
+    mappings_path: str,
+    streaming: bool = False,
+    streaming_chunk_size: Optional[int] = None,
+    input_schema: Dict[str, pl.DataType] = INPUTS_SCHEMA,
+    mappings_cache_dir: Optional[str] = None,
+    run_profile_dir: Optional[str] = None,
+    drift_handler: Optional[Callable[..., None]] = None,
+    sink_writer: Optional[Callable[..., List[str]]] = None,
+    output_format: str = "parquet",
+) -> pl.DataFrame:
+    # The streaming engine, which also runs the sinks, can not keep the group-by
+    # order, so the first-seen row of every group is tracked through a row index
+    # added by the scan
+    order_column = ROW_INDEX_COLUMN if streaming or sink_writer else None
+
+    logger.info("scanning input")
+    inputs_lf = scan_df_from_csv(
+        file_path=input_path,
+        row_index_name=order_column,
+        schema=input_schema,
+    )
+    logger.info("input scan DONE")
+
+    logger.info("loading mappings dicts")
+    channel_mapping_dict, language_mapping_dict, customfields_mapping_dict = (
+        load_mappings(
+            file_path=mappings_path,
+            cache_dir=mappings_cache_dir,
+        )
+    )
+    logger.info("mappings dicts loading DONE")
+
+    logger.info("building query plan")
+    # The schema of the scan is resolved once, instead of once per stage
+    _validate_stages(schema=inputs_lf.collect_schema(), drift=drift_handler is not None)
+    if drift_handler:
+        from src.drift import map_dimensions_with_drift_lazy
+
+        # The drift counts share the single (cached) scan of the rows, so the
+        # plan runs on the in-memory engine even with streaming
+        all_dimensions_updated_lf = map_dimensions_with_drift_lazy(
+            lf=inputs_lf,
+            channel_dict=channel_mapping_dict,
+            language_dict=language_mapping_dict,
+            customfields_dict=customfields_mapping_dict,
+            on_drift=drift_handler,
+            validate=False,
+        )
+    else:
+        channel_language_updated_lf = map_non_custom_fields_columns_lazy(
+            lf=inputs_lf,
+            channel_dict=channel_mapping_dict,
+            language_dict=language_mapping_dict,
+            validate=False,
+        )
+        all_dimensions_updated_lf = map_custom_fields_lazy(
+            lf=channel_language_updated_lf,
+            mapping_dict=customfields_mapping_dict,
+            validate=False,
+        )
+    result_lf = handle_dimensions_with_totals_lazy(
+        lf=all_dimensions_updated_lf, order_column=order_column, validate=False
+    )
+    logger.info("query plan building DONE")
+
+    if run_profile_dir:
+        logger.info(f"profiling query plan (streaming={streaming})")
+        with pl.Config(streaming_chunk_size=streaming_chunk_size):
+            result_df = profile_lazy(
+                lf=result_lf, run_dir=run_profile_dir, streaming=streaming
+            )
+        logger.info("query plan profiling DONE")
+    elif sink_writer:
+        logger.info("sinking query plan")
+        with pl.Config(streaming_chunk_size=streaming_chunk_size):
+            paths = sink_writer(data=result_lf)
+        logger.info("query plan sinking DONE")
+
+        # The result is only materialized once written, from the (aggregated) rows
+        # of the output, so every path returns the same DataFrame
+        result_df = read_output(paths=paths, file_format=output_format)
+    else:
+        logger.info(f"collecting query plan (streaming={streaming})")
+        with pl.Config(streaming_chunk_size=streaming_chunk_size):
+            result_df = result_lf.collect(streaming=streaming)
+        logger.info("query plan collection DONE")
+
+    if result_df.is_empty():
+        error_message = "Provided Dataframe is empty"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    logger.info("SUCCESS")
+
+    return result_df
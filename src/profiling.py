@@ -0,0 +1,104 @@
+import cProfile
+import io
+import os
+import pstats
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator
+
+import polars as pl
+
+from src.utils import get_logger
+
+logger = get_logger(name="PROFILING")
+
+# Setting it enables profiling without touching the command line, e.g. in the scheduler
+PROFILE_DIR_ENV = "MAPPING_JOB_PROFILE_DIR"
+
+
+def create_run_profile_dir(profile_dir: str) -> str:
+    """
+    Creates the directory of one profiled run inside profile_dir, named after the
+    start time and process id so consecutive or concurrent runs never overwrite
+    each other.
+
+    Args:
+        profile_dir: The root directory of the profiles.
+
+    Returns:
+        str: The path of the new run directory.
+    """
+    run_dir = os.path.join(
+        profile_dir, f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    )
+    os.makedirs(run_dir, exist_ok=True)
+    logger.info(f"profiling run into {run_dir}")
+
+    return run_dir
+
+
+def profile_lazy(
+    lf: pl.LazyFrame, run_dir: str, streaming: bool = False
+) -> pl.DataFrame:
+    """
+    Collects a LazyFrame with LazyFrame.profile, writing its plans and per-node timings.
+
+    Writes into run_dir:
+        - plan.txt: the plan as built by the job.
+        - optimized_plan.txt: the plan Polars executes (explain).
+        - node_timings.csv: start and end microseconds of every executed node.
+
+    Args:
+        lf: The LazyFrame to collect.
+        run_dir: The directory of the profiled run, see create_run_profile_dir.
+        streaming: Collect with the streaming engine. Defaults to False.
+
+    Returns:
+        pl.DataFrame: The collected result, so the plan is only executed once.
+    """
+    _write_text(
+        path=os.path.join(run_dir, "plan.txt"), content=lf.explain(optimized=False)
+    )
+    _write_text(
+        path=os.path.join(run_dir, "optimized_plan.txt"),
+        content=lf.explain(streaming=streaming),
+    )
+
+    result_df, timings_df = lf.profile(streaming=streaming)
+    timings_df.with_columns(
+        (pl.col("end") - pl.col("start")).alias("duration")
+    ).write_csv(os.path.join(run_dir, "node_timings.csv"))
+    logger.info(f"query plan and node timings written to {run_dir}")
+
+    return result_df
+
+
+@contextmanager
+def profile_eager(run_dir: str) -> Iterator[None]:
+    """
+    Profiles the block with cProfile.
+
+    Writes into run_dir:
+        - eager.prof: the raw stats, for snakeviz or pstats.
+        - eager.txt: the 50 functions with the highest cumulative time.
+
+    Args:
+        run_dir: The directory of the profiled run, see create_run_profile_dir.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(os.path.join(run_dir, "eager.prof"))
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(50)
+        _write_text(path=os.path.join(run_dir, "eager.txt"), content=summary.getvalue())
+        logger.info(f"cProfile stats written to {run_dir}")
+
+
+def _write_text(path: str, content: str) -> None:
+    with open(path, "w") as file:
+        file.write(content)
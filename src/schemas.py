@@ -0,0 +1,50 @@
+import polars as pl
+
+# Declared schemas of the job files. Passing them to the readers skips the dtype
+# inference pass and makes a value of the wrong type fail the read instead of
+# silently turning the whole column into strings.
+
+INPUTS_SCHEMA = {
+    "id": pl.UInt32,
+    "Channel": pl.Utf8,
+    "Language": pl.Utf8,
+    "CustomFields": pl.Utf8,
+    "Duration": pl.Utf8,
+    "PointsGained": pl.Int32,
+}
+
+MAPPINGS_SCHEMA = {
+    "Field": pl.Utf8,
+    "SoftwareA": pl.Utf8,
+    "SoftwareB": pl.Utf8,
+}
+
+# PointsGained sums are widened to Int64 by handle_dimensions, so they can not overflow
+OUTPUTS_SCHEMA = {
+    "id": pl.UInt32,
+    "Channel": pl.Utf8,
+    "Language": pl.Utf8,
+    "CustomFields": pl.Utf8,
+    "Duration": pl.Utf8,
+    "PointsGained": pl.Int64,
+    "TotalPointsGained": pl.Int64,
+}
+
+# Per-dimensions partial aggregates kept between incremental runs, see src.state
+STATE_SCHEMA = {
+    "id": pl.UInt32,
+    "ChannelB": pl.Utf8,
+    "LanguageB": pl.Utf8,
+    "CustomFieldsB": pl.Utf8,
+    "PointsGained": pl.Int64,
+    "TotalSeconds": pl.Int64,
+    "MalformedDurations": pl.UInt32,
+}
+
+# Values of the inputs missing from mappings.csv, see src.drift
+DRIFT_SCHEMA = {
+    "Field": pl.Utf8,
+    "Value": pl.Utf8,
+    "Rows": pl.Int64,
+    "PointsGained": pl.Int64,
+}
@@ -0,0 +1,396 @@
+"""
+Long-lived HTTP service that keeps the mappings compiled in memory and transforms
+input batches on request, so intraday micro-batches do not pay the interpreter,
+Polars and mappings start-up of a one-shot run.
+
+Usage:
+    python -m src.server --port 8080
+
+Endpoints:
+    POST /transform: body with an input batch as CSV (text/csv, ";" separated) or
+        Arrow IPC (application/vnd.apache.arrow.file or .stream). The result is
+        returned in the same format, or in the one given by the Accept header.
+    GET /health: 200 with the number of loaded mappings.
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import polars as pl
+
+from src.mappings import load_mappings
+from src.schemas import INPUTS_SCHEMA
+from src.transform import (
+    get_total_points_gained,
+    handle_dimensions,
+    map_custom_fields,
+    map_non_custom_fields_columns,
+)
+from src.utils import get_logger, obtain_file_path
+
+logger = get_logger(name="SERVER")
+
+CSV = "text/csv"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+CONTENT_TYPES = [CSV, ARROW_FILE, ARROW_STREAM]
+
+MAX_BODY_BYTES = 256 * 1024 * 1024
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    415: "Unsupported Media Type",
+    500: "Internal Server Error",
+}
+
+MappingDicts = Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]
+
+
+class MappingStore:
+    """
+    Keeps the compiled mapping dicts of a mappings file and reloads them when the
+    file changes. A file that fails to load keeps the previous mappings in use.
+    """
+
+    def __init__(self, file_path: str, cache_dir: Optional[str] = None):
+        self.file_path = file_path
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._mapping_dicts: Optional[MappingDicts] = None
+        self.refresh()
+
+    @property
+    def mapping_dicts(self) -> MappingDicts:
+        with self._lock:
+            return self._mapping_dicts
+
+    def refresh(self) -> bool:
+        """
+        Reloads the mappings if the file changed since the last load.
+
+        Returns:
+            bool: True if the mappings were reloaded.
+
+        Raises:
+            FileNotFoundError, ValueError: if the file can not be loaded. On the
+                first load there is nothing to fall back to.
+        """
+        stat = os.stat(self.file_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+
+        mapping_dicts = load_mappings(
+            file_path=self.file_path, cache_dir=self.cache_dir
+        )
+        with self._lock:
+            self._mapping_dicts = mapping_dicts
+            self._signature = signature
+        logger.info(f"mappings loaded from {self.file_path}")
+
+        return True
+
+
+def transform_batch(
+    body: bytes, content_type: str, mapping_dicts: MappingDicts
+) -> pl.DataFrame:
+    """
+    Runs the eager job over one input batch.
+
+    Args:
+        body: The batch, encoded as content_type.
+        content_type: One of CONTENT_TYPES.
+        mapping_dicts: The channel, language and custom fields mapping dicts.
+
+    Returns:
+        pl.DataFrame: The transformed batch, as returned by main.run.
+
+    Raises:
+        ValueError: if the content type is not supported, or the batch is empty or
+            invalid (see src.transform).
+        polars.exceptions.PolarsError: if the batch can not be decoded.
+    """
+    channel_dict, language_dict, customfields_dict = mapping_dicts
+
+    inputs_df = decode_batch(body=body, content_type=content_type)
+    if inputs_df.is_empty():
+        error_message = "Provided Dataframe is empty"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    # decode_batch casts to INPUTS_SCHEMA and the dicts are validated on load, so
+    # the stage contracts hold for every batch and are not checked again
+    channel_language_updated_df = map_non_custom_fields_columns(
+        df=inputs_df,
+        channel_dict=channel_dict,
+        language_dict=language_dict,
+        validate=False,
+    )
+    all_dimensions_updated_df = map_custom_fields(
+        df=channel_language_updated_df, mapping_dict=customfields_dict, validate=False
+    )
+    unique_dimensions_df = handle_dimensions(
+        df=all_dimensions_updated_df, validate=False
+    )
+
+    return get_total_points_gained(df=unique_dimensions_df, validate=False)
+
+
+def decode_batch(body: bytes, content_type: str) -> pl.DataFrame:
+    if content_type == CSV:
+        # Columns are matched by header name, a UTF-8 BOM is skipped by the reader
+        df = pl.read_csv(
+            io.BytesIO(body), separator=";", schema_overrides=INPUTS_SCHEMA
+        )
+    elif content_type in (ARROW_FILE, ARROW_STREAM):
+        read_ipc = pl.read_ipc if content_type == ARROW_FILE else pl.read_ipc_stream
+        try:
+            df = read_ipc(io.BytesIO(body))
+        except OSError as e:
+            # Raised by the reader on truncated or non Arrow bodies
+            error_message = f"Input batch is not valid {content_type}: {e}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+    else:
+        error_message = f"Content-Type must be one of: {CONTENT_TYPES}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    missing_columns = [column for column in INPUTS_SCHEMA if column not in df.columns]
+    if missing_columns:
+        error_message = f"Input batch is missing columns: {missing_columns}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    return df.select(list(INPUTS_SCHEMA)).cast(INPUTS_SCHEMA)
+
+
+def encode_batch(df: pl.DataFrame, content_type: str) -> bytes:
+    buffer = io.BytesIO()
+    if content_type == ARROW_FILE:
+        df.write_ipc(buffer)
+    elif content_type == ARROW_STREAM:
+        df.write_ipc_stream(buffer)
+    else:
+        df.write_csv(buffer, separator=";")
+
+    return buffer.getvalue()
+
+
+async def serve(
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    mappings_path: Optional[str] = None,
+    mappings_cache_dir: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    poll_interval: float = 2.0,
+    started: Optional[asyncio.Future] = None,
+) -> None:
+    """
+    Serves the job over HTTP until cancelled.
+
+    Args:
+        host: Interface to listen on. Defaults to "127.0.0.1".
+        port: Port to listen on, 0 picks a free one. Defaults to 8080.
+        mappings_path: The mappings file. Defaults to data/mappings.csv.
+        mappings_cache_dir: See src.mappings.load_mappings. Defaults to None.
+        max_workers: Threads transforming batches concurrently. Polars releases the
+            GIL, so batches do run in parallel. Defaults to None (executor default).
+        poll_interval: Seconds between checks of the mappings file. Defaults to 2.0.
+        started: If given, resolved with the bound port once the server listens.
+    """
+    store = MappingStore(
+        file_path=mappings_path or obtain_file_path(desired_file="mappings.csv"),
+        cache_dir=mappings_cache_dir,
+    )
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="transform"
+    ) as executor:
+        server = await asyncio.start_server(
+            lambda reader, writer: _handle_connection(reader, writer, store, executor),
+            host=host,
+            port=port,
+        )
+        bound_port = server.sockets[0].getsockname()[1]
+        logger.info(f"listening on {host}:{bound_port}")
+        if started is not None:
+            started.set_result(bound_port)
+
+        watcher = asyncio.create_task(
+            _watch_mappings(store=store, poll_interval=poll_interval)
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+async def _watch_mappings(store: MappingStore, poll_interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(poll_interval)
+        try:
+            await loop.run_in_executor(None, store.refresh)
+        except Exception as e:
+            logger.error(f"mappings reload failed, keeping the previous ones: {e}")
+
+
+async def _handle_connection(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    store: MappingStore,
+    executor: ThreadPoolExecutor,
+) -> None:
+    try:
+        # HTTP/1.1 keep-alive: serve requests until the client closes the connection
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            content_length = int(headers.get("content-length", 0))
+            if content_length > MAX_BODY_BYTES:
+                await _respond(writer, 413, CSV, b"Body too large\n", keep_alive=False)
+                break
+            body = await reader.readexactly(content_length)
+
+            status, content_type, payload = await _dispatch(
+                method=method,
+                path=path,
+                headers=headers,
+                body=body,
+                store=store,
+                executor=executor,
+            )
+            keep_alive = headers.get("connection", "").lower() != "close"
+            await _respond(writer, status, content_type, payload, keep_alive=keep_alive)
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+        logger.warning(f"connection dropped: {e}")
+    finally:
+        writer.close()
+
+
+async def _dispatch(
+    method: str,
+    path: str,
+    headers: Dict[str, str],
+    body: bytes,
+    store: MappingStore,
+    executor: ThreadPoolExecutor,
+) -> Tuple[int, str, bytes]:
+    if path == "/health":
+        if method != "GET":
+            return 405, CSV, b"Use GET\n"
+        mappings = sum(len(mapping_dict) for mapping_dict in store.mapping_dicts)
+        return 200, CSV, f"ok;{mappings}\n".encode()
+
+    if path != "/transform":
+        return 404, CSV, b"Not found\n"
+    if method != "POST":
+        return 405, CSV, b"Use POST\n"
+
+    content_type = headers.get("content-type", CSV).split(";")[0].strip()
+    if content_type not in CONTENT_TYPES:
+        return 415, CSV, f"Content-Type must be one of: {CONTENT_TYPES}\n".encode()
+    accept = headers.get("accept", content_type).split(";")[0].strip()
+    response_type = accept if accept in CONTENT_TYPES else content_type
+
+    # The mappings are read once, so a reload never changes them mid batch
+    mapping_dicts = store.mapping_dicts
+    loop = asyncio.get_running_loop()
+    try:
+        payload = await loop.run_in_executor(
+            executor,
+            _transform_and_encode,
+            body,
+            content_type,
+            response_type,
+            mapping_dicts,
+        )
+    except (ValueError, pl.exceptions.PolarsError) as e:
+        return 400, CSV, f"{e}\n".encode()
+    except Exception as e:
+        logger.error(f"An error ocurred:{e}", exc_info=True)
+        return 500, CSV, b"Internal error\n"
+
+    return 200, response_type, payload
+
+
+def _transform_and_encode(
+    body: bytes, content_type: str, response_type: str, mapping_dicts: MappingDicts
+) -> bytes:
+    result_df = transform_batch(
+        body=body, content_type=content_type, mapping_dicts=mapping_dicts
+    )
+    return encode_batch(df=result_df, content_type=response_type)
+
+
+async def _respond(
+    writer: asyncio.StreamWriter,
+    status: int,
+    content_type: str,
+    payload: bytes,
+    keep_alive: bool,
+) -> None:
+    head = (
+        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + payload)
+    await writer.drain()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Serves the SoftwareA to SoftwareB mapping over HTTP"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--mappings-path", default=None)
+    parser.add_argument("--mappings-cache-dir", default=None)
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(
+            serve(
+                host=args.host,
+                port=args.port,
+                mappings_path=args.mappings_path,
+                mappings_cache_dir=args.mappings_cache_dir,
+                max_workers=args.max_workers,
+                poll_interval=args.poll_interval,
+            )
+        )
+    except KeyboardInterrupt:
+        logger.info("server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+from typing import List, Optional, Tuple
+
+import polars as pl
+
+from src.instrumentation import instrumented
+from src.schemas import STATE_SCHEMA
+from src.transform import combine_partial_dimensions, merge_partial_dimensions
+from src.utils import get_logger
+
+logger = get_logger(name="STATE")
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def read_state(state_path: str) -> Optional[pl.DataFrame]:
+    """
+    Reads the partial aggregates persisted by a previous incremental run.
+
+    Args:
+        state_path: Path of the Parquet state file.
+
+    Returns:
+        pl.DataFrame: The persisted state, or None on the first run.
+
+    Raises:
+        ValueError: if the state file does not have the expected columns.
+    """
+    return _read_state_file(state_path=state_path)[0]
+
+
+def read_folded_inputs(state_path: str) -> List[str]:
+    """
+    Reads the keys of the inputs already folded into the persisted state.
+
+    Args:
+        state_path: Path of the Parquet state file.
+
+    Returns:
+        List[str]: The input keys (see input_key), in folding order. Empty on the
+            first run, or for a state written without them.
+
+    Raises:
+        ValueError: if
+            -the state file does not have the expected columns.
+            -the keys were not written with the current state file, see write_state.
+    """
+    return _read_state_file(state_path=state_path)[1]
+
+
+def folded_inputs_path(state_path: str) -> str:
+    """
+    Path of the JSON file listing the inputs folded into a state file.
+
+    Args:
+        state_path: Path of the Parquet state file.
+
+    Returns:
+        str: The path of the file next to it.
+    """
+    return f"{state_path}.inputs.json"
+
+
+def write_state(
+    state_df: pl.DataFrame,
+    state_path: str,
+    folded_inputs: Optional[List[str]] = None,
+) -> None:
+    """
+    Persists the partial aggregates for the next incremental run.
+
+    The files are written next to their targets and then renamed over them, so a
+    failed run never leaves a truncated state behind. The keys of the folded inputs
+    are stored in a JSON file next to the state, see folded_inputs_path, with the
+    SHA-256 of the state file they belong to: a run stopped between the two renames
+    is detected by the next one instead of folding an input twice.
+
+    Args:
+        state_df: The partial aggregates, with the STATE_SCHEMA columns.
+        state_path: Path of the Parquet state file.
+        folded_inputs: Keys of the inputs folded into state_df, see input_key.
+            Defaults to None.
+    """
+    directory = os.path.dirname(os.path.abspath(state_path))
+    os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{state_path}.tmp"
+    state_df.select(list(STATE_SCHEMA)).cast(STATE_SCHEMA).write_parquet(
+        tmp_path, compression="zstd"
+    )
+
+    inputs_path = folded_inputs_path(state_path=state_path)
+    tmp_inputs_path = f"{inputs_path}.tmp"
+    with open(tmp_inputs_path, "w") as file:
+        json.dump(
+            {
+                "state_sha256": input_key(file_path=tmp_path),
+                "folded_inputs": folded_inputs or [],
+            },
+            file,
+        )
+
+    os.replace(tmp_path, state_path)
+    os.replace(tmp_inputs_path, inputs_path)
+
+
+def input_key(file_path: str) -> str:
+    """
+    Identifies an input by the hash of its content, so a rerun of the same export is
+    recognised whatever its path or run date.
+
+    Args:
+        file_path: Path of the input file.
+
+    Returns:
+        str: The SHA-256 hex digest of the file.
+    """
+    key = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            key.update(chunk)
+
+    return key.hexdigest()
+
+
+@instrumented
+def fold_delta(
+    delta_df: pl.DataFrame,
+    state_path: str,
+    input_keys: Optional[List[str]] = None,
+) -> pl.DataFrame:
+    """
+    Folds the partial aggregates of a new day of inputs into the persisted state and
+    returns the updated rows of the ids found in that day.
+
+    Only the per-dimensions state is read back, the history of inputs is never
+    processed again. The whole state is still grouped again together with the new
+    day and rewritten, so a run costs the new day plus a pass over every dimensions
+    row seen so far: that part grows with the history.
+
+    The keys of the folded inputs are recorded in the state. When every input of
+    delta_df was already folded (e.g. the same day is run twice), the state is left
+    as it is and the current rows of its ids are returned, so a rerun does not count
+    the day twice.
+
+    Args:
+        delta_df: Partial aggregates of the new inputs, see
+            src.transform.aggregate_partial_dimensions.
+        state_path: Path of the Parquet state file, created on the first run.
+        input_keys: Keys of the inputs delta_df was computed from, see input_key.
+            Defaults to None (not recorded, every call is folded).
+
+    Returns:
+        pl.DataFrame: Every dimensions row of the ids in delta_df with their updated
+            totals, as returned by handle_dimensions, in first-seen order.
+
+    Raises:
+        ValueError: if
+            -the provided DataFrame is empty.
+            -only some of the inputs were already folded, the new ones must be run
+            apart.
+            -any Duration of the new inputs is malformed, the state is left untouched.
+    """
+    if delta_df.is_empty():
+        error_message = "Provided Dataframe is empty"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    delta_df = delta_df.select(list(STATE_SCHEMA)).cast(STATE_SCHEMA)
+    state_df, folded_inputs = _read_state_file(state_path=state_path)
+    input_keys = input_keys or []
+
+    already_folded = [key for key in input_keys if key in folded_inputs]
+    if already_folded and len(already_folded) < len(input_keys):
+        error_message = (
+            f"Inputs {already_folded} were already folded into {state_path}, "
+            "run the new inputs without them"
+        )
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if already_folded:
+        logger.info(f"inputs already folded into {state_path}, state left as it is")
+        new_state_df = state_df
+    else:
+        # Known dimensions keep their position and new ones are appended after them
+        new_state_df = combine_partial_dimensions(
+            df=delta_df if state_df is None else pl.concat([state_df, delta_df])
+        )
+
+    updated_df = merge_partial_dimensions(
+        df=new_state_df.filter(pl.col("id").is_in(delta_df["id"].unique()))
+    )
+
+    if not already_folded:
+        # Only written once the new rows are known to be valid
+        write_state(
+            state_df=new_state_df,
+            state_path=state_path,
+            folded_inputs=folded_inputs + input_keys,
+        )
+        logger.info(
+            f"{delta_df.height} new groups folded into {new_state_df.height} state "
+            "groups"
+        )
+
+    return updated_df
+
+
+def _read_state_file(state_path: str) -> Tuple[Optional[pl.DataFrame], List[str]]:
+    if not os.path.exists(state_path):
+        logger.info(f"no state found at {state_path}, starting from scratch")
+        return None, []
+
+    state_df = pl.read_parquet(state_path)
+
+    if state_df.columns != list(STATE_SCHEMA):
+        error_message = (
+            f"State {state_path} has columns {state_df.columns}, "
+            f"expected: {list(STATE_SCHEMA)}"
+        )
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    inputs_path = folded_inputs_path(state_path=state_path)
+    if not os.path.exists(inputs_path):
+        return state_df.cast(STATE_SCHEMA), []
+
+    with open(inputs_path) as file:
+        folded = json.load(file)
+
+    if folded["state_sha256"] != input_key(file_path=state_path):
+        error_message = (
+            f"Folded inputs {inputs_path} were not written with {state_path}, a "
+            "previous run was interrupted: restore both files or delete them"
+        )
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    return state_df.cast(STATE_SCHEMA), folded["folded_inputs"]
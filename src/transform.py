@@ -1,13 +1,31 @@
 import polars as pl
-from typing import Dict
+from typing import Dict, List, Optional
 
-from src.utils import get_logger, is_valid
+from src.duration import (
+    Frame,
+    seconds_to_duration,
+    with_duration_seconds,
+)
+from src.contracts import check_frame, check_lazy_frame, check_mapping_dicts
+from src.instrumentation import instrumented
+from src.utils import get_logger
 
 logger = get_logger(name="TRANSFORM")
 
+DIMENSION_KEYS = ["id", "ChannelB", "LanguageB", "CustomFieldsB"]
+PARTIAL_COLUMNS = DIMENSION_KEYS + [
+    "PointsGained",
+    "TotalSeconds",
+    "MalformedDurations",
+]
 
+
+@instrumented
 def map_non_custom_fields_columns(
-    df: pl.DataFrame, channel_dict: Dict[str, str], language_dict: Dict[str, str]
+    df: pl.DataFrame,
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    validate: bool = True,
 ) -> pl.DataFrame:
     """
     Modify the Channel and Language columns based on provided mappings.
@@ -16,6 +34,9 @@ def map_non_custom_fields_columns(
         df (pl.DataFrame): Input DataFrame with Channel and Language columns.
         channel_dict (dict): Mapping dictionary for Channel.
         language_dict (dict): Mapping dictionary for Language.
+        validate (bool): If False, skip the checks below, e.g. after
+            src.contracts.validate_pipeline with dicts from get_mappings_dict.
+            Defaults to True.
 
     Returns:
         pl.DataFrame: DataFrame with new columns 'ChannelB' and 'LanguageB'.
@@ -23,43 +44,84 @@ def map_non_custom_fields_columns(
     Raises:
         ValueError: if
             -the provided DataFrame is empty.
-            -the provided DataFrame does not contain Channel and Language columns.
-            -the provided mappings are not dicts where key and values are strings and not None.
+            -the provided DataFrame does not meet the map_non_custom_fields_columns
+            contract.
+            -the provided mappings are not dicts where key and values are strings and
+            not None.
     """
-    required_columns = ["Channel", "Language"]
+    if validate:
+        check_frame(df=df, stage="map_non_custom_fields_columns")
+        check_mapping_dicts(
+            channel_dict,
+            language_dict,
+            error_message=(
+                "Both Channel and Language dicts should be a non-empty dict of strings"
+            ),
+        )
 
-    if df.is_empty():
-        error_message = "Provided Dataframe is empty"
-        logger.error(error_message)
-        raise ValueError(error_message)
+    return _map_non_custom_fields_columns(
+        frame=df, channel_dict=channel_dict, language_dict=language_dict
+    )
 
-    if not all(column in df.columns for column in required_columns):
-        error_message = f"Provided Dataframe must contain columns: {required_columns}"
-        logger.error(error_message)
-        raise ValueError(error_message)
 
-    if not is_valid(channel_dict) or not is_valid(language_dict):
-        error_message = (
-            "Both Channel and Language dicts should be a non-empty dict of strings"
+@instrumented
+def map_non_custom_fields_columns_lazy(
+    lf: pl.LazyFrame,
+    channel_dict: Dict[str, str],
+    language_dict: Dict[str, str],
+    validate: bool = True,
+) -> pl.LazyFrame:
+    """
+    LazyFrame counterpart of map_non_custom_fields_columns.
+
+    Args:
+        lf (pl.LazyFrame): Input LazyFrame with Channel and Language columns.
+        channel_dict (dict): Mapping dictionary for Channel.
+        language_dict (dict): Mapping dictionary for Language.
+        validate (bool): See map_non_custom_fields_columns. Defaults to True.
+
+    Returns:
+        pl.LazyFrame: LazyFrame with new columns 'ChannelB' and 'LanguageB'.
+
+    Raises:
+        ValueError: if
+            -the provided LazyFrame does not meet the map_non_custom_fields_columns
+            contract.
+            -the provided mappings are not dicts where key and values are strings and
+            not None.
+    """
+    if validate:
+        check_lazy_frame(lf=lf, stage="map_non_custom_fields_columns")
+        check_mapping_dicts(
+            channel_dict,
+            language_dict,
+            error_message=(
+                "Both Channel and Language dicts should be a non-empty dict of strings"
+            ),
         )
-        logger.error(error_message)
-        raise ValueError(error_message)
 
-    return df.with_columns(
-        [
-            pl.col("Channel").replace(old=channel_dict).alias("ChannelB"),
-            pl.col("Language").replace(old=language_dict).alias("LanguageB"),
-        ]
+    return _map_non_custom_fields_columns(
+        frame=lf, channel_dict=channel_dict, language_dict=language_dict
     )
 
 
-def map_custom_fields(df: pl.DataFrame, mapping_dict: Dict[str, str]) -> pl.DataFrame:
+@instrumented
+def map_custom_fields(
+    df: pl.DataFrame,
+    mapping_dict: Dict[str, str],
+    by_distinct_values: bool = True,
+    validate: bool = True,
+) -> pl.DataFrame:
     """
     Modify the CustomFields columnn based on provided mapping.
 
     Args:
         df (pl.DataFrame): Input DataFrame with Channel and Language columns.
         mapping_dict (dict): Mapping dictionary for CustomFields.
+        by_distinct_values (bool): If True, map every distinct CustomFields value once
+            and join the result back instead of splitting and joining every row.
+            Defaults to True.
+        validate (bool): See map_non_custom_fields_columns. Defaults to True.
 
     Returns:
         pl.DataFrame: DataFrame with new column 'CustomFieldsB'.
@@ -67,110 +129,537 @@ def map_custom_fields(df: pl.DataFrame, mapping_dict: Dict[str, str]) -> pl.Data
     Raises:
         ValueError: if
             -the provided DataFrame is empty.
-            -the provided DataFrame does not contain CustomFields column.
-            -the provided mapping is not a dict where key and values are strings and not None.
+            -the provided DataFrame does not meet the map_custom_fields contract.
+            -the provided mapping is not a dict where key and values are strings and
+            not None.
     """
-    required_column = ["CustomFields"]
+    if validate:
+        check_frame(df=df, stage="map_custom_fields")
+        check_mapping_dicts(
+            mapping_dict,
+            error_message="CustomField dict should be a non-empty dict of strings",
+        )
 
-    if df.is_empty():
-        error_message = "Provided Dataframe is empty"
-        logger.error(error_message)
-        raise ValueError(error_message)
+    return _map_custom_fields(
+        frame=df, mapping_dict=mapping_dict, by_distinct_values=by_distinct_values
+    )
+
+
+@instrumented
+def map_custom_fields_lazy(
+    lf: pl.LazyFrame,
+    mapping_dict: Dict[str, str],
+    validate: bool = True,
+) -> pl.LazyFrame:
+    """
+    LazyFrame counterpart of map_custom_fields. Every row is mapped, a join with the
+    distinct values would scan the input a second time.
+
+    Args:
+        lf (pl.LazyFrame): Input LazyFrame with CustomFields column.
+        mapping_dict (dict): Mapping dictionary for CustomFields.
+        validate (bool): See map_non_custom_fields_columns. Defaults to True.
+
+    Returns:
+        pl.LazyFrame: LazyFrame with new column 'CustomFieldsB'.
+
+    Raises:
+        ValueError: if
+            -the provided LazyFrame does not meet the map_custom_fields contract.
+            -the provided mapping is not a dict where key and values are strings and
+            not None.
+    """
+    if validate:
+        check_lazy_frame(lf=lf, stage="map_custom_fields")
+        check_mapping_dicts(
+            mapping_dict,
+            error_message="CustomField dict should be a non-empty dict of strings",
+        )
+
+    return _map_custom_fields(frame=lf, mapping_dict=mapping_dict)
+
+
+@instrumented
+def handle_dimensions(df: pl.DataFrame, validate: bool = True) -> pl.DataFrame:
+    """
+    This function aggregates facts for rows where dimensions are equal.
 
-    if not all(column in df.columns for column in required_column):
-        error_message = f"Provided Dataframe must contain column: {required_column}"
+    Args:
+        df (pl.DataFrame): Input DataFrame with Duration, id, ChannelB, LanguageB,
+            CustomFieldsB, PointsGained columns.
+        validate (bool): See map_non_custom_fields_columns. Defaults to True.
+
+    Returns:
+        pl.DataFrame: DataFrame with aggregated data.
+
+    Raises:
+        ValueError: if
+            -the provided DataFrame is empty.
+            -the provided DataFrame does not meet the handle_dimensions contract.
+            -any Duration is malformed.
+    """
+    if validate:
+        check_frame(df=df, stage="handle_dimensions")
+
+    return _aggregate_dimensions(frame=df)
+
+
+@instrumented
+def handle_dimensions_lazy(
+    lf: pl.LazyFrame, order_column: Optional[str] = None, validate: bool = True
+) -> pl.LazyFrame:
+    """
+    LazyFrame counterpart of handle_dimensions.
+
+    Args:
+        lf (pl.LazyFrame): Input LazyFrame with Duration, id, ChannelB, LanguageB,
+            CustomFieldsB, PointsGained columns.
+        order_column (str, optional): Row index column used to restore the first-seen
+            order of the groups. When given, the group-by does not need maintain_order,
+            so it can run on Polars' streaming engine. Defaults to None.
+        validate (bool): See map_non_custom_fields_columns. Defaults to True.
+
+    Returns:
+        pl.LazyFrame: LazyFrame with aggregated data.
+
+    Raises:
+        ValueError: if the provided LazyFrame does not meet the handle_dimensions
+            contract or lacks order_column.
+    """
+    if validate:
+        check_lazy_frame(lf=lf, stage="handle_dimensions", order_column=order_column)
+
+    return _aggregate_dimensions(frame=lf, order_column=order_column)
+
+
+@instrumented
+def aggregate_partial_dimensions(
+    df: pl.DataFrame, order_column: Optional[str] = None
+) -> pl.DataFrame:
+    """
+    Aggregates the rows of one input where dimensions are equal, keeping the
+    Duration as a number of seconds so partial results of several inputs can
+    be merged with merge_partial_dimensions.
+
+    Args:
+        df (pl.DataFrame): Input DataFrame with Duration, id, ChannelB, LanguageB,
+            CustomFieldsB, PointsGained columns.
+        order_column (str, optional): Row index column of the original input. When
+            given, its first-seen value is kept for every group. Defaults to None.
+
+    Returns:
+        pl.DataFrame: DataFrame with id, ChannelB, LanguageB, CustomFieldsB,
+            PointsGained, TotalSeconds and MalformedDurations columns (and
+            order_column), in first-seen order.
+
+    Raises:
+        ValueError: if the provided DataFrame does not contain Duration, id, ChannelB,
+            LanguageB, CustomFieldsB, PointsGained columns.
+    """
+    required_columns = (
+        DIMENSION_KEYS
+        + ["Duration", "PointsGained"]
+        + ([order_column] if order_column else [])
+    )
+
+    if not all(column in df.columns for column in required_columns):
+        error_message = f"Provided Dataframe must contain column: {required_columns}"
         logger.error(error_message)
         raise ValueError(error_message)
 
-    if not is_valid(mapping_dict):
-        error_message = "CustomField dict should be a non-empty dict of strings"
+    return _aggregate_duration_facts(frame=df, order_column=order_column)
+
+
+@instrumented
+def combine_partial_dimensions(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Sums partial aggregates with equal dimensions, keeping the result partial so it
+    can be stored and combined again later (e.g. with the next day's inputs).
+
+    Args:
+        df (pl.DataFrame): Concatenation of aggregate_partial_dimensions results, in
+            input order.
+
+    Returns:
+        pl.DataFrame: DataFrame with the aggregate_partial_dimensions columns, one row
+            per dimensions.
+
+    Raises:
+        ValueError: if the provided DataFrame does not contain the
+            aggregate_partial_dimensions columns.
+    """
+    if not all(column in df.columns for column in PARTIAL_COLUMNS):
+        error_message = f"Provided Dataframe must contain column: {PARTIAL_COLUMNS}"
         logger.error(error_message)
         raise ValueError(error_message)
 
-    return df.with_columns(
-        df["CustomFields"]
-        .str.split(";")  # Split by ';'
-        .list.eval(pl.element().replace(old=mapping_dict))  # Map using the dict
-        .list.join(";")  # Join all back into a str
-        .alias("CustomFieldsB")
-    )
+    return _sum_dimensions(frame=df)
 
 
-def handle_dimensions(df: pl.DataFrame) -> pl.DataFrame:
+@instrumented
+def merge_partial_dimensions(
+    df: pl.DataFrame, order_column: Optional[str] = None
+) -> pl.DataFrame:
     """
-    This function aggregates facts for rows where dimensions are equal.
+    Merges partial aggregates of several inputs into the handle_dimensions result.
 
     Args:
-        df (pl.DataFrame): Input DataFrame with Duration, id, ChannelB, LanguageB, CustomFieldsB, PointsGained columns.
+        df (pl.DataFrame): Concatenation of aggregate_partial_dimensions results, in
+            input order.
+        order_column (str, optional): Row index column kept by
+            aggregate_partial_dimensions. When given, the groups are ordered by it and
+            it is kept in the result, so the results of disjoint partitions of the
+            input can be concatenated and sorted back into the input order. Defaults
+            to None.
 
     Returns:
-        pl.DataFrame: DataFrame with aggregated data.
+        pl.DataFrame: DataFrame with aggregated data, as returned by handle_dimensions
+            (plus order_column).
 
     Raises:
         ValueError: if
             -the provided DataFrame is empty.
-            -the provided DataFrame does not contain Duration, id, ChannelB, LanguageB, CustomFieldsB, PointsGained columns.
+            -the provided DataFrame does not contain the aggregate_partial_dimensions
+            columns.
+            -any Duration of the inputs is malformed.
     """
-    required_columns = [
-        "Duration",
-        "id",
-        "ChannelB",
-        "LanguageB",
-        "CustomFieldsB",
-        "PointsGained",
-    ]
-
     if df.is_empty():
         error_message = "Provided Dataframe is empty"
         logger.error(error_message)
         raise ValueError(error_message)
 
+    required_columns = PARTIAL_COLUMNS + ([order_column] if order_column else [])
+
     if not all(column in df.columns for column in required_columns):
         error_message = f"Provided Dataframe must contain column: {required_columns}"
         logger.error(error_message)
         raise ValueError(error_message)
 
-    duration_split_df = df.with_columns(
-        # '^(\d+):' captures the digits before the first colon (hours)
-        pl.col("Duration").str.extract(r"^(\d+):", 1).cast(pl.Int64).alias("hours"),
-        # ':(\d+):' captures the digits between two colons (minutes)
-        pl.col("Duration").str.extract(r":(\d+):", 1).cast(pl.Int64).alias("minutes"),
-        # ':(\d+)$' captures the digits after the last colon (seconds)
-        pl.col("Duration").str.extract(r":(\d+)$", 1).cast(pl.Int64).alias("seconds"),
+    return _finalize_dimensions(
+        frame=_sum_dimensions(frame=df, order_column=order_column),
+        keep_columns=[order_column] if order_column else [],
+    )
+
+
+@instrumented
+def get_total_points_gained(df: pl.DataFrame, validate: bool = True) -> pl.DataFrame:
+    """
+    This function sums the PointsGained over the id column.
+
+    Args:
+        df (pl.DataFrame): Input DataFrame with id and PointsGained columns.
+        validate (bool): See map_non_custom_fields_columns. Defaults to True.
+
+    Returns:
+        pl.DataFrame: DataFrame with new column 'TotalPointsGained'.
+
+    Raises:
+        ValueError: if
+            -the provided DataFrame is empty.
+            -the provided DataFrame does not meet the get_total_points_gained contract.
+    """
+    if validate:
+        check_frame(df=df, stage="get_total_points_gained")
+
+    return df.with_columns(TotalPointsGained=pl.col("PointsGained").sum().over("id"))
+
+
+@instrumented
+def get_total_points_gained_lazy(
+    lf: pl.LazyFrame, validate: bool = True
+) -> pl.LazyFrame:
+    """
+    LazyFrame counterpart of get_total_points_gained.
+
+    Args:
+        lf (pl.LazyFrame): Input LazyFrame with id and PointsGained columns.
+        validate (bool): See map_non_custom_fields_columns. Defaults to True.
+
+    Returns:
+        pl.LazyFrame: LazyFrame with new column 'TotalPointsGained'.
+
+    Raises:
+        ValueError: if the provided LazyFrame does not meet the
+            get_total_points_gained contract.
+    """
+    if validate:
+        check_lazy_frame(lf=lf, stage="get_total_points_gained")
+
+    return lf.with_columns(TotalPointsGained=pl.col("PointsGained").sum().over("id"))
+
+
+@instrumented
+def handle_dimensions_with_totals(
+    df: pl.DataFrame, validate: bool = True
+) -> pl.DataFrame:
+    """
+    Fused handle_dimensions and get_total_points_gained.
+
+    The rows are hashed once, by the group-by of the dimensions. The totals per id
+    are summed by a second group-by over the aggregated rows only and joined back,
+    so the lazy counterpart is a single query plan the streaming engine can sink.
+    With an order_column (i.e. for the streaming engine) the lazy totals sum the
+    input rows by id instead, see handle_dimensions_with_totals_lazy.
+
+    Args:
+        df (pl.DataFrame): Input DataFrame with Duration, id, ChannelB, LanguageB,
+            CustomFieldsB, PointsGained columns.
+        validate (bool): See map_non_custom_fields_columns. Defaults to True.
+
+    Returns:
+        pl.DataFrame: DataFrame as returned by
+            get_total_points_gained(handle_dimensions(df)).
+
+    Raises:
+        ValueError: if
+            -the provided DataFrame is empty.
+            -the provided DataFrame does not meet the handle_dimensions_with_totals
+            contract.
+            -any Duration is malformed.
+    """
+    if validate:
+        check_frame(df=df, stage="handle_dimensions_with_totals")
+
+    return _aggregate_dimensions_with_totals(frame=df)
+
+
+@instrumented
+def handle_dimensions_with_totals_lazy(
+    lf: pl.LazyFrame, order_column: Optional[str] = None, validate: bool = True
+) -> pl.LazyFrame:
+    """
+    LazyFrame counterpart of handle_dimensions_with_totals.
+
+    Args:
+        lf (pl.LazyFrame): Input LazyFrame with Duration, id, ChannelB, LanguageB,
+            CustomFieldsB, PointsGained columns.
+        order_column (str, optional): See handle_dimensions_lazy. When given, the
+            streaming engine can not cache the aggregated rows for the totals, which
+            are then summed over the rows of lf by id, reading lf twice. Defaults
+            to None.
+        validate (bool): See map_non_custom_fields_columns. Defaults to True.
+
+    Returns:
+        pl.LazyFrame: LazyFrame as returned by
+            get_total_points_gained_lazy(handle_dimensions_lazy(lf)).
+
+    Raises:
+        ValueError: if the provided LazyFrame does not meet the
+            handle_dimensions_with_totals contract or lacks order_column.
+    """
+    if validate:
+        check_lazy_frame(
+            lf=lf, stage="handle_dimensions_with_totals", order_column=order_column
+        )
+
+    return _aggregate_dimensions_with_totals(frame=lf, order_column=order_column)
+
+
+def _map_non_custom_fields_columns(
+    frame: Frame, channel_dict: Dict[str, str], language_dict: Dict[str, str]
+) -> Frame:
+    schema = frame.collect_schema()
+
+    for column, mapping_dict in [
+        ("Channel", channel_dict),
+        ("Language", language_dict),
+    ]:
+        if schema[column] == pl.Categorical:
+            # Map the dictionary of the column instead of every row
+            frame = _map_distinct_values(
+                frame=frame,
+                column=column,
+                mapped_expr=pl.col(column)
+                .cast(pl.Utf8)
+                .replace(old=mapping_dict)
+                .cast(pl.Categorical)
+                .alias(f"{column}B"),
+            )
+        else:
+            frame = frame.with_columns(
+                pl.col(column).replace(old=mapping_dict).alias(f"{column}B")
+            )
+
+    return frame
+
+
+def _custom_fields_expr(
+    mapping_dict: Dict[str, str], categorical: bool = False
+) -> pl.Expr:
+    custom_fields_b = (
+        pl.col("CustomFields")
+        .cast(pl.Utf8)
+        .str.split(";")  # Split by ';'
+        .list.eval(pl.element().replace(old=mapping_dict))  # Map using the dict
+        .list.join(";")  # Join all back into a str
     )
 
-    total_seconds_df = duration_split_df.with_columns(
-        (pl.col("hours") * 3600 + pl.col("minutes") * 60 + pl.col("seconds")).alias(
-            "TotalSeconds"
+    if categorical:
+        custom_fields_b = custom_fields_b.cast(pl.Categorical)
+
+    return custom_fields_b.alias("CustomFieldsB")
+
+
+def _map_custom_fields(
+    frame: Frame, mapping_dict: Dict[str, str], by_distinct_values: bool = True
+) -> Frame:
+    categorical = frame.collect_schema()["CustomFields"] == pl.Categorical
+
+    # Categorical columns are always mapped through their dictionary
+    if not by_distinct_values and not categorical:
+        return frame.with_columns(_custom_fields_expr(mapping_dict=mapping_dict))
+
+    # The set of distinct CustomFields is tiny compared with the row count, so the
+    # split/replace/join runs once per distinct value
+    return _map_distinct_values(
+        frame=frame,
+        column="CustomFields",
+        mapped_expr=_custom_fields_expr(
+            mapping_dict=mapping_dict, categorical=categorical
+        ),
+    )
+
+
+def _map_distinct_values(frame: Frame, column: str, mapped_expr: pl.Expr) -> Frame:
+    # In a lazy plan the distinct values would be a second scan of the input, which
+    # costs more than mapping every row
+    if isinstance(frame, pl.LazyFrame):
+        return frame.with_columns(mapped_expr)
+
+    # The mapped distinct values are broadcast back with a left join, which keeps
+    # the row order. Nulls do not match and stay null, as in the per-row mapping.
+    distinct_mapping = frame.select(column).unique().with_columns(mapped_expr)
+
+    return frame.join(distinct_mapping, on=column, how="left")
+
+
+def _aggregate_dimensions(frame: Frame, order_column: Optional[str] = None) -> Frame:
+    # Shared by the eager and lazy paths, both frame types expose the same API
+    return _finalize_dimensions(
+        frame=_aggregate_duration_facts(frame=frame, order_column=order_column)
+    )
+
+
+def _aggregate_duration_facts(
+    frame: Frame, order_column: Optional[str] = None
+) -> Frame:
+    seconds_frame = with_duration_seconds(
+        frame=frame, column="Duration", alias="TotalSeconds"
+    ).with_columns(
+        # Inputs may use a narrow integer type, the sums must not overflow it
+        pl.col("PointsGained").cast(pl.Int64)
+    )
+
+    # The malformed Durations are counted by the group-by instead of a per-row flag
+    # column. Plain column aggregations keep the group-by on its fast path, an
+    # expression combining two of them would be evaluated group by group.
+    return (
+        _group_dimensions(
+            frame=seconds_frame,
+            aggregations=[
+                pl.sum("PointsGained").alias("PointsGained"),
+                pl.sum("TotalSeconds").alias("TotalSeconds"),
+                pl.count("Duration").alias("__durations"),
+                pl.count("TotalSeconds").alias("__parsed_durations"),
+            ],
+            order_column=order_column,
+        )
+        .with_columns(
+            # count skips nulls: present Durations that did not parse are malformed
+            (pl.col("__durations") - pl.col("__parsed_durations"))
+            .cast(pl.UInt32)
+            .alias("MalformedDurations")
         )
+        .drop("__durations", "__parsed_durations")
     )
 
-    unique_dimensions_df = total_seconds_df.group_by(
-        ["id", "ChannelB", "LanguageB", "CustomFieldsB"], maintain_order=True
-    ).agg(
-        [
+
+def _aggregate_dimensions_with_totals(
+    frame: Frame, order_column: Optional[str] = None
+) -> Frame:
+    # Shared by the eager and lazy paths, both frame types expose the same API
+    dimensions_frame = _finalize_dimensions(
+        frame=_aggregate_duration_facts(frame=frame, order_column=order_column),
+        keep_columns=[order_column] if order_column else [],
+    )
+
+    if isinstance(frame, pl.LazyFrame) and order_column:
+        # The streaming engine can not cache the aggregated rows, it would aggregate
+        # them again for the totals. Summing the input rows by their integer id is
+        # cheaper, at the cost of a second (projected) scan of the input.
+        totals_frame = frame.group_by("id").agg(
+            pl.col("PointsGained").cast(pl.Int64).sum().alias("TotalPointsGained")
+        )
+    else:
+        if isinstance(dimensions_frame, pl.LazyFrame):
+            # Both sides of the join read the aggregated rows once
+            dimensions_frame = dimensions_frame.cache()
+
+        # Only the aggregated rows are hashed by id again
+        totals_frame = dimensions_frame.group_by("id").agg(
+            pl.sum("PointsGained").alias("TotalPointsGained")
+        )
+
+    # Unlike a window over id, a join back of the totals can be run, and sunk, by the
+    # streaming engine
+    result_frame = dimensions_frame.join(
+        totals_frame, on="id", how="left", join_nulls=True, coalesce=True
+    )
+
+    if order_column is None:
+        # A left join keeps the order of the left rows
+        return result_frame
+
+    return result_frame.sort(order_column).drop(order_column)
+
+
+def _sum_dimensions(frame: Frame, order_column: Optional[str] = None) -> Frame:
+    # Sums are associative, so this works on rows as well as on partial aggregates
+    return _group_dimensions(
+        frame=frame,
+        aggregations=[
             pl.sum("PointsGained").alias("PointsGained"),
             pl.sum("TotalSeconds").alias("TotalSeconds"),
-        ]
+            pl.sum("MalformedDurations").alias("MalformedDurations"),
+        ],
+        order_column=order_column,
     )
 
-    dimensions_duration_df = unique_dimensions_df.with_columns(
-        (
-            # zfill(2) ensures that each component has two digits ("03" instead of "3")
-            # hours only need one digit
-            (pl.col("TotalSeconds") // 3600).cast(pl.Int64).cast(pl.Utf8).str.zfill(1)
-            + ":"
-            + ((pl.col("TotalSeconds") % 3600) // 60)
-            .cast(pl.Int64)
-            .cast(pl.Utf8)
-            .str.zfill(2)
-            + ":"
-            + (pl.col("TotalSeconds") % 60).cast(pl.Int64).cast(pl.Utf8).str.zfill(2)
-        ).alias("Duration")
+
+def _group_dimensions(
+    frame: Frame, aggregations: List[pl.Expr], order_column: Optional[str] = None
+) -> Frame:
+    if order_column is None:
+        return frame.group_by(DIMENSION_KEYS, maintain_order=True).agg(aggregations)
+
+    # maintain_order is not supported by the streaming engine, sorting the
+    # (much smaller) aggregated result by first-seen row gives the same order
+    return (
+        frame.group_by(DIMENSION_KEYS)
+        .agg([pl.min(order_column)] + aggregations)
+        .sort(order_column)
+    )
+
+
+def _finalize_dimensions(
+    frame: Frame, keep_columns: Optional[List[str]] = None
+) -> Frame:
+    # Checked on the aggregated rows, so the lazy plan does not need a second scan
+    if isinstance(frame, pl.LazyFrame):
+        # Without projection_pushdown=False the counts would be pruned away. The
+        # check holds batch by batch, so the streaming engine can run (and sink) it.
+        frame = frame.map_batches(
+            _check_malformed_durations, projection_pushdown=False, streamable=True
+        )
+    else:
+        frame = _check_malformed_durations(df=frame)
+
+    dimensions_duration_df = frame.with_columns(
+        seconds_to_duration(column="TotalSeconds").alias("Duration")
     )
 
     result_df = dimensions_duration_df.select(
-        ["id", "ChannelB", "LanguageB", "CustomFieldsB", "Duration", "PointsGained"]
+        DIMENSION_KEYS + ["Duration", "PointsGained"] + (keep_columns or [])
     )
 
     # Replace to the original column names
@@ -183,31 +672,16 @@ def handle_dimensions(df: pl.DataFrame) -> pl.DataFrame:
     )
 
 
-def get_total_points_gained(df: pl.DataFrame) -> pl.DataFrame:
-    """
-    This function sums the PointsGained over the id column.
-
-    Args:
-        df (pl.DataFrame): Input DataFrame with id and PointsGained columns.
-
-    Returns:
-        pl.DataFrame: DataFrame with new column 'TotalPointsGained'.
+def _check_malformed_durations(df: pl.DataFrame) -> pl.DataFrame:
+    malformed_df = df.filter(pl.col("MalformedDurations") > 0)
 
-    Raises:
-        ValueError: if
-            -the provided DataFrame is empty.
-            -the provided DataFrame does not contain id and PointsGained columns.
-    """
-    required_columns = ["id", "PointsGained"]
-
-    if df.is_empty():
-        error_message = "Provided Dataframe is empty"
-        logger.error(error_message)
-        raise ValueError(error_message)
-
-    if not all(column in df.columns for column in required_columns):
-        error_message = f"Provided Dataframe must contain column: {required_columns}"
+    if not malformed_df.is_empty():
+        error_message = (
+            f"Found {malformed_df['MalformedDurations'].sum()} malformed Duration "
+            "values (expected H:MM:SS) for ids: "
+            f"{malformed_df['id'].unique().to_list()}"
+        )
         logger.error(error_message)
         raise ValueError(error_message)
 
-    return df.with_columns(TotalPointsGained=pl.col("PointsGained").sum().over("id"))
+    return df
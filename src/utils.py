@@ -1,7 +1,8 @@
+import glob
 import os
 import logging
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 
 FORMATTER = logging.Formatter(
     "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s"
@@ -49,6 +50,34 @@ def obtain_file_path(desired_file: str = "inputs.csv") -> str:
     return str(target_file_path.resolve())
 
 
+def obtain_file_paths(inputs: str) -> List[str]:
+    """
+    Resolves a directory or a glob pattern into the sorted list of input files.
+
+    Args:
+        inputs: A directory (all its files are used) or a glob pattern like
+            "exports/*.csv".
+
+    Returns:
+        List[str]: Absolute paths of the matched files, sorted so the run is
+            deterministic.
+
+    Raises:
+        FileNotFoundError: if no file matches.
+    """
+    if os.path.isdir(inputs):
+        inputs = os.path.join(inputs, "*")
+
+    file_paths = sorted(
+        os.path.abspath(path) for path in glob.glob(inputs) if os.path.isfile(path)
+    )
+
+    if not file_paths:
+        raise FileNotFoundError(f"No input files found for {inputs}.")
+
+    return file_paths
+
+
 def is_valid(dictionary: Dict) -> bool:
     return all(
         key is not None
@@ -0,0 +1,101 @@
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from src.arrow_api import from_arrow, mappings_from_arrow, transform_arrow
+from src.schemas import INPUTS_SCHEMA, MAPPINGS_SCHEMA, OUTPUTS_SCHEMA
+from src.utils import obtain_file_path
+
+
+class ArrowStream:
+    # A producer that only exports the Arrow PyCapsule stream interface
+    def __init__(self, df):
+        self.df = df
+
+    def __arrow_c_stream__(self, requested_schema=None):
+        return self.df.__arrow_c_stream__(requested_schema)
+
+
+@pytest.fixture
+def inputs_df():
+    # Inferred dtypes (e.g. Int64 ids), as another service may hold them
+    return pl.read_csv(obtain_file_path(), separator=";")
+
+
+@pytest.fixture
+def mappings_df():
+    return pl.read_csv(obtain_file_path(desired_file="mappings.csv"), separator=";")
+
+
+@pytest.fixture
+def outputs_df():
+    return pl.read_csv(
+        obtain_file_path(desired_file="outputs.csv"),
+        separator=";",
+        schema=OUTPUTS_SCHEMA,
+    )
+
+
+def test_transform_arrow(inputs_df, mappings_df, outputs_df):
+    result_df = transform_arrow(
+        inputs=ArrowStream(inputs_df), mappings=ArrowStream(mappings_df)
+    )
+
+    assert_frame_equal(result_df, outputs_df)
+    # The result is handed back through the same interface
+    assert_frame_equal(pl.DataFrame(ArrowStream(result_df)), outputs_df)
+
+
+def test_transform_arrow_mapping_dicts(inputs_df, mappings_df, outputs_df):
+    mapping_dicts = mappings_from_arrow(data=mappings_df)
+
+    assert_frame_equal(
+        transform_arrow(inputs=inputs_df, mappings=mapping_dicts), outputs_df
+    )
+
+    with pytest.raises(ValueError, match="Mapping dicts"):
+        transform_arrow(inputs=inputs_df, mappings=({"channel1": None}, {}, {}))
+
+
+def test_from_arrow(inputs_df):
+    df = from_arrow(
+        data=ArrowStream(inputs_df.with_columns(extra=pl.lit(1))), schema=INPUTS_SCHEMA
+    )
+
+    assert df.schema == INPUTS_SCHEMA
+    assert_frame_equal(from_arrow(data=ArrowStream(inputs_df)), inputs_df)
+
+    with pytest.raises(ValueError, match="__arrow_c_stream__"):
+        from_arrow(data=inputs_df.to_dicts(), schema=INPUTS_SCHEMA)
+
+    with pytest.raises(ValueError, match="Duration"):
+        from_arrow(data=inputs_df.drop("Duration"), schema=INPUTS_SCHEMA)
+
+
+def test_transform_arrow_invalid(inputs_df, mappings_df):
+    with pytest.raises(ValueError, match="empty"):
+        transform_arrow(inputs=inputs_df.clear(), mappings=mappings_df)
+
+    with pytest.raises(ValueError):
+        transform_arrow(
+            inputs=inputs_df,
+            mappings=mappings_df.with_columns(SoftwareB=pl.lit(None, pl.Utf8)),
+        )
+
+
+def test_transform_pyarrow(inputs_df, mappings_df, outputs_df):
+    pa = pytest.importorskip("pyarrow")
+    inputs_table = inputs_df.cast(INPUTS_SCHEMA).to_arrow()
+    mappings_table = mappings_df.cast(MAPPINGS_SCHEMA).to_arrow()
+
+    # Numeric columns keep the buffers of the producer
+    df = from_arrow(data=inputs_table, schema=INPUTS_SCHEMA)
+    assert (
+        df["id"]._get_buffer_info()[0]
+        == inputs_table["id"].chunks[0].buffers()[1].address
+    )
+
+    for inputs in [inputs_table, inputs_table.to_reader(max_chunksize=3)]:
+        result_table = pa.table(transform_arrow(inputs=inputs, mappings=mappings_table))
+
+        assert_frame_equal(pl.DataFrame(result_table), outputs_df)
@@ -0,0 +1,187 @@
+import importlib.util
+import sys
+
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from benchmarks.generate import generate_inputs
+from main import run
+from src.backends import BACKENDS, get_backend, run_backend
+from src.extract import get_df_from_csv
+from src.mappings import load_mappings
+from src.schemas import INPUTS_SCHEMA, OUTPUTS_SCHEMA
+from src.utils import obtain_file_path
+
+
+# The duckdb backend is an optional dependency
+BACKEND_NAMES = [
+    "polars",
+    pytest.param(
+        "duckdb",
+        marks=pytest.mark.skipif(
+            importlib.util.find_spec("duckdb") is None, reason="needs duckdb"
+        ),
+    ),
+]
+
+
+@pytest.fixture
+def mapping_dicts():
+    return load_mappings(file_path=obtain_file_path(desired_file="mappings.csv"))
+
+
+@pytest.mark.parametrize("name", BACKEND_NAMES)
+def test_backend_outputs(name, mapping_dicts):
+    expected_df = get_df_from_csv(
+        file_path=obtain_file_path(desired_file="outputs.csv"), schema=OUTPUTS_SCHEMA
+    )
+
+    result_df = run_backend(get_backend(name), obtain_file_path(), *mapping_dicts)
+
+    assert_frame_equal(result_df, expected_df)
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_duckdb_backend_parity(tmp_path, mapping_dicts, file_format):
+    pytest.importorskip("duckdb")
+    inputs_df = generate_inputs(rows=20_000, ids=500, seed=11).with_columns(
+        # A few missing values, kept missing by both backends
+        pl.when(pl.int_range(pl.len()) % 997 == 0)
+        .then(None)
+        .otherwise(pl.col(column))
+        .alias(column)
+        for column in ["CustomFields", "Duration"]
+    )
+    inputs_path = tmp_path / f"inputs.{file_format}"
+    if file_format == "csv":
+        inputs_df.write_csv(inputs_path, separator=";")
+    else:
+        inputs_df.write_parquet(inputs_path)
+
+    results = [
+        run_backend(get_backend(name, **kwargs), str(inputs_path), *mapping_dicts)
+        for name, kwargs in [("polars", {}), ("duckdb", {"threads": 2})]
+    ]
+
+    assert_frame_equal(*results)
+
+
+DURATIONS = [
+    "1:23:14",
+    "01:02:03",
+    "1:2:3",
+    "100:00:00",
+    None,
+    "",
+    "+1:00:00",
+    "1:+2:03",
+    "-1:00:00",
+    "0:60:00",
+    "0:90:00",
+    "x:12:00",
+    "1:12",
+    "1:2:3:4",
+    " 1:00:00",
+    "1:00:00 ",
+    "4294967296:00:00",
+    "\uff11:00:00",
+]
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+@pytest.mark.parametrize("duration", DURATIONS)
+def test_duckdb_backend_duration_parity(tmp_path, mapping_dicts, file_format, duration):
+    pytest.importorskip("duckdb")
+    inputs_df = pl.DataFrame(
+        {
+            "id": [1, 1],
+            "Channel": ["channel1", "channel1"],
+            "Language": ["en", "en"],
+            "CustomFields": ["Area=account", "Area=account"],
+            "Duration": ["0:01:00", duration],
+            "PointsGained": [57, 3],
+        },
+        schema=INPUTS_SCHEMA,
+    )
+    inputs_path = tmp_path / f"inputs.{file_format}"
+    if file_format == "csv":
+        inputs_df.write_csv(inputs_path, separator=";")
+    else:
+        inputs_df.write_parquet(inputs_path)
+
+    results = []
+    for name in ["polars", "duckdb"]:
+        try:
+            results.append(
+                run_backend(get_backend(name), str(inputs_path), *mapping_dicts)
+            )
+        except ValueError as e:
+            results.append(str(e))
+
+    # Both backends parse the value, or both report it as malformed
+    if isinstance(results[0], str):
+        assert "malformed Duration" in results[0]
+        assert results[0] == results[1]
+    else:
+        assert_frame_equal(*results)
+
+
+def test_duckdb_backend_invalid(tmp_path, mapping_dicts):
+    pytest.importorskip("duckdb")
+    backend = get_backend("duckdb")
+    header = ";".join(INPUTS_SCHEMA)
+
+    malformed_path = tmp_path / "malformed.csv"
+    malformed_path.write_text(f"{header}\n1;channel1;en;Area=account;1:75:00;57\n")
+    with pytest.raises(ValueError, match="malformed Duration"):
+        run_backend(backend, str(malformed_path), *mapping_dicts)
+
+    empty_path = tmp_path / "empty.csv"
+    empty_path.write_text(f"{header}\n")
+    with pytest.raises(ValueError, match="empty"):
+        run_backend(backend, str(empty_path), *mapping_dicts)
+
+    reordered_path = tmp_path / "reordered.csv"
+    reordered_path.write_text(
+        "id;Language;Channel;CustomFields;Duration;PointsGained\n"
+        "1;en;channel1;Area=account;0:01:00;57\n"
+    )
+    with pytest.raises(ValueError, match="Header"):
+        run_backend(backend, str(reordered_path), *mapping_dicts)
+
+    ipc_path = tmp_path / "inputs.arrow"
+    pl.read_csv(obtain_file_path(), separator=";").write_ipc(ipc_path)
+    with pytest.raises(ValueError, match="can not read ipc"):
+        run_backend(backend, str(ipc_path), *mapping_dicts)
+
+    _, language_dict, customfields_dict = mapping_dicts
+    with pytest.raises(ValueError, match="dict"):
+        run_backend(
+            backend,
+            obtain_file_path(),
+            {"channel1": None},
+            language_dict,
+            customfields_dict,
+        )
+
+
+def test_get_backend(monkeypatch):
+    assert list(BACKENDS) == ["polars", "duckdb"]
+
+    with pytest.raises(ValueError):
+        get_backend("spark")
+
+    # None in sys.modules makes the import fail as if duckdb was not installed
+    monkeypatch.setitem(sys.modules, "duckdb", None)
+    with pytest.raises(ImportError, match="duckdb"):
+        get_backend("duckdb")
+
+
+def test_run_backend_option():
+    pytest.importorskip("duckdb")
+
+    assert_frame_equal(run(backend="duckdb"), run())
+
+    with pytest.raises(SystemExit):
+        run(backend="duckdb", lazy=True)
@@ -0,0 +1,185 @@
+import threading
+
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from benchmarks.generate import generate_inputs
+from main import run
+from src.batched import handle_dimensions_batched, prefetch
+from src.extract import DIMENSION_COLUMNS, get_df_from_csv, read_csv_batches
+from src.mappings import load_mappings
+from src.schemas import INPUTS_SCHEMA
+from src.transform import (
+    handle_dimensions,
+    map_custom_fields,
+    map_non_custom_fields_columns,
+)
+from src.utils import obtain_file_path
+
+
+@pytest.fixture
+def inputs_path(tmp_path):
+    inputs_path = tmp_path / "inputs.csv"
+    generate_inputs(rows=5_000, ids=300, seed=7).write_csv(inputs_path, separator=";")
+    return str(inputs_path)
+
+
+@pytest.fixture
+def mapping_dicts():
+    return load_mappings(file_path=obtain_file_path(desired_file="mappings.csv"))
+
+
+@pytest.mark.parametrize("batch_bytes", [1, 4_096, 1 << 30])
+def test_read_csv_batches(inputs_path, batch_bytes):
+    batches = list(
+        read_csv_batches(
+            file_path=inputs_path, batch_bytes=batch_bytes, schema=INPUTS_SCHEMA
+        )
+    )
+
+    assert_frame_equal(
+        pl.concat(batches),
+        get_df_from_csv(file_path=inputs_path, schema=INPUTS_SCHEMA),
+    )
+    if batch_bytes == 4_096:
+        assert len(batches) > 1
+        assert max(batch.estimated_size() for batch in batches) < 4 * 4_096
+
+
+def test_read_csv_batches_without_schema(tmp_path):
+    # No trailing line break, the dtypes of the first batch are kept
+    inputs_path = tmp_path / "inputs.csv"
+    inputs_path.write_text("id;Duration\n1;0:01:00\n2;0:02:00")
+
+    batches = list(read_csv_batches(file_path=str(inputs_path), batch_bytes=12))
+
+    assert [batch.height for batch in batches] == [1, 1]
+    assert all(
+        batch.schema == {"id": pl.Int64, "Duration": pl.Utf8} for batch in batches
+    )
+
+
+def test_read_csv_batches_invalid(tmp_path, inputs_path):
+    with pytest.raises(FileNotFoundError):
+        next(read_csv_batches(file_path=str(tmp_path / "missing.csv")))
+
+    with pytest.raises(ValueError):
+        next(read_csv_batches(file_path=inputs_path, batch_bytes=0))
+
+    parquet_path = tmp_path / "inputs.parquet"
+    pl.DataFrame({"id": [1]}).write_parquet(parquet_path)
+    with pytest.raises(ValueError):
+        next(read_csv_batches(file_path=str(parquet_path)))
+
+
+@pytest.mark.parametrize("prefetch_depth", [0, 1, 3])
+def test_handle_dimensions_batched(inputs_path, mapping_dicts, prefetch_depth):
+    channel_dict, language_dict, customfields_dict = mapping_dicts
+    expected_df = handle_dimensions(
+        df=map_custom_fields(
+            df=map_non_custom_fields_columns(
+                df=get_df_from_csv(file_path=inputs_path, schema=INPUTS_SCHEMA),
+                channel_dict=channel_dict,
+                language_dict=language_dict,
+            ),
+            mapping_dict=customfields_dict,
+        )
+    )
+
+    # Small batches, so the partial aggregates are also combined on the way
+    result_df = handle_dimensions_batched(
+        inputs_path,
+        *mapping_dicts,
+        schema=INPUTS_SCHEMA,
+        batch_bytes=4_096,
+        prefetch_depth=prefetch_depth,
+    )
+
+    assert_frame_equal(result_df, expected_df)
+
+
+def test_handle_dimensions_batched_invalid(tmp_path, mapping_dicts):
+    empty_path = tmp_path / "empty.csv"
+    empty_path.write_text(";".join(INPUTS_SCHEMA) + "\n")
+
+    with pytest.raises(ValueError, match="no rows"):
+        handle_dimensions_batched(str(empty_path), *mapping_dicts, schema=INPUTS_SCHEMA)
+
+    malformed_path = tmp_path / "malformed.csv"
+    malformed_path.write_text(
+        ";".join(INPUTS_SCHEMA) + "\n1;channel1;en;Area=account;1:23;57\n"
+    )
+
+    with pytest.raises(ValueError, match="malformed Duration"):
+        handle_dimensions_batched(
+            str(malformed_path), *mapping_dicts, schema=INPUTS_SCHEMA
+        )
+
+
+def test_prefetch():
+    produced = []
+
+    def items():
+        for item in range(100):
+            produced.append(item)
+            yield item
+
+    assert list(prefetch(items=items(), depth=2)) == list(range(100))
+
+    # Stopping early stops the producer, which holds at most depth items in the
+    # buffer and one more waiting to be put
+    produced.clear()
+    for item in prefetch(items=items(), depth=2):
+        if item == 10:
+            break
+    assert len(produced) <= 11 + 2 + 1
+    assert threading.active_count() == 1
+
+
+def test_prefetch_error():
+    def items():
+        yield 1
+        raise ValueError("broken batch")
+
+    batches = prefetch(items=items())
+
+    assert next(batches) == 1
+    with pytest.raises(ValueError, match="broken batch"):
+        next(batches)
+
+
+def test_handle_dimensions_batched_consumer_error(
+    inputs_path, mapping_dicts, monkeypatch
+):
+    calls = []
+
+    def failing_map_custom_fields(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 2:
+            raise ValueError("broken mapping")
+        return map_custom_fields(**kwargs)
+
+    monkeypatch.setattr("src.batched.map_custom_fields", failing_map_custom_fields)
+
+    with pytest.raises(ValueError, match="broken mapping") as excinfo:
+        handle_dimensions_batched(
+            inputs_path, *mapping_dicts, schema=INPUTS_SCHEMA, batch_bytes=4096
+        )
+
+    # The traceback keeps the frame, and so the batches, alive: the producer has
+    # only exited if they were closed before the error left
+    assert excinfo.traceback
+    assert not [thread for thread in threading.enumerate() if thread.name == "prefetch"]
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"categorical": True}])
+def test_run_batched(kwargs):
+    result_df = run(batch_bytes=64, **kwargs)
+
+    assert_frame_equal(
+        result_df.with_columns(pl.col(DIMENSION_COLUMNS).cast(pl.Utf8)), run()
+    )
+
+    with pytest.raises(SystemExit):
+        run(batch_bytes=64, lazy=True)
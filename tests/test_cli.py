@@ -0,0 +1,95 @@
+import inspect
+import subprocess
+import sys
+
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+import main
+from src.backends import BACKENDS as PIPELINE_BACKENDS
+from src.cli import BACKENDS, DRIFT_MODES, OUTPUT_FORMATS, build_parser
+from src.cli import main as cli_main
+from src.drift import DRIFT_MODES as PIPELINE_DRIFT_MODES
+from src.load import OUTPUT_FORMATS as LOAD_OUTPUT_FORMATS
+from src.pipeline import run
+from src.utils import obtain_file_path
+
+
+def test_cli_does_not_import_polars():
+    # The modules a --help or a bad argument loads, in a fresh interpreter
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, main, src.cli; print('polars' in sys.modules)",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert completed.stdout.strip() == "False"
+
+
+def test_main_module_exports():
+    assert main.run is run
+    assert main.ROW_INDEX_COLUMN == "__row_nr"
+
+    # Unknown names still raise AttributeError through the lazy __getattr__
+    assert not hasattr(main, "unknown")
+
+
+def test_run_options_match_run():
+    dests = set(vars(build_parser().parse_args(["run"]))) - {"command"}
+
+    assert dests <= set(inspect.signature(run).parameters)
+    assert DRIFT_MODES == PIPELINE_DRIFT_MODES
+    assert OUTPUT_FORMATS == list(LOAD_OUTPUT_FORMATS)
+    assert BACKENDS == list(PIPELINE_BACKENDS)
+
+
+@pytest.mark.parametrize("command", [[], ["run"], ["run", "--lazy"]])
+def test_cli_run(tmp_path, command):
+    output_dir = tmp_path / "output"
+
+    exit_code = cli_main(
+        command
+        + [
+            "--input-path",
+            obtain_file_path(),
+            "--mappings-path",
+            obtain_file_path(desired_file="mappings.csv"),
+            "--output-dir",
+            str(output_dir),
+            "--run-date",
+            "2024-11-20",
+        ]
+    )
+
+    assert exit_code == 0
+    (output_path,) = output_dir.rglob("*.parquet")
+    assert "run_date=2024-11-20" in str(output_path)
+    assert_frame_equal(pl.read_parquet(output_path), run())
+
+
+def test_cli_invalid_arguments():
+    with pytest.raises(SystemExit):
+        cli_main(["--unknown"])
+
+    with pytest.raises(SystemExit):
+        cli_main(["--drift-mode", "ignore"])
+
+
+def test_run_paths(tmp_path):
+    input_path = tmp_path / "batch.csv"
+    with open(obtain_file_path(), encoding="utf-8-sig") as file:
+        input_path.write_text(file.read())
+
+    assert_frame_equal(run(input_path=str(input_path)), run())
+
+    with pytest.raises(SystemExit):
+        run(input_path=str(tmp_path / "missing.csv"))
+
+    with pytest.raises(SystemExit):
+        run(mappings_path=str(tmp_path / "missing.csv"))
@@ -0,0 +1,159 @@
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from src.contracts import (
+    FUSED_PIPELINE_STAGES,
+    check_lazy_frame,
+    check_stage,
+    validate_mappings_frame,
+    validate_pipeline,
+)
+from src.schemas import INPUTS_SCHEMA
+from src.transform import (
+    get_total_points_gained,
+    handle_dimensions,
+    map_custom_fields,
+    map_non_custom_fields_columns,
+)
+
+
+@pytest.fixture
+def input_df():
+    return pl.DataFrame(
+        {
+            "id": [1, 1, 2],
+            "Channel": ["channel1", "channel1", "channel2"],
+            "Language": ["en", "en", "es"],
+            "CustomFields": [
+                "Area=account",
+                "Area=account",
+                "Area=finance;Premium=premium-user",
+            ],
+            "Duration": ["1:23:14", "0:13:04", "0:37:21"],
+            "PointsGained": [57, 12, 30],
+        },
+        schema=INPUTS_SCHEMA,
+    )
+
+
+@pytest.fixture
+def mapping_dicts():
+    return (
+        {"channel1": "Channel1", "channel2": "Channel2"},
+        {"en": "en-US", "es": "es-ES"},
+        {
+            "Area=account": "area=Accounting",
+            "Area=finance": "area=Finance",
+            "Premium=premium-user": "premium=VIP_User",
+        },
+    )
+
+
+def test_check_stage():
+    schema = {"id": pl.Int64, "Channel": pl.Categorical, "Language": pl.Utf8}
+
+    output_schema = check_stage(schema=schema, stage="map_non_custom_fields_columns")
+
+    # The mapped columns keep the dtypes of the columns they map
+    assert output_schema == {
+        **schema,
+        "ChannelB": pl.Categorical,
+        "LanguageB": pl.Utf8,
+    }
+
+
+def test_check_stage_invalid():
+    with pytest.raises(ValueError, match="must contain columns"):
+        check_stage(schema={"Channel": pl.Utf8}, stage="map_non_custom_fields_columns")
+
+    with pytest.raises(ValueError, match="unsupported dtypes"):
+        check_stage(schema={"CustomFields": pl.Int64}, stage="map_custom_fields")
+
+    with pytest.raises(ValueError, match="stage must be one of"):
+        check_stage(schema={}, stage="unknown")
+
+
+def test_validate_pipeline(input_df, mapping_dicts):
+    channel_dict, language_dict, customfields_dict = mapping_dicts
+    result_df = get_total_points_gained(
+        df=handle_dimensions(
+            df=map_custom_fields(
+                df=map_non_custom_fields_columns(
+                    df=input_df, channel_dict=channel_dict, language_dict=language_dict
+                ),
+                mapping_dict=customfields_dict,
+            )
+        )
+    )
+
+    assert validate_pipeline(schema=INPUTS_SCHEMA) == result_df.schema
+    assert (
+        validate_pipeline(schema=INPUTS_SCHEMA, stages=FUSED_PIPELINE_STAGES)
+        == result_df.schema
+    )
+
+    with pytest.raises(ValueError, match="handle_dimensions"):
+        validate_pipeline(
+            schema={**INPUTS_SCHEMA, "PointsGained": pl.Utf8},
+            stages=["map_non_custom_fields_columns", "handle_dimensions"],
+        )
+
+
+def test_check_lazy_frame(input_df):
+    check_lazy_frame(lf=input_df.lazy(), stage="map_custom_fields")
+
+    with pytest.raises(ValueError, match="row_nr"):
+        check_lazy_frame(
+            lf=input_df.lazy(), stage="map_custom_fields", order_column="row_nr"
+        )
+
+
+def test_unvalidated_stages(input_df, mapping_dicts):
+    channel_dict, language_dict, customfields_dict = mapping_dicts
+
+    def run_stages(validate):
+        return get_total_points_gained(
+            df=handle_dimensions(
+                df=map_custom_fields(
+                    df=map_non_custom_fields_columns(
+                        df=input_df,
+                        channel_dict=channel_dict,
+                        language_dict=language_dict,
+                        validate=validate,
+                    ),
+                    mapping_dict=customfields_dict,
+                    validate=validate,
+                ),
+                validate=validate,
+            ),
+            validate=validate,
+        )
+
+    assert_frame_equal(run_stages(validate=False), run_stages(validate=True))
+
+
+def test_validate_mappings_frame():
+    mappings_df = pl.DataFrame(
+        {
+            "Field": ["Channel", "Language"],
+            "SoftwareA": ["channel1", "en"],
+            "SoftwareB": ["Channel1", "en-US"],
+        }
+    )
+
+    validate_mappings_frame(df=mappings_df)
+
+    with pytest.raises(ValueError, match="must not be null"):
+        validate_mappings_frame(
+            df=mappings_df.with_columns(SoftwareB=pl.Series(["Channel1", None]))
+        )
+
+    with pytest.raises(ValueError, match="unsupported dtypes"):
+        validate_mappings_frame(df=mappings_df.with_columns(SoftwareA=pl.lit(1)))
+
+    with pytest.raises(ValueError, match="must contain columns"):
+        validate_mappings_frame(df=mappings_df.drop("Field"))
+
+    with pytest.raises(ValueError, match="empty"):
+        validate_mappings_frame(df=mappings_df.clear())
@@ -0,0 +1,286 @@
+import sqlite3
+import sys
+import types
+from datetime import date
+
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from src.cli import main as cli_main
+from src.database import (
+    COLUMNS,
+    create_table_statements,
+    parse_database_url,
+    write_database,
+)
+from src.pipeline import run
+from src.schemas import OUTPUTS_SCHEMA
+
+RUN_DATE = date(2024, 1, 2)
+
+
+@pytest.fixture
+def result_df():
+    return run()
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    return tmp_path / "results.db"
+
+
+def read_table(database_path, table="mapping_results"):
+    with sqlite3.connect(database_path) as connection:
+        rows = connection.execute(
+            f"SELECT * FROM {table} ORDER BY run_date, rowid"
+        ).fetchall()
+
+    return pl.DataFrame(rows, schema=COLUMNS, orient="row").cast(OUTPUTS_SCHEMA)
+
+
+def test_write_database_sqlite(result_df, database_path):
+    loaded_rows = write_database(
+        data=result_df,
+        database_url=f"sqlite:///{database_path}",
+        run_date=RUN_DATE,
+        batch_size=3,
+    )
+    table_df = read_table(database_path)
+
+    assert loaded_rows == result_df.height
+    assert table_df["run_date"].unique().to_list() == ["2024-01-02"]
+    assert_frame_equal(table_df.drop("run_date"), result_df)
+
+    with sqlite3.connect(database_path) as connection:
+        indexes = connection.execute("PRAGMA index_list(mapping_results)").fetchall()
+    assert [index[1] for index in indexes] == ["mapping_results_id_run_date"]
+
+
+def test_write_database_append_and_upsert(result_df, database_path):
+    database_url = f"sqlite:///{database_path}"
+    for _ in range(2):
+        write_database(data=result_df, database_url=database_url, run_date=RUN_DATE)
+    assert read_table(database_path).height == 2 * result_df.height
+
+    # Reruns replace the rows of their run_date and ids
+    database_path.unlink()
+    for _ in range(2):
+        write_database(
+            data=result_df, database_url=database_url, run_date=RUN_DATE, upsert=True
+        )
+    assert_frame_equal(read_table(database_path).drop("run_date"), result_df)
+
+    # An incremental result only replaces the rows of its ids
+    first_id = result_df["id"][0]
+    updated_df = result_df.filter(pl.col("id") == first_id).with_columns(
+        TotalPointsGained=pl.lit(0, pl.UInt32)
+    )
+    write_database(
+        data=updated_df, database_url=database_url, run_date=RUN_DATE, upsert=True
+    )
+    table_df = read_table(database_path)
+    assert_frame_equal(
+        table_df.filter(pl.col("id") != first_id).drop("run_date"),
+        result_df.filter(pl.col("id") != first_id),
+    )
+    assert (
+        table_df.filter(pl.col("id") == first_id)["TotalPointsGained"].to_list()
+        == [0] * updated_df.height
+    )
+
+    # Other run dates are kept
+    write_database(
+        data=result_df,
+        database_url=database_url,
+        run_date=date(2024, 1, 3),
+        upsert=True,
+    )
+    assert read_table(database_path).height == 2 * result_df.height
+
+
+def test_write_database_invalid(result_df, database_path, monkeypatch):
+    database_url = f"sqlite:///{database_path}"
+
+    with pytest.raises(ValueError, match="database_url"):
+        write_database(data=result_df, database_url="mysql://localhost/db")
+
+    with pytest.raises(ValueError, match="identifier"):
+        write_database(data=result_df, database_url=database_url, table="x; DROP")
+
+    with pytest.raises(ValueError, match="batch_size"):
+        write_database(data=result_df, database_url=database_url, batch_size=0)
+
+    with pytest.raises(ValueError, match="TotalPointsGained"):
+        write_database(
+            data=result_df.drop("TotalPointsGained"), database_url=database_url
+        )
+
+    # None in sys.modules makes the import fail as if psycopg was not installed
+    monkeypatch.setitem(sys.modules, "psycopg", None)
+    with pytest.raises(ImportError, match="psycopg"):
+        write_database(data=result_df, database_url="postgresql://localhost/db")
+
+
+class FakeCursor:
+    """Records the statements and COPY data a psycopg cursor would send."""
+
+    def __init__(self):
+        self.statements = []
+        self.copied = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, statement, params=None):
+        self.statements.append((statement, params))
+
+    def copy(self, statement):
+        self.statements.append((statement, None))
+        return FakeCopy(copied=self.copied)
+
+
+class FakeCopy:
+    def __init__(self, copied):
+        self.copied = copied
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def write(self, data):
+        self.copied.append(data)
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def cursor(self):
+        return self._cursor
+
+
+@pytest.fixture
+def postgres_cursor(monkeypatch):
+    cursor = FakeCursor()
+    psycopg = types.ModuleType("psycopg")
+    psycopg.connect = lambda target: FakeConnection(cursor=cursor)
+    monkeypatch.setitem(sys.modules, "psycopg", psycopg)
+    return cursor
+
+
+def read_copied(cursor):
+    return pl.read_csv(
+        "".join(cursor.copied).encode(),
+        has_header=False,
+        new_columns=COLUMNS,
+        null_values="\\N",
+        schema_overrides=OUTPUTS_SCHEMA,
+    )
+
+
+@pytest.mark.parametrize("upsert", [False, True])
+def test_write_database_postgresql(result_df, postgres_cursor, upsert):
+    result_df = result_df.with_columns(
+        # Nulls are copied as \N, empty strings stay empty
+        CustomFields=pl.when(pl.int_range(pl.len()) == 0)
+        .then(None)
+        .when(pl.int_range(pl.len()) == 1)
+        .then(pl.lit(""))
+        .otherwise(pl.col("CustomFields"))
+    )
+
+    loaded_rows = write_database(
+        data=result_df,
+        database_url="postgresql://user@localhost/db",
+        run_date=RUN_DATE,
+        batch_size=3,
+        upsert=upsert,
+    )
+
+    assert loaded_rows == result_df.height
+    statements = [statement for statement, _ in postgres_cursor.statements]
+    assert statements[:2] == create_table_statements("postgresql", "mapping_results")
+    column_names = ", ".join(f'"{column}"' for column in COLUMNS)
+    copy_table = "mapping_results_staging" if upsert else "mapping_results"
+    copy_statement = (
+        f"COPY {copy_table} ({column_names}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    )
+
+    # Rows are written batch_size at a time, in the order of the result
+    assert len(postgres_cursor.copied) == -(-result_df.height // 3)
+    copied_df = read_copied(postgres_cursor)
+    assert copied_df["run_date"].unique().to_list() == ["2024-01-02"]
+    assert_frame_equal(copied_df.drop("run_date"), result_df)
+
+    if not upsert:
+        assert statements[2:] == [copy_statement]
+        return
+
+    assert statements[2:] == [
+        "CREATE TEMP TABLE mapping_results_staging (LIKE mapping_results) "
+        "ON COMMIT DROP",
+        copy_statement,
+        "DELETE FROM mapping_results WHERE run_date = %s "
+        "AND id IN (SELECT id FROM mapping_results_staging)",
+        f"INSERT INTO mapping_results ({column_names}) "
+        f"SELECT {column_names} FROM mapping_results_staging",
+    ]
+    assert postgres_cursor.statements[4][1] == ("2024-01-02",)
+
+
+def test_parse_database_url():
+    assert parse_database_url("sqlite:///results.db") == ("sqlite", "results.db")
+    assert parse_database_url("sqlite:////tmp/results.db") == (
+        "sqlite",
+        "/tmp/results.db",
+    )
+    assert parse_database_url("postgres://user@host/db") == (
+        "postgresql",
+        "postgres://user@host/db",
+    )
+
+    create_table, create_index = create_table_statements("postgresql", "results")
+    assert '"id" BIGINT NOT NULL' in create_table
+    assert '"run_date" DATE NOT NULL' in create_table
+    assert create_index.endswith("ON results (id, run_date)")
+
+
+def test_run_database_option(result_df, database_path, tmp_path):
+    database_url = f"sqlite:///{database_path}"
+
+    assert_frame_equal(
+        run(database_url=database_url, run_date=RUN_DATE, database_upsert=True),
+        result_df,
+    )
+    assert_frame_equal(
+        run(lazy=True, database_url=database_url, output_dir=str(tmp_path)),
+        result_df,
+    )
+    assert read_table(database_path).height == 2 * result_df.height
+
+    exit_code = cli_main(
+        [
+            "run",
+            "--database-url",
+            database_url,
+            "--database-table",
+            "results",
+            "--database-upsert",
+        ]
+    )
+    assert exit_code == 0
+    assert_frame_equal(
+        read_table(database_path, table="results").drop("run_date"), result_df
+    )
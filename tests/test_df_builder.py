@@ -1,6 +1,10 @@
+import gzip
+
 import pytest
 import polars as pl
-from src.extract import get_df_from_csv
+from polars.testing import assert_frame_equal
+from src.extract import detect_file_format, get_df_from_csv, scan_df_from_csv
+from src.schemas import INPUTS_SCHEMA
 from src.utils import obtain_file_path
 
 
@@ -18,3 +22,88 @@ def test_load_valid_csv(valid_csv):
 def test_file_not_found():
     with pytest.raises(FileNotFoundError):
         get_df_from_csv(file_path="non_existing_file.csv")
+
+
+def test_scan_valid_csv(valid_csv):
+    lf = scan_df_from_csv(valid_csv)
+    assert isinstance(lf, pl.LazyFrame)
+    assert_frame_equal(lf.collect(), get_df_from_csv(valid_csv))
+
+
+def test_scan_file_not_found():
+    with pytest.raises(FileNotFoundError):
+        scan_df_from_csv(file_path="non_existing_file.csv")
+
+
+@pytest.fixture
+def input_files(tmp_path, valid_csv):
+    df = get_df_from_csv(valid_csv)
+
+    gzip_path = tmp_path / "inputs.csv.gz"
+    with open(valid_csv, "rb") as source, gzip.open(gzip_path, "wb") as target:
+        target.write(source.read())
+
+    parquet_path = tmp_path / "inputs.parquet"
+    df.write_parquet(parquet_path)
+
+    # No extension, so the format can only come from the magic bytes
+    ipc_path = tmp_path / "inputs"
+    df.write_ipc(ipc_path)
+
+    return {"csv.gz": gzip_path, "parquet": parquet_path, "ipc": ipc_path}
+
+
+@pytest.mark.parametrize("file_format", ["csv.gz", "parquet", "ipc"])
+def test_load_other_formats(valid_csv, input_files, file_format):
+    file_path = str(input_files[file_format])
+    expected_df = get_df_from_csv(valid_csv)
+
+    assert detect_file_format(file_path) == file_format
+    assert_frame_equal(get_df_from_csv(file_path), expected_df)
+    assert_frame_equal(scan_df_from_csv(file_path).collect(), expected_df)
+
+
+def test_detect_csv(valid_csv):
+    assert detect_file_format(valid_csv) == "csv"
+
+
+def test_load_with_schema(valid_csv):
+    df = get_df_from_csv(valid_csv, schema=INPUTS_SCHEMA)
+    assert df.schema == pl.Schema(INPUTS_SCHEMA)
+    assert_frame_equal(scan_df_from_csv(valid_csv, schema=INPUTS_SCHEMA).collect(), df)
+
+
+def test_load_with_schema_without_bom(tmp_path, valid_csv):
+    # The sample inputs are exported with a UTF-8 BOM, the header check accepts both
+    no_bom_path = tmp_path / "inputs.csv"
+    with open(valid_csv, encoding="utf-8-sig") as source:
+        no_bom_path.write_text(source.read(), encoding="utf-8")
+
+    assert_frame_equal(
+        get_df_from_csv(str(no_bom_path), schema=INPUTS_SCHEMA),
+        get_df_from_csv(valid_csv, schema=INPUTS_SCHEMA),
+    )
+
+
+def test_load_with_schema_wrong_header(tmp_path):
+    csv_path = tmp_path / "inputs.csv"
+    csv_path.write_text(
+        "Channel;id;Language;CustomFields;Duration;PointsGained\n"
+        "Email;1;EN;A1;0:00:10;5\n"
+    )
+
+    with pytest.raises(ValueError):
+        get_df_from_csv(str(csv_path), schema=INPUTS_SCHEMA)
+    with pytest.raises(ValueError):
+        scan_df_from_csv(str(csv_path), schema=INPUTS_SCHEMA)
+
+
+def test_load_with_schema_wrong_value(tmp_path):
+    csv_path = tmp_path / "inputs.csv"
+    csv_path.write_text(
+        "id;Channel;Language;CustomFields;Duration;PointsGained\n"
+        "one;Email;EN;A1;0:00:10;5\n"
+    )
+
+    with pytest.raises(pl.exceptions.ComputeError):
+        get_df_from_csv(str(csv_path), schema=INPUTS_SCHEMA)
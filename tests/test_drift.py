@@ -0,0 +1,234 @@
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from main import run
+from src.drift import (
+    handle_mapping_drift,
+    map_dimensions_with_drift,
+    map_dimensions_with_drift_lazy,
+)
+from src.schemas import DRIFT_SCHEMA
+from src.transform import map_custom_fields, map_non_custom_fields_columns
+
+
+@pytest.fixture
+def input_df():
+    return pl.DataFrame(
+        {
+            "id": [1, 1, 2, 3, 4],
+            "Channel": ["channel1", "channel1", "channel9", None, "channel9"],
+            "Language": ["en", "en", "es", "en", "xx"],
+            "CustomFields": [
+                "Area=account;New=true",
+                "Area=account;New=true",
+                "Area=finance;Premium=premium-user",
+                "Area=customer;Area=customer",
+                None,
+            ],
+            "Duration": ["1:23:14", "0:13:04", "0:37:21", "3:01:47", "1:56:34"],
+            "PointsGained": [57, 12, 30, 254, 71],
+        }
+    )
+
+
+@pytest.fixture
+def mapping_dicts():
+    return (
+        {"channel1": "Channel1", "channel2": "Channel2"},
+        {"en": "en-US", "es": "es-ES"},
+        {
+            "Area=account": "area=Accounting",
+            "Area=finance": "area=Finance",
+            "Area=customer": "area=Customer_Care",
+            "Premium=premium-user": "premium=VIP_User",
+        },
+    )
+
+
+def test_map_dimensions_with_drift(input_df, mapping_dicts):
+    channel_dict, language_dict, customfields_dict = mapping_dicts
+
+    drifts = []
+    mapped_df = map_dimensions_with_drift(
+        df=input_df,
+        channel_dict=channel_dict,
+        language_dict=language_dict,
+        customfields_dict=customfields_dict,
+        on_drift=drifts.append,
+    )
+    (drift,) = drifts
+
+    expected_mapped_df = map_custom_fields(
+        df=map_non_custom_fields_columns(
+            df=input_df, channel_dict=channel_dict, language_dict=language_dict
+        ),
+        mapping_dict=customfields_dict,
+    )
+    expected_unmapped_df = pl.DataFrame(
+        {
+            "Field": ["Channel", "CustomFields", "Language"],
+            "Value": ["channel9", "New=true", "xx"],
+            "Rows": [2, 2, 1],
+            "PointsGained": [101, 69, 71],
+        },
+        schema=DRIFT_SCHEMA,
+    )
+
+    assert_frame_equal(mapped_df, expected_mapped_df)
+    assert drift.total_rows == 5
+    # The null Channel and CustomFields are passed through, but they are not a drift
+    assert drift.unmapped_rows == 4
+    assert drift.unmapped_share == 0.8
+    assert_frame_equal(drift.unmapped_values, expected_unmapped_df)
+
+
+def test_map_dimensions_with_drift_lazy(input_df, mapping_dicts):
+    drifts = []
+    expected_mapped_df = map_dimensions_with_drift(
+        input_df, *mapping_dicts, on_drift=drifts.append
+    )
+
+    mapped_lf = map_dimensions_with_drift_lazy(
+        input_df.lazy(), *mapping_dicts, on_drift=drifts.append
+    )
+
+    assert isinstance(mapped_lf, pl.LazyFrame)
+    # Nothing is checked until the plan runs
+    assert len(drifts) == 1
+
+    assert_frame_equal(mapped_lf.collect(), expected_mapped_df)
+    expected_drift, drift = drifts
+    assert drift.total_rows == expected_drift.total_rows
+    assert drift.unmapped_rows == expected_drift.unmapped_rows
+    assert_frame_equal(drift.unmapped_values, expected_drift.unmapped_values)
+
+
+def test_map_dimensions_with_drift_streaming(input_df, mapping_dicts):
+    drifts = []
+    expected_mapped_df = map_dimensions_with_drift(
+        input_df, *mapping_dicts, on_drift=drifts.append
+    )
+
+    scanned_rows = []
+
+    def record_scan(df):
+        scanned_rows.append(df.height)
+        return df
+
+    mapped_lf = map_dimensions_with_drift_lazy(
+        input_df.lazy().map_batches(record_scan),
+        *mapping_dicts,
+        on_drift=drifts.append,
+    )
+
+    # The counts and the rows share one cached scan, also collected with streaming
+    assert_frame_equal(mapped_lf.collect(streaming=True), expected_mapped_df)
+    assert scanned_rows == [input_df.height]
+    expected_drift, drift = drifts
+    assert drift.unmapped_rows == expected_drift.unmapped_rows
+
+
+def test_find_mapping_drift_empty_tokens(input_df, mapping_dicts):
+    drifts = []
+    map_dimensions_with_drift(
+        input_df.with_columns(
+            CustomFields=pl.Series(["Area=account;", ";", "", None, "Area=finance"])
+        ),
+        *mapping_dicts,
+        on_drift=drifts.append,
+    )
+    (drift,) = drifts
+
+    # Empty and null CustomFields tokens are passed through, they are not a drift
+    assert drift.unmapped_values["Field"].to_list() == ["Channel", "Language"]
+    assert drift.unmapped_rows == 2
+
+
+def test_map_dimensions_with_drift_lazy_fail(input_df, mapping_dicts):
+    def fail(drift):
+        raise ValueError("drift")
+
+    mapped_lf = map_dimensions_with_drift_lazy(
+        input_df.lazy(), *mapping_dicts, on_drift=fail
+    )
+
+    with pytest.raises(pl.exceptions.ComputeError, match="drift"):
+        mapped_lf.collect()
+
+
+def test_map_dimensions_with_drift_invalid_inputs(input_df, mapping_dicts):
+    with pytest.raises(ValueError):
+        map_dimensions_with_drift(pl.DataFrame(), *mapping_dicts, on_drift=print)
+
+    with pytest.raises(ValueError):
+        map_dimensions_with_drift(
+            input_df.drop("PointsGained"), *mapping_dicts, on_drift=print
+        )
+
+    with pytest.raises(ValueError):
+        map_dimensions_with_drift_lazy(
+            input_df.lazy().drop("Language"), *mapping_dicts, on_drift=print
+        )
+
+
+def test_handle_mapping_drift(tmp_path, input_df, mapping_dicts):
+    drifts = []
+    map_dimensions_with_drift(input_df, *mapping_dicts, on_drift=drifts.append)
+    (drift,) = drifts
+    report_path = tmp_path / "drift" / "unmapped.csv"
+
+    with pytest.raises(ValueError, match="4 of 5 rows"):
+        handle_mapping_drift(drift=drift, mode="fail", report_path=str(report_path))
+
+    # The report is written also when the run fails
+    assert_frame_equal(
+        pl.read_csv(report_path, separator=";", schema=DRIFT_SCHEMA),
+        drift.unmapped_values,
+    )
+
+    handle_mapping_drift(drift=drift, mode="fail", threshold=0.8)
+    handle_mapping_drift(drift=drift, mode="warn")
+    handle_mapping_drift(drift=drift, mode="report")
+
+    with pytest.raises(ValueError):
+        handle_mapping_drift(drift=drift, mode="ignore")
+
+    with pytest.raises(ValueError):
+        handle_mapping_drift(drift=drift, threshold=1.5)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"lazy": True}, {"streaming": True}])
+def test_run_drift(tmp_path, kwargs):
+    report_path = tmp_path / "unmapped.csv"
+
+    result_df = run(drift_mode="warn", drift_report_path=str(report_path), **kwargs)
+
+    assert_frame_equal(result_df, run())
+    # The New=true/false tokens of data/inputs.csv are not in data/mappings.csv
+    assert sorted(pl.read_csv(report_path, separator=";")["Value"].to_list()) == [
+        "New=false",
+        "New=true",
+    ]
+
+    with pytest.raises(SystemExit):
+        run(drift_mode="fail", **kwargs)
+
+
+def test_run_drift_sink(tmp_path):
+    report_path = tmp_path / "unmapped.csv"
+
+    run(
+        streaming=True,
+        output_dir=str(tmp_path / "output"),
+        drift_mode="report",
+        drift_report_path=str(report_path),
+    )
+
+    assert pl.read_csv(report_path, separator=";").height == 2
+    assert len(list((tmp_path / "output").rglob("*.parquet"))) == 1
+
+
+def test_run_drift_unsupported():
+    with pytest.raises(SystemExit):
+        run(drift_mode="warn", partitions=2)
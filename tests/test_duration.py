@@ -0,0 +1,104 @@
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from src.duration import (
+    is_malformed_duration,
+    seconds_to_duration,
+    with_duration_seconds,
+)
+from src.transform import handle_dimensions, handle_dimensions_lazy
+
+
+@pytest.fixture
+def durations_df():
+    return pl.DataFrame(
+        {
+            "Duration": [
+                "1:23:14",
+                "0:03:04",
+                "100:00:00",
+                "1:2:3",
+                None,
+                "x:12:00",
+                "1:12",
+                "1:2:3:4",
+                "0:60:00",
+                "12:-1:00",
+                "+1:00:00",
+                "1:+2:03",
+            ],
+        }
+    )
+
+
+def test_with_duration_seconds(durations_df):
+    result_df = with_duration_seconds(frame=durations_df).with_columns(
+        is_malformed_duration().alias("Malformed")
+    )
+
+    expected_df = durations_df.with_columns(
+        pl.Series(
+            "TotalSeconds",
+            [4994, 184, 360000, 3723] + [None] * 8,
+            dtype=pl.Int64,
+        ),
+        pl.Series("Malformed", [False] * 5 + [True] * 7),
+    )
+
+    assert_frame_equal(result_df, expected_df)
+
+
+def test_with_duration_seconds_lazy(durations_df):
+    result_df = with_duration_seconds(frame=durations_df.lazy()).collect()
+
+    assert_frame_equal(result_df, with_duration_seconds(frame=durations_df))
+
+
+def test_handle_dimensions_minutes_above_59():
+    # Summed as 5400 seconds before the H:MM:SS parser, now malformed
+    input_df = pl.DataFrame(
+        {
+            "id": [1],
+            "ChannelB": ["Channel1"],
+            "LanguageB": ["en-US"],
+            "CustomFieldsB": ["area=Accounting"],
+            "Duration": ["0:90:00"],
+            "PointsGained": [57],
+        }
+    )
+
+    with pytest.raises(ValueError, match="Found 1 malformed Duration"):
+        handle_dimensions(df=input_df)
+
+
+def test_seconds_to_duration():
+    df = pl.DataFrame({"TotalSeconds": [4994, 184, 360000, 0]})
+
+    result = df.select(seconds_to_duration())["TotalSeconds"].to_list()
+
+    assert result == ["1:23:14", "0:03:04", "100:00:00", "0:00:00"]
+
+
+def test_handle_dimensions_malformed_duration():
+    input_df = pl.DataFrame(
+        {
+            "id": [1, 1, 2],
+            "ChannelB": ["Channel1", "Channel1", "Channel2"],
+            "LanguageB": ["en-US", "en-US", "es-ES"],
+            "CustomFieldsB": ["area=Accounting", "area=Accounting", "area=Finance"],
+            "Duration": ["1:23:14", None, "1:23"],
+            "PointsGained": [57, 3, 12],
+        }
+    )
+
+    with pytest.raises(ValueError, match="Found 1 malformed Duration"):
+        handle_dimensions(df=input_df)
+
+    with pytest.raises(pl.exceptions.ComputeError, match="malformed Duration"):
+        handle_dimensions_lazy(lf=input_df.lazy()).collect()
+
+    # A missing Duration is not malformed
+    result_df = handle_dimensions(df=input_df.head(2))
+    assert result_df["Duration"].to_list() == ["1:23:14"]
+    assert result_df["PointsGained"].to_list() == [60]
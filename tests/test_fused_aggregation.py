@@ -0,0 +1,99 @@
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from benchmarks.generate import generate_inputs
+from src.transform import (
+    get_total_points_gained,
+    handle_dimensions,
+    handle_dimensions_with_totals,
+    handle_dimensions_with_totals_lazy,
+)
+
+
+@pytest.fixture
+def mapped_df():
+    # Identity mappings are enough, only the aggregation is under test
+    return generate_inputs(rows=5_000, ids=300, seed=7).with_columns(
+        pl.col("Channel").alias("ChannelB"),
+        pl.col("Language").alias("LanguageB"),
+        pl.col("CustomFields").alias("CustomFieldsB"),
+    )
+
+
+def test_fused_matches_two_passes(mapped_df):
+    expected_df = get_total_points_gained(df=handle_dimensions(df=mapped_df))
+
+    assert_frame_equal(handle_dimensions_with_totals(df=mapped_df), expected_df)
+    assert_frame_equal(
+        handle_dimensions_with_totals_lazy(lf=mapped_df.lazy()).collect(), expected_df
+    )
+
+
+def test_fused_lazy_is_one_plan(mapped_df):
+    lf = handle_dimensions_with_totals_lazy(lf=mapped_df.lazy())
+
+    # The aggregated rows are cached and read by both sides of the totals join
+    assert "CACHE" in lf.explain()
+    assert "LEFT JOIN" in lf.explain()
+
+
+def test_fused_lazy_order_column(mapped_df):
+    expected_df = get_total_points_gained(df=handle_dimensions(df=mapped_df))
+
+    lf = handle_dimensions_with_totals_lazy(
+        lf=mapped_df.with_row_index("row_nr").lazy(), order_column="row_nr"
+    )
+
+    assert isinstance(lf, pl.LazyFrame)
+    assert_frame_equal(lf.collect(streaming=True), expected_df)
+
+
+def test_fused_null_id(mapped_df):
+    input_df = mapped_df.with_columns(
+        pl.when(pl.col("id") < 10).then(None).otherwise(pl.col("id")).alias("id")
+    )
+    expected_df = get_total_points_gained(df=handle_dimensions(df=input_df))
+
+    assert_frame_equal(handle_dimensions_with_totals(df=input_df), expected_df)
+    assert_frame_equal(
+        handle_dimensions_with_totals_lazy(
+            lf=input_df.with_row_index("row_nr").lazy(), order_column="row_nr"
+        ).collect(streaming=True),
+        expected_df,
+    )
+
+
+def test_fused_malformed_duration():
+    input_df = pl.DataFrame(
+        {
+            "id": [1, 1, 2],
+            "ChannelB": ["Channel1", "Channel1", "Channel2"],
+            "LanguageB": ["en-US", "en-US", "es-ES"],
+            "CustomFieldsB": ["area=Accounting", "area=Accounting", "area=Finance"],
+            "Duration": ["1:23:14", None, "1:23"],
+            "PointsGained": [57, 3, 12],
+        }
+    )
+
+    with pytest.raises(ValueError, match="Found 1 malformed Duration"):
+        handle_dimensions_with_totals(df=input_df)
+
+    with pytest.raises(pl.exceptions.ComputeError, match="malformed Duration"):
+        handle_dimensions_with_totals_lazy(lf=input_df.lazy()).collect()
+
+    # A missing Duration is not malformed
+    result_df = handle_dimensions_with_totals(df=input_df.head(2))
+    assert result_df["Duration"].to_list() == ["1:23:14"]
+    assert result_df["TotalPointsGained"].to_list() == [60]
+
+
+def test_fused_invalid_inputs(mapped_df):
+    with pytest.raises(ValueError):
+        handle_dimensions_with_totals(df=pl.DataFrame())
+
+    with pytest.raises(ValueError):
+        handle_dimensions_with_totals(df=mapped_df.drop("LanguageB"))
+
+    with pytest.raises(ValueError):
+        handle_dimensions_with_totals_lazy(lf=mapped_df.lazy(), order_column="row_nr")
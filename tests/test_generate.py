@@ -0,0 +1,49 @@
+from polars.testing import assert_frame_equal
+
+from benchmarks.generate import generate_inputs, generate_mappings
+from src.extract import get_mappings_dict
+from src.schemas import INPUTS_SCHEMA
+from src.transform import (
+    handle_dimensions,
+    map_custom_fields,
+    map_non_custom_fields_columns,
+)
+
+
+def test_generate_inputs_is_seeded():
+    assert_frame_equal(generate_inputs(rows=1_000), generate_inputs(rows=1_000))
+    assert not generate_inputs(rows=1_000, seed=1).equals(
+        generate_inputs(rows=1_000, seed=2)
+    )
+
+
+def test_generate_inputs_shape():
+    df = generate_inputs(
+        rows=10_000, ids=50, custom_fields_tokens=2, duplicate_ratio=0.5
+    )
+
+    assert df.schema == INPUTS_SCHEMA
+    assert df["id"].n_unique() <= 50
+    assert df["CustomFields"].str.count_matches(";").max() <= 1
+    # Up to the rare collisions of the generated dimensions
+    unique_dimensions = df.select(["id", "Channel", "Language", "CustomFields"])
+    assert unique_dimensions.n_unique() <= 5_000
+
+
+def test_generated_data_runs_through_the_pipeline():
+    inputs_df = generate_inputs(rows=1_000, duplicate_ratio=0.3)
+    channel_dict, language_dict, customfields_dict = get_mappings_dict(
+        df=generate_mappings()
+    )
+
+    result_df = handle_dimensions(
+        df=map_custom_fields(
+            df=map_non_custom_fields_columns(
+                df=inputs_df, channel_dict=channel_dict, language_dict=language_dict
+            ),
+            mapping_dict=customfields_dict,
+        )
+    )
+
+    assert result_df.height == 700
+    assert result_df["PointsGained"].sum() == inputs_df["PointsGained"].sum()
@@ -0,0 +1,119 @@
+import os
+
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from main import run
+from src.extract import DIMENSION_COLUMNS, get_df_from_csv
+from src.inputs_cache import evict_inputs_cache, load_inputs
+from src.schemas import INPUTS_SCHEMA
+from src.utils import obtain_file_path
+
+
+@pytest.fixture
+def inputs_path(tmp_path):
+    # A copy, so the tests can touch it without changing data/inputs.csv
+    inputs_path = tmp_path / "inputs.csv"
+    with open(obtain_file_path(), "rb") as file:
+        inputs_path.write_bytes(file.read())
+    return str(inputs_path)
+
+
+@pytest.fixture
+def expected_df(inputs_path):
+    return get_df_from_csv(file_path=inputs_path, schema=INPUTS_SCHEMA)
+
+
+def test_load_without_cache(inputs_path, expected_df):
+    assert_frame_equal(
+        load_inputs(file_path=inputs_path, schema=INPUTS_SCHEMA), expected_df
+    )
+
+
+def test_load_with_cache(tmp_path, monkeypatch, inputs_path, expected_df):
+    cache_dir = str(tmp_path / "cache")
+
+    assert_frame_equal(
+        load_inputs(file_path=inputs_path, schema=INPUTS_SCHEMA, cache_dir=cache_dir),
+        expected_df,
+    )
+    assert len(os.listdir(cache_dir)) == 1
+
+    # Served from the cache, the CSV is not parsed again
+    monkeypatch.setattr(pl, "read_csv", None)
+    assert_frame_equal(
+        load_inputs(file_path=inputs_path, schema=INPUTS_SCHEMA, cache_dir=cache_dir),
+        expected_df,
+    )
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_cache_keyed_by_content_and_schema(tmp_path, inputs_path):
+    cache_dir = str(tmp_path / "cache")
+
+    load_inputs(file_path=inputs_path, schema=INPUTS_SCHEMA, cache_dir=cache_dir)
+    load_inputs(
+        file_path=inputs_path,
+        schema={**INPUTS_SCHEMA, "Channel": pl.Categorical},
+        cache_dir=cache_dir,
+    )
+    assert len(os.listdir(cache_dir)) == 2
+
+    with open(inputs_path, "a", encoding="utf-8") as file:
+        file.write("9;channel1;en;Area=account;0:01:00;1\n")
+    df = load_inputs(file_path=inputs_path, schema=INPUTS_SCHEMA, cache_dir=cache_dir)
+
+    assert df["id"][-1] == 9
+    assert len(os.listdir(cache_dir)) == 3
+
+
+def test_evict_inputs_cache(tmp_path, inputs_path):
+    cache_dir = str(tmp_path / "cache")
+    for column in ["Channel", "Language", "CustomFields"]:
+        load_inputs(
+            file_path=inputs_path,
+            schema={**INPUTS_SCHEMA, column: pl.Categorical},
+            cache_dir=cache_dir,
+        )
+    paths = sorted(
+        (os.path.join(cache_dir, name) for name in os.listdir(cache_dir)),
+        key=os.path.getmtime,
+    )
+    for age, path in zip([300, 200, 100], paths):
+        os.utime(path, (0, os.path.getmtime(path) - age))
+
+    assert evict_inputs_cache(cache_dir=cache_dir, max_age_seconds=250) == paths[:1]
+    # The least recently used entry goes first
+    entry_bytes = os.path.getsize(paths[2])
+    assert evict_inputs_cache(cache_dir=cache_dir, max_bytes=entry_bytes) == paths[1:2]
+    assert os.listdir(cache_dir) == [os.path.basename(paths[2])]
+
+    # The entry in use is kept even above the budget
+    load_inputs(
+        file_path=inputs_path,
+        schema=INPUTS_SCHEMA,
+        cache_dir=cache_dir,
+        max_bytes=0,
+    )
+    assert len(os.listdir(cache_dir)) == 1
+
+    with pytest.raises(ValueError):
+        evict_inputs_cache(cache_dir=cache_dir, max_bytes=-1)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"categorical": True}])
+def test_run_input_cache(tmp_path, kwargs):
+    cache_dir = str(tmp_path / "cache")
+    expected_df = run().with_columns(pl.col(DIMENSION_COLUMNS).cast(pl.Utf8))
+
+    for _ in range(2):
+        result_df = run(input_cache_dir=cache_dir, **kwargs)
+        assert_frame_equal(
+            result_df.with_columns(pl.col(DIMENSION_COLUMNS).cast(pl.Utf8)),
+            expected_df,
+        )
+    assert len(os.listdir(cache_dir)) == 1
+
+    with pytest.raises(SystemExit):
+        run(input_cache_dir=cache_dir, lazy=True)
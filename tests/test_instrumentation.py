@@ -0,0 +1,133 @@
+import json
+import time
+
+import pytest
+import polars as pl
+
+from src.instrumentation import instrumented, record_run
+from main import run
+
+
+@instrumented
+def double(df: pl.DataFrame) -> pl.DataFrame:
+    return pl.concat([df, df])
+
+
+@instrumented
+def nested(df: pl.DataFrame) -> pl.DataFrame:
+    return double(df=double(df=df))
+
+
+@instrumented
+def failing(df: pl.DataFrame) -> pl.DataFrame:
+    raise ValueError("failing stage")
+
+
+@instrumented
+def allocate(df: pl.DataFrame) -> pl.DataFrame:
+    # About 200MB held for a few samples, then released before the stage ends
+    values = pl.zeros(25_000_000, dtype=pl.Int64, eager=True) + 1
+    time.sleep(0.05)
+    del values
+    return df
+
+
+@pytest.fixture
+def df():
+    return pl.DataFrame({"id": [1, 2, 3]})
+
+
+def test_without_report(df):
+    with record_run() as report:
+        assert report is None
+        assert double(df=df).height == 6
+
+
+def test_stage_metrics(tmp_path, df):
+    with record_run(report_path=str(tmp_path / "report.json")) as report:
+        nested(df=df)
+
+    assert report.status == "success"
+    assert [(stage.name, stage.depth) for stage in report.stages] == [
+        ("double", 1),
+        ("double", 1),
+        ("nested", 0),
+    ]
+    assert [stage.input_rows for stage in report.stages] == [3, 6, 3]
+    assert [stage.output_rows for stage in report.stages] == [6, 12, 12]
+    assert all(stage.peak_rss_bytes > 0 for stage in report.stages)
+
+    written = json.loads((tmp_path / "report.json").read_text())
+    assert written["status"] == "success"
+    assert len(written["stages"]) == 3
+
+
+def test_failed_run_is_reported(tmp_path, df):
+    prometheus_path = tmp_path / "job.prom"
+
+    with pytest.raises(ValueError), record_run(prometheus_path=str(prometheus_path)):
+        double(df=df)
+        failing(df=df)
+
+    metrics = prometheus_path.read_text()
+    assert "mapping_job_run_success 0" in metrics
+    assert 'mapping_job_stage_output_rows{stage="double",step="0"} 6' in metrics
+    # The failed stage is recorded too
+    assert 'mapping_job_stage_wall_seconds{stage="failing",step="1"}' in metrics
+
+
+def test_failed_stage_metrics(tmp_path, df):
+    with (
+        pytest.raises(ValueError),
+        record_run(report_path=str(tmp_path / "report.json")) as report,
+    ):
+        nested(df=df)
+        failing(df=df)
+
+    assert [stage.name for stage in report.stages] == [
+        "double",
+        "double",
+        "nested",
+        "failing",
+    ]
+    failed_stage = report.stages[-1]
+    assert failed_stage.error == "ValueError: failing stage"
+    assert failed_stage.input_rows == 3
+    assert failed_stage.output_rows is None
+    assert all(stage.error is None for stage in report.stages[:-1])
+
+    written = json.loads((tmp_path / "report.json").read_text())
+    assert written["stages"][-1]["error"] == "ValueError: failing stage"
+
+
+def test_stage_peak_rss(tmp_path, df):
+    with record_run(report_path=str(tmp_path / "report.json")) as report:
+        allocate(df=df)
+        double(df=df)
+
+    allocate_stage, double_stage = report.stages
+    # Each stage has its own peak, not the all-time peak of the process
+    assert allocate_stage.peak_rss_bytes - allocate_stage.rss_bytes > 100 * 2**20
+    assert allocate_stage.peak_rss_bytes - double_stage.peak_rss_bytes > 100 * 2**20
+    assert report.peak_rss_bytes >= allocate_stage.peak_rss_bytes
+
+
+def test_main_report(tmp_path):
+    report_path = tmp_path / "report.json"
+    prometheus_path = tmp_path / "job.prom"
+
+    run(report_path=str(report_path), prometheus_path=str(prometheus_path))
+
+    report = json.loads(report_path.read_text())
+    stage_names = [stage["name"] for stage in report["stages"]]
+    assert report["status"] == "success"
+    assert stage_names == [
+        "get_df_from_csv",
+        "get_df_from_csv",
+        "get_mappings_dict",
+        "load_mappings",
+        "map_non_custom_fields_columns",
+        "map_custom_fields",
+        "handle_dimensions_with_totals",
+    ]
+    assert "mapping_job_run_success 1" in prometheus_path.read_text()
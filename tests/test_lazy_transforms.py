@@ -0,0 +1,118 @@
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+from src.utils import obtain_file_path
+from src.transform import (
+    map_non_custom_fields_columns,
+    map_custom_fields,
+    handle_dimensions,
+    get_total_points_gained,
+    map_non_custom_fields_columns_lazy,
+    map_custom_fields_lazy,
+    handle_dimensions_lazy,
+    get_total_points_gained_lazy,
+)
+
+
+@pytest.fixture
+def input_df():
+    path = obtain_file_path()
+    df = pl.read_csv(source=path, separator=";")
+
+    return df
+
+
+@pytest.fixture
+def channel_dict():
+    return {"channel1": "Channel1", "channel2": "Channel2", "channel3": "Channel3"}
+
+
+@pytest.fixture
+def language_dict():
+    return {"en": "en-US", "en_us": "en-US", "es": "es-ES"}
+
+
+@pytest.fixture
+def custom_fields_mapping():
+    return {
+        "Area=account": "area=Accounting",
+        "Area=finance": "area=Finance",
+        "Area=customer": "area=Customer_Care",
+        "Premium=premium-user": "premium=VIP_User",
+    }
+
+
+def test_lazy_matches_eager(
+    input_df, channel_dict, language_dict, custom_fields_mapping
+):
+    eager_df = map_non_custom_fields_columns(
+        df=input_df, channel_dict=channel_dict, language_dict=language_dict
+    )
+    eager_df = map_custom_fields(df=eager_df, mapping_dict=custom_fields_mapping)
+    eager_df = get_total_points_gained(df=handle_dimensions(df=eager_df))
+
+    lf = map_non_custom_fields_columns_lazy(
+        lf=input_df.lazy(), channel_dict=channel_dict, language_dict=language_dict
+    )
+    lf = map_custom_fields_lazy(lf=lf, mapping_dict=custom_fields_mapping)
+    lf = get_total_points_gained_lazy(lf=handle_dimensions_lazy(lf=lf))
+
+    assert isinstance(lf, pl.LazyFrame)
+    assert_frame_equal(lf.collect(), eager_df)
+
+
+def test_missing_columns(input_df, channel_dict, language_dict):
+    lf = input_df.lazy().drop("Channel")
+
+    with pytest.raises(ValueError):
+        map_non_custom_fields_columns_lazy(
+            lf=lf, channel_dict=channel_dict, language_dict=language_dict
+        )
+
+    with pytest.raises(ValueError):
+        handle_dimensions_lazy(lf=input_df.lazy())
+
+
+def test_invalid_dict(input_df):
+    invalid_dict = {1: "area=Accounting"}
+
+    with pytest.raises(ValueError):
+        map_custom_fields_lazy(lf=input_df.lazy(), mapping_dict=invalid_dict)
+
+
+def test_handle_dimensions_order_column(
+    input_df, channel_dict, language_dict, custom_fields_mapping
+):
+    df = map_non_custom_fields_columns(
+        df=input_df, channel_dict=channel_dict, language_dict=language_dict
+    )
+    df = map_custom_fields(df=df, mapping_dict=custom_fields_mapping)
+
+    lf = handle_dimensions_lazy(
+        lf=df.with_row_index("row_nr").lazy(), order_column="row_nr"
+    )
+
+    assert_frame_equal(lf.collect(streaming=True), handle_dimensions(df=df))
+
+
+@pytest.mark.parametrize("categorical", [False, True])
+def test_lazy_mapping_single_scan(
+    tmp_path, input_df, channel_dict, language_dict, custom_fields_mapping, categorical
+):
+    input_path = tmp_path / "inputs.csv"
+    input_df.write_csv(input_path, separator=";")
+    dtype = pl.Categorical if categorical else pl.Utf8
+    lf = pl.scan_csv(
+        input_path,
+        separator=";",
+        schema_overrides={"Channel": dtype, "Language": dtype, "CustomFields": dtype},
+    )
+
+    lf = map_non_custom_fields_columns_lazy(
+        lf=lf, channel_dict=channel_dict, language_dict=language_dict
+    )
+    lf = map_custom_fields_lazy(lf=lf, mapping_dict=custom_fields_mapping)
+
+    # The mappings must not join a second scan of the input for its distinct values
+    for streaming in [False, True]:
+        assert lf.explain(streaming=streaming).count("SCAN") == 1
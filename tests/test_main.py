@@ -1,15 +1,20 @@
+from datetime import date
+
 import pytest
+import polars as pl
 from polars.testing import assert_frame_equal
 
 from src.utils import obtain_file_path
-from src.extract import get_df_from_csv
+from src.extract import DIMENSION_COLUMNS, get_df_from_csv
+from src.schemas import OUTPUTS_SCHEMA
+import src.load
 from main import run
 
 
 @pytest.fixture
 def outputs_df():
     path = obtain_file_path(desired_file="outputs.csv")
-    df = get_df_from_csv(file_path=path)
+    df = get_df_from_csv(file_path=path, schema=OUTPUTS_SCHEMA)
 
     return df
 
@@ -18,3 +23,92 @@ def test_main(outputs_df):
     result_df = run()
 
     assert_frame_equal(result_df, outputs_df)
+
+
+def test_main_lazy(outputs_df):
+    result_df = run(lazy=True)
+
+    assert_frame_equal(result_df, outputs_df)
+
+
+@pytest.mark.parametrize("streaming_chunk_size", [None, 1])
+def test_main_streaming(outputs_df, streaming_chunk_size):
+    result_df = run(streaming=True, streaming_chunk_size=streaming_chunk_size)
+
+    assert_frame_equal(result_df, outputs_df)
+
+
+@pytest.mark.parametrize(
+    "mode", [{}, {"lazy": True}, {"streaming": True, "streaming_chunk_size": 1}]
+)
+def test_main_categorical(outputs_df, mode):
+    result_df = run(categorical=True, **mode)
+
+    assert result_df.schema["CustomFields"] == pl.Categorical
+    assert_frame_equal(
+        result_df.with_columns(pl.col(DIMENSION_COLUMNS).cast(pl.Utf8)), outputs_df
+    )
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_main_output(tmp_path, outputs_df, lazy):
+    result_df = run(lazy=lazy, output_dir=str(tmp_path), run_date=date(2024, 11, 20))
+
+    written_df = pl.read_parquet(
+        str(tmp_path / "run_date=2024-11-20" / "part-0.parquet")
+    )
+    assert_frame_equal(written_df, outputs_df)
+    assert_frame_equal(result_df, outputs_df)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"lazy": True},
+        {"streaming": True},
+        {"streaming": True, "output_format": "ipc"},
+    ],
+)
+def test_main_output_sink(tmp_path, outputs_df, monkeypatch, caplog, kwargs):
+    sink_calls = []
+    sink = src.load._sink
+
+    def recording_sink(**sink_kwargs):
+        sink(**sink_kwargs)
+        sink_calls.append(sink_kwargs["path"])
+
+    monkeypatch.setattr(src.load, "_sink", recording_sink)
+
+    result_df = run(output_dir=str(tmp_path), run_date=date(2024, 11, 20), **kwargs)
+
+    # The whole plan is sunk, without the collect fallback of write_output
+    assert len(sink_calls) == 1
+    assert "can not be streamed" not in caplog.text
+    if kwargs.get("output_format") == "ipc":
+        written_df = pl.read_ipc(
+            tmp_path / "run_date=2024-11-20" / "part-0.arrow", memory_map=False
+        )
+    else:
+        written_df = pl.read_parquet(
+            tmp_path / "run_date=2024-11-20" / "part-0.parquet"
+        )
+    assert_frame_equal(written_df, outputs_df)
+    assert_frame_equal(result_df, outputs_df)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"lazy": True, "inputs": "data"},
+        {"streaming": True, "state_path": "state.parquet"},
+        {"inputs": "data", "partitions": 2},
+        {"input_cache_dir": "cache", "batch_bytes": 64},
+        {"categorical": True, "backend": "duckdb"},
+    ],
+)
+def test_main_incompatible_options(kwargs, caplog):
+    with pytest.raises(SystemExit):
+        run(**kwargs)
+
+    option, other_option = kwargs
+    assert f"{option} can not be combined with: {other_option}" in caplog.text
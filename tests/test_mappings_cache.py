@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from src.extract import get_df_from_csv, get_mappings_dict
+from src.mappings import load_mappings
+from src.schemas import MAPPINGS_SCHEMA
+from src.utils import obtain_file_path
+
+
+@pytest.fixture
+def mappings_path():
+    return obtain_file_path(desired_file="mappings.csv")
+
+
+@pytest.fixture
+def expected_dicts(mappings_path):
+    return get_mappings_dict(
+        df=get_df_from_csv(file_path=mappings_path, schema=MAPPINGS_SCHEMA)
+    )
+
+
+def test_load_without_cache(mappings_path, expected_dicts):
+    assert load_mappings(file_path=mappings_path) == expected_dicts
+
+
+def test_load_with_cache(tmp_path, mappings_path, expected_dicts):
+    cache_dir = str(tmp_path / "cache")
+
+    assert load_mappings(file_path=mappings_path, cache_dir=cache_dir) == expected_dicts
+    assert len(os.listdir(cache_dir)) == 1
+
+    # Served from the cache, the CSV is not compiled again
+    assert load_mappings(file_path=mappings_path, cache_dir=cache_dir) == expected_dicts
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_cache_keyed_by_content(tmp_path, mappings_path):
+    cache_dir = str(tmp_path / "cache")
+    changed_path = tmp_path / "mappings.csv"
+    with open(mappings_path, encoding="utf-8-sig") as file:
+        changed_path.write_text(file.read() + "Channel;channel4;Channel4\n")
+
+    load_mappings(file_path=mappings_path, cache_dir=cache_dir)
+    channel_dict, _, _ = load_mappings(file_path=str(changed_path), cache_dir=cache_dir)
+
+    assert channel_dict["channel4"] == "Channel4"
+    assert len(os.listdir(cache_dir)) == 2
@@ -64,3 +64,24 @@ def test_missing_columns():
 
     with pytest.raises(ValueError):
         get_mappings_dict(df=df)
+
+
+def test_null_mapping():
+    df = pl.DataFrame(
+        {
+            "Field": ["Channel", "Language"],
+            "SoftwareA": ["channel1", "en"],
+            "SoftwareB": ["Channel1", None],
+        }
+    )
+
+    with pytest.raises(ValueError):
+        get_mappings_dict(df=df)
+
+
+def test_missing_field(mappings_df):
+    df = mappings_df.filter(pl.col("Field") != "Language")
+
+    _, language_dict, _ = get_mappings_dict(df=df)
+
+    assert language_dict == {}
@@ -70,3 +70,17 @@ def test_invalid_dict(input_df):
 
     with pytest.raises(ValueError):
         map_custom_fields(df=input_df, mapping_dict=invalid_dict)
+
+
+def test_modify_custom_fields_per_row(input_df, custom_fields_mapping):
+    input_df = pl.concat([input_df, input_df.head(1).with_columns(CustomFields=None)])
+
+    result_df = map_custom_fields(
+        df=input_df, mapping_dict=custom_fields_mapping, by_distinct_values=True
+    )
+    per_row_df = map_custom_fields(
+        df=input_df, mapping_dict=custom_fields_mapping, by_distinct_values=False
+    )
+
+    assert_frame_equal(result_df, per_row_df)
+    assert result_df["CustomFieldsB"][-1] is None
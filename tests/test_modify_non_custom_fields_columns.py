@@ -123,3 +123,32 @@ def test_invalid_dict():
         map_non_custom_fields_columns(
             df=df, channel_dict=channel_dict, language_dict=language_dict
         )
+
+
+def test_modify_categorical_columns(input_df):
+    channel_dict = {
+        "channel1": "Channel1",
+        "channel2": "Channel2",
+        "channel3": "Channel3",
+    }
+    language_dict = {"en": "en-US", "en_us": "en-US", "es": "es-ES"}
+
+    with pl.StringCache():
+        categorical_df = input_df.with_columns(
+            pl.col(["Channel", "Language"]).cast(pl.Categorical)
+        )
+        result_df = map_non_custom_fields_columns(
+            df=categorical_df, channel_dict=channel_dict, language_dict=language_dict
+        )
+
+    expected_df = map_non_custom_fields_columns(
+        df=input_df, channel_dict=channel_dict, language_dict=language_dict
+    )
+
+    assert result_df.schema["ChannelB"] == pl.Categorical
+    assert_frame_equal(
+        result_df.with_columns(
+            pl.col(["Channel", "Language", "ChannelB", "LanguageB"]).cast(pl.Utf8)
+        ),
+        expected_df,
+    )
@@ -0,0 +1,140 @@
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from src.extract import get_df_from_csv, get_mappings_dict
+from src.parallel import handle_dimensions_files
+from src.schemas import INPUTS_SCHEMA, MAPPINGS_SCHEMA, OUTPUTS_SCHEMA
+from src.transform import (
+    aggregate_partial_dimensions,
+    handle_dimensions,
+    map_custom_fields,
+    map_non_custom_fields_columns,
+    merge_partial_dimensions,
+)
+from src.utils import obtain_file_path, obtain_file_paths
+from main import run
+
+
+@pytest.fixture
+def mapping_dicts():
+    mappings_df = get_df_from_csv(
+        file_path=obtain_file_path(desired_file="mappings.csv"),
+        schema=MAPPINGS_SCHEMA,
+    )
+    channel_dict, language_dict, customfields_dict = get_mappings_dict(df=mappings_df)
+    return {
+        "channel_dict": channel_dict,
+        "language_dict": language_dict,
+        "customfields_dict": customfields_dict,
+    }
+
+
+@pytest.fixture
+def split_inputs(tmp_path):
+    # Every row in its own file, so each id is spread over several files
+    inputs_df = get_df_from_csv(file_path=obtain_file_path(), schema=INPUTS_SCHEMA)
+    for index in range(inputs_df.height):
+        inputs_df.slice(index, 1).write_csv(
+            tmp_path / f"inputs-{index:02d}.csv", separator=";"
+        )
+
+    return tmp_path
+
+
+@pytest.fixture
+def expected_dimensions_df(mapping_dicts):
+    inputs_df = get_df_from_csv(file_path=obtain_file_path(), schema=INPUTS_SCHEMA)
+    mapped_df = map_custom_fields(
+        df=map_non_custom_fields_columns(
+            df=inputs_df,
+            channel_dict=mapping_dicts["channel_dict"],
+            language_dict=mapping_dicts["language_dict"],
+        ),
+        mapping_dict=mapping_dicts["customfields_dict"],
+    )
+    return handle_dimensions(df=mapped_df)
+
+
+def test_obtain_file_paths(split_inputs):
+    directory_paths = obtain_file_paths(str(split_inputs))
+    glob_paths = obtain_file_paths(str(split_inputs / "inputs-*.csv"))
+
+    assert directory_paths == glob_paths
+    assert len(directory_paths) == 5
+    assert directory_paths == sorted(directory_paths)
+
+
+def test_obtain_file_paths_not_found(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        obtain_file_paths(str(tmp_path / "*.csv"))
+
+
+def test_merge_partial_dimensions(expected_dimensions_df):
+    mapped_df = pl.DataFrame(
+        {
+            "id": [1, 2, 1],
+            "ChannelB": ["Email", "Email", "Email"],
+            "LanguageB": ["EN", "EN", "EN"],
+            "CustomFieldsB": ["A", "A", "A"],
+            "Duration": ["0:00:50", "1:00:00", "0:00:20"],
+            "PointsGained": [1, 2, 3],
+        }
+    )
+    partial_dfs = [
+        aggregate_partial_dimensions(df=mapped_df.slice(index, 1))
+        for index in range(mapped_df.height)
+    ]
+
+    assert_frame_equal(
+        merge_partial_dimensions(df=pl.concat(partial_dfs)),
+        handle_dimensions(df=mapped_df),
+    )
+
+
+def test_merge_partial_dimensions_malformed():
+    partial_df = aggregate_partial_dimensions(
+        df=pl.DataFrame(
+            {
+                "id": [1],
+                "ChannelB": ["Email"],
+                "LanguageB": ["EN"],
+                "CustomFieldsB": ["A"],
+                "Duration": ["0:61:00"],
+                "PointsGained": [1],
+            }
+        )
+    )
+
+    with pytest.raises(ValueError):
+        merge_partial_dimensions(df=partial_df)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_handle_dimensions_files(
+    split_inputs, mapping_dicts, expected_dimensions_df, max_workers
+):
+    result_df = handle_dimensions_files(
+        file_paths=obtain_file_paths(str(split_inputs)),
+        schema=INPUTS_SCHEMA,
+        max_workers=max_workers,
+        **mapping_dicts,
+    )
+
+    assert_frame_equal(result_df, expected_dimensions_df)
+
+
+def test_handle_dimensions_files_no_files(mapping_dicts):
+    with pytest.raises(ValueError):
+        handle_dimensions_files(file_paths=[], **mapping_dicts)
+
+
+@pytest.mark.parametrize("categorical", [False, True])
+def test_main_inputs(split_inputs, categorical):
+    outputs_df = get_df_from_csv(
+        file_path=obtain_file_path(desired_file="outputs.csv"), schema=OUTPUTS_SCHEMA
+    )
+
+    result_df = run(inputs=str(split_inputs), max_workers=2, categorical=categorical)
+
+    assert_frame_equal(result_df, outputs_df, check_dtypes=not categorical)
@@ -0,0 +1,142 @@
+import os
+
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from benchmarks.generate import generate_inputs, generate_mappings
+from src.extract import get_mappings_dict
+from src.partitioned import partition_by_id, run_partitioned
+from src.transform import (
+    get_total_points_gained,
+    handle_dimensions,
+    map_custom_fields,
+    map_non_custom_fields_columns,
+)
+from main import run
+
+
+@pytest.fixture(scope="module")
+def generated_inputs(tmp_path_factory):
+    path = tmp_path_factory.mktemp("inputs") / "inputs.csv"
+    generate_inputs(rows=5_000, ids=300, duplicate_ratio=0.4).write_csv(
+        path, separator=";"
+    )
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def mapping_dicts():
+    channel_dict, language_dict, customfields_dict = get_mappings_dict(
+        df=generate_mappings()
+    )
+    return {
+        "channel_dict": channel_dict,
+        "language_dict": language_dict,
+        "customfields_dict": customfields_dict,
+    }
+
+
+@pytest.fixture(scope="module")
+def expected_df(generated_inputs, mapping_dicts):
+    inputs_df = pl.read_csv(generated_inputs, separator=";")
+    mapped_df = map_custom_fields(
+        df=map_non_custom_fields_columns(
+            df=inputs_df,
+            channel_dict=mapping_dicts["channel_dict"],
+            language_dict=mapping_dicts["language_dict"],
+        ),
+        mapping_dict=mapping_dicts["customfields_dict"],
+    )
+    return get_total_points_gained(df=handle_dimensions(df=mapped_df))
+
+
+@pytest.mark.parametrize("shards, max_workers", [(1, 1), (4, 1), (3, 2)])
+def test_run_partitioned(
+    generated_inputs, mapping_dicts, expected_df, shards, max_workers
+):
+    result_df = run_partitioned(
+        file_path=generated_inputs,
+        shards=shards,
+        max_workers=max_workers,
+        **mapping_dicts,
+    )
+
+    assert_frame_equal(result_df, expected_df, check_dtypes=False)
+
+
+def test_partition_by_id(tmp_path, generated_inputs, monkeypatch):
+    read_ipc_paths = []
+    read_ipc = pl.read_ipc
+
+    def spy_read_ipc(source, *args, **kwargs):
+        read_ipc_paths.append(source)
+        return read_ipc(source, *args, **kwargs)
+
+    monkeypatch.setattr(pl, "read_ipc", spy_read_ipc)
+    shard_paths = partition_by_id(
+        file_path=generated_inputs, shards=5, spill_dir=str(tmp_path), batch_rows=1_000
+    )
+    monkeypatch.undo()
+
+    # The spill file is read once, whatever the number of shards
+    assert read_ipc_paths == [str(tmp_path / "inputs.arrow")]
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(p) for p in shard_paths]
+
+    shard_dfs = [
+        pl.concat(
+            pl.read_ipc(os.path.join(path, name)) for name in sorted(os.listdir(path))
+        )
+        for path in shard_paths
+    ]
+    assert all(len(os.listdir(path)) == 5 for path in shard_paths)
+    assert all(not shard_df.is_empty() for shard_df in shard_dfs)
+    assert sum(shard_df.height for shard_df in shard_dfs) == 5_000
+    # Every id lives in exactly one shard, and the rows keep the input order
+    shard_ids = [set(shard_df["id"]) for shard_df in shard_dfs]
+    assert sum(len(ids) for ids in shard_ids) == len(set().union(*shard_ids))
+    assert all(shard_df["__row_nr"].is_sorted() for shard_df in shard_dfs)
+
+
+def test_run_partitioned_reused_spill_dir(tmp_path, generated_inputs, mapping_dicts):
+    spill_dir = str(tmp_path / "spill")
+    run_partitioned(
+        file_path=generated_inputs,
+        shards=4,
+        spill_dir=spill_dir,
+        max_workers=1,
+        **mapping_dicts,
+    )
+
+    # A later input with fewer ids, and so fewer parts and empty shards
+    day2_path = tmp_path / "day2.csv"
+    day2_df = pl.read_csv(generated_inputs, separator=";").filter(pl.col("id") <= 3)
+    day2_df.write_csv(day2_path, separator=";")
+    result_df = run_partitioned(
+        file_path=str(day2_path),
+        shards=4,
+        spill_dir=spill_dir,
+        max_workers=1,
+        **mapping_dicts,
+    )
+
+    assert_frame_equal(
+        result_df,
+        run_partitioned(file_path=str(day2_path), shards=1, **mapping_dicts),
+    )
+    assert set(result_df["id"]) <= {1, 2, 3}
+
+
+def test_invalid_shards(generated_inputs, mapping_dicts):
+    with pytest.raises(ValueError):
+        run_partitioned(file_path=generated_inputs, shards=0, **mapping_dicts)
+
+
+def test_main_partitions(tmp_path):
+    spill_dir = tmp_path / "spill"
+
+    result_df = run(partitions=3, max_workers=1, spill_dir=str(spill_dir))
+
+    assert_frame_equal(result_df, run())
+    shard_files = [name for name in os.listdir(spill_dir) if ".result" not in name]
+    assert len(shard_files) == 3
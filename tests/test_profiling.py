@@ -0,0 +1,50 @@
+import os
+
+import pytest
+from polars.testing import assert_frame_equal
+
+from src.profiling import PROFILE_DIR_ENV
+from main import run
+
+
+def run_dir_files(profile_dir):
+    (run_dir,) = os.listdir(profile_dir)
+    return set(os.listdir(profile_dir / run_dir))
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_profile_lazy(tmp_path, streaming):
+    result_df = run(lazy=True, streaming=streaming, profile_dir=str(tmp_path))
+
+    assert run_dir_files(tmp_path) == {
+        "plan.txt",
+        "optimized_plan.txt",
+        "node_timings.csv",
+    }
+    assert_frame_equal(result_df, run(lazy=True, streaming=streaming))
+
+
+def test_profile_eager_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv(PROFILE_DIR_ENV, str(tmp_path))
+
+    result_df = run()
+
+    assert run_dir_files(tmp_path) == {"eager.prof", "eager.txt"}
+    assert (
+        "handle_dimensions"
+        in (tmp_path / os.listdir(tmp_path)[0] / "eager.txt").read_text()
+    )
+    assert not result_df.is_empty()
+
+
+def test_profile_lazy_with_output(tmp_path):
+    output_dir = tmp_path / "output"
+
+    result_df = run(
+        lazy=True,
+        profile_dir=str(tmp_path / "profiles"),
+        output_dir=str(output_dir),
+    )
+
+    assert not result_df.is_empty()
+    assert os.listdir(output_dir)
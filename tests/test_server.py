@@ -0,0 +1,161 @@
+import asyncio
+import contextlib
+import http.client
+import io
+import shutil
+import threading
+
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from src.extract import get_df_from_csv
+from src.schemas import INPUTS_SCHEMA, OUTPUTS_SCHEMA
+from src.server import ARROW_FILE, ARROW_STREAM, CSV, MappingStore, serve
+from src.utils import obtain_file_path
+
+
+@pytest.fixture(scope="module")
+def mappings_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("mappings") / "mappings.csv"
+    shutil.copy(obtain_file_path(desired_file="mappings.csv"), path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def port(mappings_path):
+    # The server runs on its own event loop thread, as it would in its own process
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    async def start():
+        started = loop.create_future()
+        task = loop.create_task(
+            serve(
+                port=0,
+                mappings_path=str(mappings_path),
+                poll_interval=0.05,
+                started=started,
+            )
+        )
+        return task, await started
+
+    task, bound_port = asyncio.run_coroutine_threadsafe(start(), loop).result(10)
+
+    yield bound_port
+
+    async def stop():
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    asyncio.run_coroutine_threadsafe(stop(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+@pytest.fixture
+def inputs_csv():
+    with open(obtain_file_path(), "rb") as file:
+        return file.read()
+
+
+@pytest.fixture
+def outputs_df():
+    return get_df_from_csv(
+        file_path=obtain_file_path(desired_file="outputs.csv"), schema=OUTPUTS_SCHEMA
+    )
+
+
+def post(port, body, content_type=CSV, accept=None, path="/transform"):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": content_type}
+    if accept:
+        headers["Accept"] = accept
+    connection.request("POST", path, body=body, headers=headers)
+    response = connection.getresponse()
+    return response.status, response.getheader("Content-Type"), response.read()
+
+
+def test_transform_csv(port, inputs_csv, outputs_df):
+    status, content_type, body = post(port, inputs_csv)
+
+    assert status == 200
+    assert content_type == CSV
+    assert_frame_equal(
+        pl.read_csv(io.BytesIO(body), separator=";", schema=OUTPUTS_SCHEMA), outputs_df
+    )
+
+
+@pytest.mark.parametrize("content_type", [ARROW_FILE, ARROW_STREAM])
+def test_transform_arrow(port, outputs_df, content_type):
+    inputs_df = get_df_from_csv(file_path=obtain_file_path(), schema=INPUTS_SCHEMA)
+    buffer = io.BytesIO()
+    if content_type == ARROW_FILE:
+        inputs_df.write_ipc(buffer)
+    else:
+        inputs_df.write_ipc_stream(buffer)
+
+    status, _, body = post(
+        port, buffer.getvalue(), content_type=content_type, accept=ARROW_FILE
+    )
+
+    assert status == 200
+    assert_frame_equal(pl.read_ipc(io.BytesIO(body)), outputs_df)
+
+
+def test_keep_alive(port, inputs_csv):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    for _ in range(3):
+        connection.request(
+            "POST", "/transform", body=inputs_csv, headers={"Content-Type": CSV}
+        )
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 200
+
+
+@pytest.mark.parametrize(
+    "body, content_type, path, expected_status",
+    [
+        (b"id;Channel\n1;channel1\n", CSV, "/transform", 400),
+        (b"not arrow", ARROW_FILE, "/transform", 400),
+        (b"", "application/json", "/transform", 415),
+        (b"", CSV, "/unknown", 404),
+        (b"", CSV, "/health", 405),
+    ],
+)
+def test_errors(port, body, content_type, path, expected_status):
+    status, _, _ = post(port, body, content_type=content_type, path=path)
+
+    assert status == expected_status
+
+
+def test_health(port):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.request("GET", "/health")
+    response = connection.getresponse()
+
+    assert response.status == 200
+    assert response.read() == b"ok;10\n"
+
+
+def test_mapping_store_reload(tmp_path):
+    path = tmp_path / "mappings.csv"
+    shutil.copy(obtain_file_path(desired_file="mappings.csv"), path)
+    store = MappingStore(file_path=str(path))
+
+    assert not store.refresh()
+
+    with open(path, "a") as file:
+        file.write("Channel;channel4;Channel4\n")
+    assert store.refresh()
+    assert store.mapping_dicts[0]["channel4"] == "Channel4"
+
+    # Broken mappings raise and keep the previous ones in use
+    path.write_text("Field;SoftwareA;SoftwareB\nChannel;channel5;\n")
+    with pytest.raises(ValueError):
+        store.refresh()
+    assert store.mapping_dicts[0]["channel4"] == "Channel4"
@@ -0,0 +1,171 @@
+import os
+import shutil
+
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from src.extract import get_df_from_csv
+from src.schemas import INPUTS_SCHEMA, OUTPUTS_SCHEMA, STATE_SCHEMA
+from src.state import (
+    fold_delta,
+    folded_inputs_path,
+    read_folded_inputs,
+    read_state,
+    write_state,
+)
+from src.transform import aggregate_partial_dimensions, combine_partial_dimensions
+from src.utils import obtain_file_path
+from main import run
+
+
+@pytest.fixture
+def outputs_df():
+    return get_df_from_csv(
+        file_path=obtain_file_path(desired_file="outputs.csv"), schema=OUTPUTS_SCHEMA
+    )
+
+
+@pytest.fixture
+def daily_inputs(tmp_path):
+    # The sample inputs split into two days that share ids
+    inputs_df = get_df_from_csv(file_path=obtain_file_path(), schema=INPUTS_SCHEMA)
+    days = {"day1": inputs_df.slice(0, 3), "day2": inputs_df.slice(3)}
+
+    for day, day_df in days.items():
+        (tmp_path / day).mkdir()
+        day_df.write_csv(tmp_path / day / "inputs.csv", separator=";")
+
+    return tmp_path, days
+
+
+def mapped_rows(durations):
+    return pl.DataFrame(
+        {
+            "id": [1] * len(durations),
+            "ChannelB": ["Email"] * len(durations),
+            "LanguageB": ["EN"] * len(durations),
+            "CustomFieldsB": ["A"] * len(durations),
+            "Duration": durations,
+            "PointsGained": [1] * len(durations),
+        }
+    )
+
+
+def test_incremental_run(tmp_path, daily_inputs, outputs_df):
+    inputs_dir, days = daily_inputs
+    state_path = str(tmp_path / "state" / "state.parquet")
+
+    day1_df = run(inputs=str(inputs_dir / "day1"), state_path=state_path)
+    day2_df = run(inputs=str(inputs_dir / "day2"), state_path=state_path)
+
+    day2_ids = days["day2"]["id"].unique()
+    assert_frame_equal(day2_df, outputs_df.filter(pl.col("id").is_in(day2_ids)))
+    assert set(day1_df["id"]) == set(days["day1"]["id"])
+
+    state_df = read_state(state_path=state_path)
+    assert state_df.schema == pl.Schema(STATE_SCHEMA)
+    assert state_df.height == outputs_df.height
+
+
+def test_incremental_rerun(tmp_path, daily_inputs, outputs_df):
+    inputs_dir, days = daily_inputs
+    state_path = str(tmp_path / "state" / "state.parquet")
+
+    day1_df = run(inputs=str(inputs_dir / "day1"), state_path=state_path)
+    state_df = read_state(state_path=state_path)
+    # The same day run again is not folded twice
+    assert_frame_equal(
+        run(inputs=str(inputs_dir / "day1"), state_path=state_path), day1_df
+    )
+    assert_frame_equal(read_state(state_path=state_path), state_df)
+
+    # Neither are new inputs run together with already folded ones
+    with pytest.raises(SystemExit):
+        run(inputs=str(inputs_dir / "*" / "*.csv"), state_path=state_path)
+    assert_frame_equal(read_state(state_path=state_path), state_df)
+
+    run(inputs=str(inputs_dir / "day2"), state_path=state_path)
+    day2_df = run(inputs=str(inputs_dir / "day2"), state_path=state_path)
+
+    day2_ids = days["day2"]["id"].unique()
+    assert_frame_equal(day2_df, outputs_df.filter(pl.col("id").is_in(day2_ids)))
+    assert len(read_folded_inputs(state_path=state_path)) == 2
+    # The keys are kept out of the aggregates, in a file next to them
+    assert pl.read_parquet(state_path).columns == list(STATE_SCHEMA)
+    assert os.path.exists(folded_inputs_path(state_path=state_path))
+
+
+def test_read_state_interrupted_write(tmp_path):
+    state_path = str(tmp_path / "state.parquet")
+    delta_df = aggregate_partial_dimensions(df=mapped_rows(["0:00:30"]))
+    write_state(state_df=delta_df, state_path=state_path, folded_inputs=["day1"])
+    shutil.copy(folded_inputs_path(state_path=state_path), tmp_path / "keys.json")
+
+    # The state of day2 was renamed in place, but not its keys
+    write_state(
+        state_df=combine_partial_dimensions(df=pl.concat([delta_df, delta_df])),
+        state_path=state_path,
+        folded_inputs=["day1", "day2"],
+    )
+    shutil.copy(tmp_path / "keys.json", folded_inputs_path(state_path=state_path))
+
+    with pytest.raises(ValueError, match="interrupted"):
+        read_folded_inputs(state_path=state_path)
+
+
+def test_incremental_rerun_same_input(tmp_path, outputs_df):
+    state_path = str(tmp_path / "state.parquet")
+
+    for _ in range(2):
+        assert_frame_equal(run(state_path=state_path), outputs_df)
+
+
+def test_read_state_without_folded_inputs(tmp_path):
+    # States written before the folded inputs were recorded
+    state_path = str(tmp_path / "state.parquet")
+    delta_df = aggregate_partial_dimensions(df=mapped_rows(["0:00:30"]))
+    delta_df.select(list(STATE_SCHEMA)).write_parquet(state_path)
+
+    assert read_folded_inputs(state_path=state_path) == []
+    write_state(state_df=read_state(state_path=state_path), state_path=state_path)
+    assert read_state(state_path=state_path).height == 1
+
+
+def test_fold_delta_first_run(tmp_path):
+    state_path = str(tmp_path / "state.parquet")
+    delta_df = aggregate_partial_dimensions(df=mapped_rows(["0:00:30", "0:00:40"]))
+
+    result_df = fold_delta(delta_df=delta_df, state_path=state_path)
+
+    assert result_df["Duration"].to_list() == ["0:01:10"]
+    assert result_df["PointsGained"].to_list() == [2]
+
+
+def test_fold_delta_malformed_keeps_state(tmp_path):
+    state_path = str(tmp_path / "state.parquet")
+    fold_delta(
+        delta_df=aggregate_partial_dimensions(df=mapped_rows(["0:00:30"])),
+        state_path=state_path,
+    )
+    state_df = read_state(state_path=state_path)
+
+    with pytest.raises(ValueError):
+        fold_delta(
+            delta_df=aggregate_partial_dimensions(df=mapped_rows(["0:99:00"])),
+            state_path=state_path,
+        )
+
+    assert_frame_equal(read_state(state_path=state_path), state_df)
+
+
+def test_read_state_missing(tmp_path):
+    assert read_state(state_path=str(tmp_path / "state.parquet")) is None
+
+
+def test_read_state_invalid(tmp_path):
+    state_path = str(tmp_path / "state.parquet")
+    pl.DataFrame({"id": [1]}).write_parquet(state_path)
+
+    with pytest.raises(ValueError):
+        read_state(state_path=state_path)
@@ -0,0 +1,138 @@
+import os
+from datetime import date
+
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from src.extract import get_df_from_csv
+from src.schemas import OUTPUTS_SCHEMA
+from src.load import write_output
+from src.utils import obtain_file_path
+
+
+@pytest.fixture
+def outputs_df():
+    return get_df_from_csv(
+        file_path=obtain_file_path(desired_file="outputs.csv"), schema=OUTPUTS_SCHEMA
+    )
+
+
+def test_write_parquet(tmp_path, outputs_df):
+    paths = write_output(
+        data=outputs_df, output_dir=str(tmp_path), run_date=date(2024, 11, 20)
+    )
+
+    assert paths == [str(tmp_path / "run_date=2024-11-20" / "part-0.parquet")]
+    assert_frame_equal(pl.read_parquet(paths[0]), outputs_df)
+
+
+def test_write_partitioned_by_channel(tmp_path, outputs_df):
+    paths = write_output(
+        data=outputs_df,
+        output_dir=str(tmp_path),
+        run_date=date(2024, 11, 20),
+        partition_by_channel=True,
+    )
+
+    assert len(paths) == 3
+    assert str(tmp_path / "run_date=2024-11-20" / "Channel=Channel2") in paths[1]
+
+    result_df = pl.read_parquet(
+        str(tmp_path / "**" / "*.parquet"), hive_partitioning=True
+    )
+    assert result_df.height == outputs_df.height
+    assert result_df["run_date"].unique().to_list() == [date(2024, 11, 20)]
+
+
+def test_sink_lazy_ipc(tmp_path, outputs_df):
+    paths = write_output(
+        data=outputs_df.lazy().filter(pl.col("PointsGained") > 50),
+        output_dir=str(tmp_path),
+        file_format="ipc",
+    )
+
+    assert paths[0].endswith("part-0.arrow")
+    assert_frame_equal(
+        pl.read_ipc(paths[0]), outputs_df.filter(pl.col("PointsGained") > 50)
+    )
+
+
+def test_non_streamable_lazy_falls_back(tmp_path, outputs_df):
+    lf = outputs_df.lazy().with_columns(
+        Total=pl.col("PointsGained").sum().over("Channel")
+    )
+
+    paths = write_output(data=lf, output_dir=str(tmp_path))
+
+    assert_frame_equal(pl.read_parquet(paths[0]), lf.collect())
+
+
+def test_invalid_format(tmp_path, outputs_df):
+    with pytest.raises(ValueError):
+        write_output(data=outputs_df, output_dir=str(tmp_path), file_format="csv")
+
+
+def test_write_null_channel(tmp_path, outputs_df):
+    outputs_df = outputs_df.with_columns(
+        Channel=pl.when(pl.col("Channel") == "Channel2").then(pl.col("Channel"))
+    )
+
+    paths = write_output(
+        data=outputs_df,
+        output_dir=str(tmp_path),
+        run_date=date(2024, 11, 20),
+        partition_by_channel=True,
+    )
+
+    assert any("Channel=__HIVE_DEFAULT_PARTITION__" in path for path in paths)
+    result_df = pl.read_parquet(
+        str(tmp_path / "**" / "*.parquet"), hive_partitioning=True
+    )
+    assert_frame_equal(result_df.drop("run_date"), outputs_df, check_row_order=False)
+
+
+def test_write_replaces_previous_run(tmp_path, outputs_df):
+    run_dir = tmp_path / "run_date=2024-11-20"
+    write_output(
+        data=outputs_df,
+        output_dir=str(tmp_path),
+        run_date=date(2024, 11, 20),
+        partition_by_channel=True,
+    )
+
+    # A rerun with fewer Channels, then a flat rerun, leave no stale files behind
+    channel1_df = outputs_df.filter(pl.col("Channel") == "Channel1")
+    write_output(
+        data=channel1_df,
+        output_dir=str(tmp_path),
+        run_date=date(2024, 11, 20),
+        partition_by_channel=True,
+    )
+    assert os.listdir(run_dir) == ["Channel=Channel1"]
+
+    paths = write_output(
+        data=channel1_df.lazy(), output_dir=str(tmp_path), run_date=date(2024, 11, 20)
+    )
+    assert os.listdir(run_dir) == ["part-0.parquet"]
+    assert os.listdir(tmp_path) == ["run_date=2024-11-20"]
+    assert_frame_equal(
+        pl.read_parquet(str(tmp_path / "**" / "*.parquet")), pl.read_parquet(paths[0])
+    )
+    assert_frame_equal(pl.read_parquet(paths[0]), channel1_df)
+
+
+def test_failed_write_keeps_previous_run(tmp_path, outputs_df):
+    paths = write_output(
+        data=outputs_df, output_dir=str(tmp_path), run_date=date(2024, 11, 20)
+    )
+
+    with pytest.raises(pl.exceptions.ColumnNotFoundError):
+        write_output(
+            data=outputs_df.lazy().select("Missing"),
+            output_dir=str(tmp_path),
+            run_date=date(2024, 11, 20),
+        )
+
+    assert os.listdir(tmp_path) == ["run_date=2024-11-20"]
+    assert_frame_equal(pl.read_parquet(paths[0]), outputs_df)